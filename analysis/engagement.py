@@ -0,0 +1,528 @@
+import os
+import sqlite3
+from array import array
+from dataclasses import dataclass
+from typing import Iterable, Optional, Sequence
+
+import numpy as np
+
+from analysis.engagement_options import BUCKETS
+from exceptions import ExtractorDatabaseError
+from models.tweet import Tweet
+from reporters.sqlite_schema import TWEET_METRICS
+
+
+ENGAGEMENT = "engagement"
+DEFAULT_QUANTILES = (0.5, 0.9, 0.99)
+
+
+@dataclass
+class EngagementData:
+    """Public metrics of tweets as NumPy arrays
+
+    Tweets are stored by column: one row per tweet in created_at, author
+    and metrics, and one row per hashtag occurrence in hashtag_tweet and
+    hashtag. Authors and hashtags are integer codes into the authors and
+    hashtags arrays, so grouping is done with bincount and sorting
+    instead of Python dictionaries.
+
+    Build it with from_tweets, from_sqlite or from_parquet.
+    """
+
+    # seconds since the epoch
+    created_at: np.ndarray
+    # code of the author in authors
+    author: np.ndarray
+    # one column per TWEET_METRICS metric
+    metrics: np.ndarray
+    # row of the tweet of each hashtag occurrence
+    hashtag_tweet: np.ndarray
+    # code of each hashtag occurrence in hashtags
+    hashtag: np.ndarray
+    # sorted author usernames, or ids if the usernames are unknown
+    authors: np.ndarray
+    # sorted lower case hashtags
+    hashtags: np.ndarray
+
+    def __post_init__(self) -> None:
+
+        # metrics are reduced one column at a time, which is faster on contiguous columns
+        self.metrics = np.asfortranarray(self.metrics)
+
+    def __len__(self) -> int:
+        return len(self.created_at)
+
+    @classmethod
+    def from_tweets(cls, tweets: Iterable[Tweet]) -> "EngagementData":
+        """Collect the metrics of Tweet objects, e.g. the output of an extractor
+
+        :type tweets: Iterable
+        :param tweets: Tweet objects
+        :rtype: EngagementData
+        :returns: Metrics of the tweets
+        """
+
+        created_at = array("q")
+        author = array("q")
+        metrics = array("q")
+        hashtag_tweet = array("q")
+        hashtag = array("q")
+        authors = {}
+        hashtags = {}
+
+        for row, tweet in enumerate(tweets):
+            data = tweet.data
+            public_metrics = data["public_metrics"] or {}
+
+            if "author" in data:
+                author_name = data["author"].username
+            else:
+                author_name = str(data["author_id"])
+
+            created_at.append(int(data["created_at"].timestamp()))
+            author.append(authors.setdefault(author_name, len(authors)))
+            metrics.extend(public_metrics.get(metric, 0) for metric in TWEET_METRICS)
+
+            for tag in data["entities"].get("hashtag_items", ()):
+                hashtag_tweet.append(row)
+                hashtag.append(hashtags.setdefault(tag.lower(), len(hashtags)))
+
+        authors, author = _encode(list(authors), np.frombuffer(author, dtype=np.int64))
+        hashtags, hashtag = _encode(list(hashtags), np.frombuffer(hashtag, dtype=np.int64))
+
+        return cls(
+            created_at=np.frombuffer(created_at, dtype=np.int64),
+            author=author,
+            metrics=np.frombuffer(metrics, dtype=np.int64).reshape(-1, len(TWEET_METRICS)),
+            hashtag_tweet=np.frombuffer(hashtag_tweet, dtype=np.int64),
+            hashtag=hashtag,
+            authors=authors,
+            hashtags=hashtags,
+        )
+
+    @classmethod
+    def from_sqlite(cls, source: str = "search_tweets") -> "EngagementData":
+        """Load the metrics of the tweets saved to the SQLite database of the source
+
+        Raises ExtractorDatabaseError if the database does not exist or
+        cannot be read.
+
+        :type source: str
+        :param source: Tweet table (user_tweets or search_tweets)
+        :rtype: EngagementData
+        :returns: Metrics of the tweets
+        """
+
+        database = f"{source}.db"
+
+        if not os.path.exists(database):
+            raise ExtractorDatabaseError(f"Database file {database} could not be found!")
+
+        tweet_dtype = [("tweet_id", np.int64), ("created_at", np.int64), ("author_id", np.int64)]
+        tweet_dtype += [(metric, np.int64) for metric in TWEET_METRICS]
+
+        try:
+            connection = sqlite3.connect(database)
+
+            try:
+                cursor = connection.execute(
+                    "SELECT tweet_id, CAST(strftime('%s', created_at) AS INTEGER), "
+                    f"IFNULL(author_id, 0), {', '.join(f'IFNULL({m}, 0)' for m in TWEET_METRICS)} "
+                    f"FROM {source} ORDER BY tweet_id"
+                )
+                tweets = np.fromiter(cursor, dtype=tweet_dtype)
+
+                cursor = connection.execute(
+                    f"SELECT tweet_id, hashtag FROM {source}_hashtags ORDER BY tweet_id"
+                )
+                hashtag_codes = {}
+                tagged = np.fromiter(
+                    (
+                        (tweet_id, hashtag_codes.setdefault(tag, len(hashtag_codes)))
+                        for tweet_id, tag in cursor
+                    ),
+                    dtype=[("tweet_id", np.int64), ("hashtag", np.int64)],
+                )
+
+                usernames = {}
+                if source == "search_tweets":
+                    usernames = dict(connection.execute("SELECT user_id, username FROM authors"))
+
+            finally:
+                connection.close()
+
+        except sqlite3.Error as exp:
+            raise ExtractorDatabaseError(f"Reading {database} failed! {exp}") from exp
+
+        author_ids, author = np.unique(tweets["author_id"], return_inverse=True)
+        authors, author = _encode(
+            [usernames.get(author_id, str(author_id)) for author_id in author_ids.tolist()], author
+        )
+        hashtags, hashtag = _encode(list(hashtag_codes), tagged["hashtag"], lower=True)
+
+        return cls(
+            created_at=tweets["created_at"],
+            author=author,
+            metrics=np.column_stack([tweets[metric] for metric in TWEET_METRICS]),
+            hashtag_tweet=np.searchsorted(tweets["tweet_id"], tagged["tweet_id"]),
+            hashtag=hashtag,
+            authors=authors,
+            hashtags=hashtags,
+        )
+
+    @classmethod
+    def from_parquet(cls, paths: Sequence[str]) -> "EngagementData":
+        """Load the metrics of the tweets saved to Parquet files
+
+        Raises ExtractorDatabaseError if a file does not exist.
+
+        :type paths: Sequence
+        :param paths: Parquet files or directories of the parquet output
+        :rtype: EngagementData
+        :returns: Metrics of the tweets
+        """
+
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+
+        for path in paths:
+            if not os.path.exists(path):
+                raise ExtractorDatabaseError(f"Parquet file {path} could not be found!")
+
+        columns = ["created_at", "author_id", "hashtags", *TWEET_METRICS]
+        tables = []
+
+        for path in paths:
+            # only the read columns are decoded, the username of search tweet authors included
+            if "author" in pq.ParquetDataset(path).schema.names:
+                table = pq.read_table(path, columns=[*columns, "author.username"])
+            else:
+                table = pq.read_table(path, columns=columns)
+                table = table.append_column("username", pa.nulls(len(table), pa.string()))
+            tables.append(table)
+
+        table = pa.concat_tables(tables).combine_chunks()
+
+        created_at = table["created_at"].cast(pa.int64()).to_numpy(zero_copy_only=False) // 1000
+        # hash based encoding, only the distinct ids and hashtags are sorted by _encode
+        author_ids = pc.dictionary_encode(pc.fill_null(table["author_id"], 0).combine_chunks())
+        author = author_ids.indices.to_numpy()
+        # a row of each author, for the username
+        author_rows = np.empty(len(author_ids.dictionary), dtype=np.int64)
+        author_rows[author] = np.arange(len(author))
+        usernames = table["username"].take(pa.array(author_rows)).to_pylist()
+        authors, author = _encode(
+            [
+                username or str(author_id)
+                for author_id, username in zip(author_ids.dictionary.to_pylist(), usernames)
+            ],
+            author,
+        )
+
+        hashtag_lists = table["hashtags"].combine_chunks()
+        tags = pc.dictionary_encode(pc.list_flatten(hashtag_lists))
+        hashtags, hashtag = _encode(
+            tags.dictionary.to_pylist(), tags.indices.to_numpy(), lower=True
+        )
+
+        return cls(
+            created_at=created_at,
+            author=author,
+            metrics=np.column_stack(
+                [
+                    pc.fill_null(table[metric], 0).to_numpy(zero_copy_only=False)
+                    for metric in TWEET_METRICS
+                ]
+            ),
+            hashtag_tweet=pc.list_parent_indices(hashtag_lists).to_numpy(zero_copy_only=False),
+            hashtag=hashtag,
+            authors=authors,
+            hashtags=hashtags,
+        )
+
+    @property
+    def engagement(self) -> np.ndarray:
+        """Sum of the retweets, replies, likes and quotes of each tweet"""
+
+        return self.metrics.sum(axis=1)
+
+    def author_stats(
+        self, top: Optional[int] = 20, sort_by: str = ENGAGEMENT, min_tweets: int = 1
+    ) -> list[dict]:
+        """Get the engagement stats of each author
+
+        :type top: int
+        :param top: Number of authors to return, None returns all
+        :type sort_by: str
+        :param sort_by: Stat to sort by, descending (tweets, engagement or a metric name)
+        :type min_tweets: int
+        :param min_tweets: Minimum number of tweets of the returned authors
+        :rtype: list
+        :returns: Tweet count, totals, mean and percentiles of the engagement by author
+        """
+
+        return _group_stats(
+            "author",
+            self.authors,
+            self.author,
+            self.metrics,
+            top,
+            sort_by,
+            min_tweets,
+        )
+
+    def hashtag_stats(
+        self, top: Optional[int] = 20, sort_by: str = ENGAGEMENT, min_tweets: int = 1
+    ) -> list[dict]:
+        """Get the engagement stats of the tweets of each hashtag
+
+        A tweet counts once for each hashtag it has.
+
+        :type top: int
+        :param top: Number of hashtags to return, None returns all
+        :type sort_by: str
+        :param sort_by: Stat to sort by, descending (tweets, engagement or a metric name)
+        :type min_tweets: int
+        :param min_tweets: Minimum number of tweets of the returned hashtags
+        :rtype: list
+        :returns: Tweet count, totals, mean and percentiles of the engagement by hashtag
+        """
+
+        return _group_stats(
+            "hashtag",
+            self.hashtags,
+            self.hashtag,
+            self.metrics[self.hashtag_tweet],
+            top,
+            sort_by,
+            min_tweets,
+        )
+
+    def time_series(self, bucket: str = "day", window: int = 7) -> list[dict]:
+        """Get the tweet count and engagement of each time bucket, with rolling means
+
+        Buckets are aligned to the epoch in UTC (weeks start on Thursday)
+        and every bucket between the first and the last tweet is included.
+        The rolling mean is the engagement per tweet over the bucket and the
+        window - 1 buckets before it.
+
+        :type bucket: str
+        :param bucket: hour, day or week
+        :type window: int
+        :param window: Number of buckets of the rolling mean
+        :rtype: list
+        :returns: Start, tweet count, metric totals and means of each bucket
+        """
+
+        if not len(self):
+            return []
+
+        seconds = BUCKETS[bucket]
+        first = self.created_at.min() // seconds
+        buckets = self.created_at // seconds - first
+        count = int(buckets.max()) + 1
+
+        tweets = np.bincount(buckets, minlength=count)
+        totals = np.column_stack(
+            [
+                np.bincount(buckets, weights=self.metrics[:, column], minlength=count)
+                for column in range(len(TWEET_METRICS))
+            ]
+        )
+        engagement = totals.sum(axis=1)
+
+        rolling_tweets = _rolling_sum(tweets, window)
+        rolling_engagement = _rolling_sum(engagement, window)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = engagement / tweets
+            rolling_mean = rolling_engagement / rolling_tweets
+
+        starts = (np.arange(count) + first) * seconds
+
+        return [
+            {
+                "start": np.datetime64(int(start), "s").astype(str) + "Z",
+                "tweets": int(tweets[index]),
+                **{
+                    metric: int(totals[index, column])
+                    for column, metric in enumerate(TWEET_METRICS)
+                },
+                ENGAGEMENT: int(engagement[index]),
+                "mean": _to_float(mean[index]),
+                "rolling_mean": _to_float(rolling_mean[index]),
+            }
+            for index, start in enumerate(starts.tolist())
+        ]
+
+    def percentiles(self, quantiles: Sequence[float] = DEFAULT_QUANTILES) -> dict:
+        """Get percentiles of the engagement and of each metric over all tweets
+
+        :type quantiles: Sequence
+        :param quantiles: Quantiles between 0 and 1
+        :rtype: dict
+        :returns: Values of the quantiles by metric name
+        """
+
+        if not len(self):
+            return {}
+
+        columns = [*self.metrics.T, self.engagement]
+
+        return {
+            metric: {
+                _quantile_name(quantile): float(value)
+                for quantile, value in zip(quantiles, np.quantile(values, quantiles))
+            }
+            for metric, values in zip((*TWEET_METRICS, ENGAGEMENT), columns)
+        }
+
+
+def _group_stats(
+    group_name: str,
+    names: np.ndarray,
+    codes: np.ndarray,
+    metrics: np.ndarray,
+    top: Optional[int],
+    sort_by: str,
+    min_tweets: int,
+) -> list[dict]:
+    """Get the stats of each group of the rows with the same code"""
+
+    group_count = len(names)
+    engagement = metrics.sum(axis=1)
+
+    tweets = np.bincount(codes, minlength=group_count)
+    totals = {
+        metric: np.bincount(codes, weights=metrics[:, column], minlength=group_count)
+        for column, metric in enumerate(TWEET_METRICS)
+    }
+    totals[ENGAGEMENT] = np.bincount(codes, weights=engagement, minlength=group_count)
+    quantiles = grouped_quantiles(codes, engagement, group_count, DEFAULT_QUANTILES)
+
+    keys = {"tweets": tweets, **totals}
+    if sort_by not in keys:
+        raise ValueError(f"Unknown stat {sort_by}, should be one of {', '.join(keys)}")
+
+    selected = np.flatnonzero(tweets >= min_tweets)
+    # stable sort on the negated stat keeps ties in name order for the sorted names
+    selected = selected[np.argsort(-keys[sort_by][selected], kind="stable")]
+    if top:
+        selected = selected[:top]
+
+    return [
+        {
+            group_name: names[index],
+            "tweets": int(tweets[index]),
+            **{metric: int(total[index]) for metric, total in totals.items()},
+            "mean": float(totals[ENGAGEMENT][index] / tweets[index]),
+            **{
+                _quantile_name(q): float(quantiles[index, i])
+                for i, q in enumerate(DEFAULT_QUANTILES)
+            },
+        }
+        for index in selected.tolist()
+    ]
+
+
+def grouped_quantiles(
+    codes: np.ndarray, values: np.ndarray, group_count: int, quantiles: Sequence[float]
+) -> np.ndarray:
+    """Get quantiles of the values of each group with linear interpolation
+
+    The values are sorted once by group and value. Non-negative integer
+    values are packed with their group code into a single int64 key when
+    they fit, which sorts faster than sorting by two keys.
+
+    :type codes: np.ndarray
+    :param codes: Group code of each value, from 0 to group_count - 1
+    :type values: np.ndarray
+    :param values: Values to get the quantiles of
+    :type group_count: int
+    :param group_count: Number of groups
+    :type quantiles: Sequence
+    :param quantiles: Quantiles between 0 and 1
+    :rtype: np.ndarray
+    :returns: Array of group_count rows and a column per quantile, NaN for empty groups
+    """
+
+    result = np.full((group_count, len(quantiles)), np.nan)
+    if not len(values):
+        return result
+
+    counts = np.bincount(codes, minlength=group_count)
+    value_bits = int(values.max()).bit_length() if np.issubdtype(values.dtype, np.integer) else 64
+    group_bits = max(group_count - 1, 1).bit_length()
+
+    if values.min() >= 0 and value_bits + group_bits <= 63:
+        keys = (codes.astype(np.int64) << value_bits) | values.astype(np.int64)
+        keys.sort()
+        sorted_values = keys & ((1 << value_bits) - 1)
+    else:
+        sorted_values = values[np.lexsort((values, codes))]
+
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    present = counts > 0
+    starts = starts[present]
+    last = counts[present] - 1
+
+    for column, quantile in enumerate(quantiles):
+        position = last * quantile
+        lower = np.floor(position).astype(np.int64)
+        upper = np.minimum(lower + 1, last)
+        fraction = position - lower
+        low_values = sorted_values[starts + lower]
+        high_values = sorted_values[starts + upper]
+        result[present, column] = low_values + (high_values - low_values) * fraction
+
+    return result
+
+
+def _encode(
+    names: list[str], codes: np.ndarray, lower: bool = False
+) -> tuple[np.ndarray, np.ndarray]:
+    """Sort the distinct names and map the codes to the sorted names
+
+    Only the distinct names are sorted, and the names of all loaders end
+    up in the same order. Names that are equal in lower case are merged
+    if lower is set.
+
+    :type names: list
+    :param names: Distinct names
+    :type codes: np.ndarray
+    :param codes: Index of the name of each row in names
+    :type lower: bool
+    :param lower: Whether names are lowered
+    :rtype: tuple
+    :returns: Sorted names and the index of the name of each row in them
+    """
+
+    if lower:
+        names = [name.lower() for name in names]
+
+    sorted_names, name_codes = np.unique(np.array(names, dtype=str), return_inverse=True)
+
+    return sorted_names.astype(object), name_codes[codes]
+
+
+def _rolling_sum(values: np.ndarray, window: int) -> np.ndarray:
+    """Sum of each value and the window - 1 values before it"""
+
+    window = max(window, 1)
+    sums = np.cumsum(values, dtype=np.float64)
+    sums[window:] = sums[window:] - sums[:-window]
+
+    return sums
+
+
+def _quantile_name(quantile: float) -> str:
+    """Name of a quantile like p50 or p99.9"""
+
+    return f"p{quantile * 100:g}"
+
+
+def _to_float(value: float) -> Optional[float]:
+    """Convert NaN to None for the JSON output"""
+
+    return None if np.isnan(value) else float(value)
@@ -0,0 +1,6 @@
+# kept apart from engagement.py, so the arg parser doesn't import NumPy
+
+# bucket sizes of the time series in seconds
+BUCKETS = {"hour": 3600, "day": 86400, "week": 7 * 86400}
+# stats computed by the analyze command
+REPORTS = ("authors", "hashtags", "series", "percentiles")
@@ -0,0 +1,87 @@
+import os
+import sqlite3
+from typing import Optional
+
+from exceptions import ExtractorDatabaseError
+from reporters.sqlite_schema import FTS_COLUMNS
+
+
+def search(
+    query: str,
+    source: str = "search_tweets",
+    language: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    limit: Optional[int] = 20,
+) -> list[dict]:
+    """Run a ranked full-text search on the SQLite database of the given source
+
+    Tweets are searched by their text and users by their bio. Results are
+    ordered by bm25 rank, best match first. Language and date filters
+    are only applied to tweets.
+
+    Raises ExtractorDatabaseError if the query fails, e.g. for an invalid
+    FTS5 query syntax or a database without full-text index.
+
+    :type query: str
+    :param query: FTS5 query (e.g. python AND "type hints")
+    :type source: str
+    :param source: Table to search (users, user_tweets or search_tweets)
+    :type language: str
+    :param language: Language code of the tweets
+    :type since: str
+    :param since: Minimum creation date of the tweets as ISO 8601 string (inclusive)
+    :type until: str
+    :param until: Maximum creation date of the tweets as ISO 8601 string (exclusive)
+    :type limit: int
+    :param limit: Maximum number of results
+    :rtype: list
+    :returns: List of matching rows as dictionaries
+    """
+
+    id_column, text_column = FTS_COLUMNS[source]
+
+    if source == "users":
+        columns = f"t.{id_column}, t.username, t.name, t.{text_column}"
+    else:
+        columns = f"t.{id_column}, t.created_at, t.language, t.{text_column}"
+
+    sql = (
+        f"SELECT {columns}, bm25({source}_fts) AS rank FROM {source}_fts "
+        f"JOIN {source} AS t ON t.{id_column} = {source}_fts.rowid "
+        f"WHERE {source}_fts MATCH ?"
+    )
+    params = [query]
+
+    if source != "users":
+        if language:
+            sql += " AND t.language = ?"
+            params.append(language)
+        if since:
+            sql += " AND t.created_at >= ?"
+            params.append(since)
+        if until:
+            sql += " AND t.created_at < ?"
+            params.append(until)
+
+    sql += " ORDER BY rank LIMIT ?"
+    params.append(limit if limit else -1)
+
+    database = f"{source}.db"
+
+    if not os.path.exists(database):
+        raise ExtractorDatabaseError(f"Database file {database} could not be found!")
+
+    try:
+        connection = sqlite3.connect(database)
+        connection.row_factory = sqlite3.Row
+
+        try:
+            rows = connection.execute(sql, params).fetchall()
+        finally:
+            connection.close()
+
+    except sqlite3.Error as exp:
+        raise ExtractorDatabaseError(f"Full-text search failed! {exp}") from exp
+
+    return [dict(row) for row in rows]
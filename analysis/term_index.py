@@ -0,0 +1,587 @@
+import base64
+import hashlib
+import heapq
+import json
+import os
+from array import array
+from bisect import bisect_right
+from collections import Counter
+from functools import lru_cache
+from datetime import date, datetime, timezone
+from typing import Iterable, Iterator, Optional, Union
+
+from exceptions import TermIndexError
+from models.tweet import Tweet
+
+
+# indexed term kinds and the tweet entities they are read from
+KINDS = {"hashtag": "hashtag_items", "mention": "mention_items", "url": "url_items"}
+INDEX_VERSION = 1
+# counters per row and rows of the count-min sketches, 32 KiB per sketch
+COUNT_MIN_WIDTH = 1024
+COUNT_MIN_DEPTH = 4
+
+
+class CountMinSketch:
+    """Count-min sketch of term frequencies
+
+    Frequencies are added to one counter per row, picked by hashing the
+    term, and estimated by the smallest of them. Estimates are never
+    below the true frequency and exceed it by at most 2 / width of the
+    total with probability 1 - (1 / 2) ** depth. Terms are hashed with
+    blake2b, so sketches saved by different runs can be merged.
+    """
+
+    def __init__(
+        self, width: int = COUNT_MIN_WIDTH, depth: int = COUNT_MIN_DEPTH, table: array = None
+    ) -> None:
+
+        self.width = width
+        self.depth = depth
+        self.table = table if table is not None else array("q", bytes(8 * width * depth))
+
+    def add(self, term: str, count: int = 1) -> None:
+
+        table = self.table
+        for cell in _get_cells(term, self.width, self.depth):
+            table[cell] += count
+
+    def estimate(self, term: str) -> int:
+
+        table = self.table
+        return min(table[cell] for cell in _get_cells(term, self.width, self.depth))
+
+    def merge(self, other: "CountMinSketch") -> None:
+        """Add the frequencies of a sketch of the same size"""
+
+        if (self.width, self.depth) != (other.width, other.depth):
+            raise TermIndexError(
+                f"Count-min sketches of different sizes can't be merged "
+                f"({self.width}x{self.depth} and {other.width}x{other.depth})"
+            )
+
+        self.table = array("q", map(sum, zip(self.table, other.table)))
+
+    def to_dict(self) -> dict:
+        return {"table": base64.b64encode(self.table.tobytes()).decode("ascii")}
+
+    @classmethod
+    def from_dict(cls, value: dict, width: int, depth: int) -> "CountMinSketch":
+
+        table = array("q")
+        table.frombytes(base64.b64decode(value["table"]))
+
+        return cls(width, depth, table)
+
+
+@lru_cache(maxsize=2**16)
+def _get_cells(term: str, width: int, depth: int) -> tuple[int, ...]:
+    """Get the counter of the term in each row, frequent terms are hashed once"""
+
+    digest = hashlib.blake2b(term.encode(), digest_size=16).digest()
+    first = int.from_bytes(digest[:8], "little")
+    # odd, so the rows get different cells of the term
+    second = int.from_bytes(digest[8:], "little") | 1
+
+    return tuple(row * width + (first + row * second) % width for row in range(depth))
+
+
+class SpaceSaving:
+    """Space-saving summary of the most frequent terms
+
+    At most capacity terms are counted. A new term replaces the term
+    with the smallest count and starts from that count, which is
+    recorded as the error of the new term. Any term more frequent than
+    the total divided by capacity is in the summary, and the true
+    frequency of a term is between its count minus its error and its
+    count.
+    """
+
+    def __init__(self, capacity: int) -> None:
+
+        self.capacity = capacity
+        # term -> [count, error]
+        self.counts = {}
+        # (count, term) of each term, with the count it had when it was pushed
+        self._heap = []
+
+    def add(self, term: str, count: int = 1) -> None:
+
+        counts = self.counts
+        entry = counts.get(term)
+
+        if entry is not None:
+            # counts only grow, the heap entry is updated when it is popped
+            entry[0] += count
+            return
+
+        if len(counts) < self.capacity:
+            counts[term] = [count, 0]
+            heapq.heappush(self._heap, (count, term))
+        else:
+            minimum = self._pop_minimum()
+            counts[term] = [minimum + count, minimum]
+            heapq.heappush(self._heap, (minimum + count, term))
+
+    def _pop_minimum(self) -> int:
+        """Remove the term with the smallest count, return the count"""
+
+        heap = self._heap
+
+        while True:
+            count, term = heap[0]
+            current = self.counts[term][0]
+
+            if current == count:
+                heapq.heappop(heap)
+                del self.counts[term]
+                return count
+
+            heapq.heapreplace(heap, (current, term))
+
+    def _rebuild_heap(self) -> None:
+
+        self._heap = [(count, term) for term, (count, _) in self.counts.items()]
+        heapq.heapify(self._heap)
+
+    @property
+    def minimum(self) -> int:
+        """Upper bound of the frequency of the terms not in the summary"""
+
+        if len(self.counts) < self.capacity:
+            return 0
+
+        return min(count for count, _ in self.counts.values())
+
+    def merge(self, other: "SpaceSaving") -> None:
+        """Add the counts of another summary, keeping the capacity largest
+
+        A term missing from a full summary may have had up to its smallest
+        count there, which is added to the count and error of the term.
+        """
+
+        own_minimum = self.minimum
+        other_minimum = other.minimum
+        merged = {}
+
+        for term in self.counts.keys() | other.counts.keys():
+            count, error = self.counts.get(term, (own_minimum, own_minimum))
+            other_count, other_error = other.counts.get(term, (other_minimum, other_minimum))
+            merged[term] = [count + other_count, error + other_error]
+
+        capacity = max(self.capacity, other.capacity)
+        self.capacity = capacity
+        self.counts = dict(heapq.nlargest(capacity, merged.items(), key=lambda item: item[1][0]))
+        self._rebuild_heap()
+
+    def to_dict(self) -> dict:
+        return {"capacity": self.capacity, "counts": self.counts}
+
+    @classmethod
+    def from_dict(cls, value: dict) -> "SpaceSaving":
+
+        summary = cls(value["capacity"])
+        summary.counts = {term: list(entry) for term, entry in value["counts"].items()}
+        summary._rebuild_heap()
+
+        return summary
+
+
+class TermIndex:
+    """Frequencies of hashtags, mentions and URLs of tweets per day
+
+    Counts are kept per kind (hashtag, mention or url), UTC day and term.
+    Hashtags and mentions are counted in lower case. An index is updated
+    as tweets are extracted, saved to a JSON file, and loaded and updated
+    again by the next run; indexes of different runs can be merged.
+
+    By default every term is counted exactly. With a capacity, each day of
+    each kind keeps a SpaceSaving summary of its capacity most frequent
+    terms and a CountMinSketch, so memory use per day is bounded however
+    many distinct terms the tweets have. Top terms are then the terms of
+    the summaries ranked by their estimated counts, which are never below
+    the true counts.
+
+    To not count tweets twice when runs overlap, the ranges of tweet ids
+    indexed from each stream (a search query or a user's timeline) are
+    recorded, and tweets in them are skipped by index_tweets.
+    """
+
+    def __init__(
+        self,
+        capacity: Optional[int] = None,
+        width: int = COUNT_MIN_WIDTH,
+        depth: int = COUNT_MIN_DEPTH,
+    ) -> None:
+
+        self.capacity = capacity
+        self.width = width
+        self.depth = depth
+        # kind -> day -> Counter, or (SpaceSaving, CountMinSketch) with a capacity
+        self._days = {kind: {} for kind in KINDS}
+        # stream -> sorted, disjoint [first, last] tweet id ranges
+        self._coverage = {}
+
+    @property
+    def sketched(self) -> bool:
+        """Whether the counts are estimated with sketches"""
+
+        return self.capacity is not None
+
+    def add_terms(self, kind: str, day: str, terms: Iterable[str]) -> None:
+        """Count terms of a kind on a day
+
+        :type kind: str
+        :param kind: hashtag, mention or url
+        :type day: str
+        :param day: Date in YYYY-MM-DD format
+        :type terms: Iterable
+        :param terms: Terms, once per occurrence
+        """
+
+        days = self._days[kind]
+
+        if not self.sketched:
+            counter = days.get(day)
+            if counter is None:
+                counter = days[day] = Counter()
+            counter.update(terms)
+            return
+
+        sketches = days.get(day)
+        if sketches is None:
+            sketches = days[day] = (
+                SpaceSaving(self.capacity),
+                CountMinSketch(self.width, self.depth),
+            )
+
+        summary, count_min = sketches
+        for term in terms:
+            summary.add(term)
+            count_min.add(term)
+
+    def add(self, tweet: Tweet) -> None:
+        """Count the hashtags, mentions and URLs of a tweet"""
+
+        entities = tweet.data["entities"]
+        day = _get_day(tweet.data["created_at"])
+
+        for kind, entity in KINDS.items():
+            items = entities.get(entity)
+            if items:
+                self.add_terms(kind, day, items if kind == "url" else map(str.lower, items))
+
+    def index_tweets(self, tweets: Iterable[Tweet], stream: str) -> Iterator[Tweet]:
+        """Count the tweets of a stream as they are iterated
+
+        Tweets are yielded unchanged. Tweets with an id in a range indexed
+        from the stream before are not counted again. Extractors return
+        the tweets of a stream without gaps, so the ids from the first to
+        the last tweet are recorded as indexed, also if the iteration
+        stops early or a reporter fails.
+
+        :type tweets: Iterable
+        :param tweets: Tweet objects
+        :type stream: str
+        :param stream: Name of the source of the tweets, e.g. the search query
+        :rtype: Iterator
+        :returns: The tweets
+        """
+
+        # sorted and merged, the ranges of an iteration that stopped early aren't
+        ranges = _merge_ranges(self._coverage.get(stream, []))
+        # ids from the first to the last tweet of this run, recorded as the tweets are counted
+        indexed = None
+
+        for tweet in tweets:
+            tweet_id = int(tweet.data["id"])
+
+            if not _in_ranges(ranges, tweet_id):
+                self.add(tweet)
+
+            if indexed is None:
+                indexed = [tweet_id, tweet_id]
+                self._coverage[stream] = ranges + [indexed]
+            elif tweet_id < indexed[0]:
+                indexed[0] = tweet_id
+            elif tweet_id > indexed[1]:
+                indexed[1] = tweet_id
+
+            yield tweet
+
+        if indexed is not None:
+            self._coverage[stream] = _merge_ranges(self._coverage[stream])
+
+    def update(self, tweets: Iterable[Tweet], stream: Optional[str] = None) -> None:
+        """Count all tweets, skipping the ones indexed from the stream before if it is given"""
+
+        if stream is None:
+            for tweet in tweets:
+                self.add(tweet)
+        else:
+            for _ in self.index_tweets(tweets, stream):
+                pass
+
+    def days(self, kind: Optional[str] = None) -> list[str]:
+        """Sorted days with counts of the kind, or of any kind"""
+
+        kinds = [kind] if kind else KINDS
+        return sorted({day for kind in kinds for day in self._days[kind]})
+
+    def _select_days(
+        self, kind: str, since: Union[str, date, None], until: Union[str, date, None]
+    ) -> list:
+
+        if kind not in KINDS:
+            raise TermIndexError(f"Unknown term kind {kind}! Should be one of {', '.join(KINDS)}")
+
+        since = _to_day(since)
+        until = _to_day(until)
+
+        return [
+            counts
+            for day, counts in self._days[kind].items()
+            if (since is None or day >= since) and (until is None or day < until)
+        ]
+
+    def top(
+        self,
+        kind: str,
+        k: int = 10,
+        since: Union[str, date, None] = None,
+        until: Union[str, date, None] = None,
+    ) -> list[tuple[str, int]]:
+        """Most frequent terms of a kind in a date range
+
+        With sketches, the counts are estimates that may exceed the true
+        counts, and terms that were not among the capacity most frequent
+        terms of any day of the range are not returned.
+
+        :type kind: str
+        :param kind: hashtag, mention or url
+        :type k: int
+        :param k: Number of terms
+        :type since: str or date
+        :param since: First day, YYYY-MM-DD
+        :type until: str or date
+        :param until: Day after the last day, YYYY-MM-DD
+        :rtype: list
+        :returns: (term, count) tuples, most frequent first
+        """
+
+        selected = self._select_days(kind, since, until)
+
+        if not self.sketched:
+            if len(selected) == 1:
+                return selected[0].most_common(k)
+
+            total = Counter()
+            for counter in selected:
+                total.update(counter)
+            return total.most_common(k)
+
+        minimums = [summary.minimum for summary, _ in selected]
+        candidates = set().union(*(summary.counts for summary, _ in selected))
+        estimates = {term: self._estimate(selected, minimums, term) for term in candidates}
+
+        return heapq.nlargest(k, estimates.items(), key=lambda item: (item[1], item[0]))
+
+    def count(
+        self,
+        kind: str,
+        term: str,
+        since: Union[str, date, None] = None,
+        until: Union[str, date, None] = None,
+    ) -> int:
+        """Frequency of a term in a date range, an upper bound of it with sketches"""
+
+        if kind != "url":
+            term = term.lower()
+
+        selected = self._select_days(kind, since, until)
+
+        if not self.sketched:
+            return sum(counter[term] for counter in selected)
+
+        return self._estimate(selected, [summary.minimum for summary, _ in selected], term)
+
+    @staticmethod
+    def _estimate(selected: list, minimums: list[int], term: str) -> int:
+        total = 0
+
+        for (summary, count_min), minimum in zip(selected, minimums):
+            entry = summary.counts.get(term)
+            count, error = entry if entry is not None else (minimum, minimum)
+
+            # both sketches overestimate, the smaller estimate is the closer one, unless
+            # the summary count has no error
+            total += count if error == 0 else min(count, count_min.estimate(term))
+
+        return total
+
+    def merge(self, other: "TermIndex") -> None:
+        """Add the counts and indexed id ranges of another index
+
+        Raises TermIndexError if the indexes don't count the same way.
+        Tweets counted by both indexes are counted twice.
+
+        :type other: TermIndex
+        :param other: Index with the same capacity and sketch size
+        """
+
+        if (self.capacity, self.width, self.depth) != (other.capacity, other.width, other.depth):
+            raise TermIndexError(
+                "Term indexes with different capacities or sketch sizes can't be merged"
+            )
+
+        for kind, days in other._days.items():
+            own_days = self._days[kind]
+
+            for day, counts in days.items():
+                if day not in own_days:
+                    own_days[day] = _copy_counts(counts)
+                elif not self.sketched:
+                    own_days[day].update(counts)
+                else:
+                    own_days[day][0].merge(counts[0])
+                    own_days[day][1].merge(counts[1])
+
+        for stream, ranges in other._coverage.items():
+            self._coverage[stream] = _merge_ranges(self._coverage.get(stream, []) + ranges)
+
+    def to_dict(self) -> dict:
+
+        if self.sketched:
+            days = {
+                kind: {
+                    day: {"summary": summary.to_dict(), "count_min": count_min.to_dict()}
+                    for day, (summary, count_min) in sorted(kind_days.items())
+                }
+                for kind, kind_days in self._days.items()
+            }
+        else:
+            days = {
+                kind: {day: dict(counter) for day, counter in sorted(kind_days.items())}
+                for kind, kind_days in self._days.items()
+            }
+
+        return {
+            "version": INDEX_VERSION,
+            "capacity": self.capacity,
+            "width": self.width,
+            "depth": self.depth,
+            "coverage": {
+                stream: _merge_ranges(ranges) for stream, ranges in self._coverage.items()
+            },
+            "days": days,
+        }
+
+    @classmethod
+    def from_dict(cls, value: dict) -> "TermIndex":
+
+        if value.get("version") != INDEX_VERSION:
+            raise TermIndexError(f"Unsupported term index version {value.get('version')}")
+
+        index = cls(value["capacity"], value["width"], value["depth"])
+        index._coverage = {
+            stream: _merge_ranges(ranges) for stream, ranges in value["coverage"].items()
+        }
+
+        for kind, days in value["days"].items():
+            for day, counts in days.items():
+                if index.sketched:
+                    index._days[kind][day] = (
+                        SpaceSaving.from_dict(counts["summary"]),
+                        CountMinSketch.from_dict(counts["count_min"], index.width, index.depth),
+                    )
+                else:
+                    index._days[kind][day] = Counter(counts)
+
+        return index
+
+    def save(self, filename: str) -> None:
+        """Write the index to a JSON file, replacing the previous one at once"""
+
+        temporary_filename = f"{filename}.tmp"
+
+        with open(temporary_filename, "w", encoding="utf-8") as file:
+            json.dump(self.to_dict(), file, separators=(",", ":"))
+
+        os.replace(temporary_filename, filename)
+
+    @classmethod
+    def load(cls, filename: str, capacity: Optional[int] = None) -> "TermIndex":
+        """Read an index saved with save, or create an empty one if the file doesn't exist
+
+        Raises TermIndexError if the file can't be read or the index has
+        a different capacity than the given one.
+
+        :type filename: str
+        :param filename: JSON file
+        :type capacity: int
+        :param capacity: Terms per day of the sketches of a new index, None counts exactly
+        :rtype: TermIndex
+        :returns: Index
+        """
+
+        if not os.path.exists(filename):
+            return cls(capacity)
+
+        try:
+            with open(filename, encoding="utf-8") as file:
+                index = cls.from_dict(json.load(file))
+        except (OSError, ValueError, KeyError, TypeError) as exp:
+            raise TermIndexError(f"Couldn't read term index {filename}: {exp}") from exp
+
+        if capacity is not None and capacity != index.capacity:
+            raise TermIndexError(
+                f"Term index {filename} was created with capacity {index.capacity}, not {capacity}"
+            )
+
+        return index
+
+
+def _get_day(created_at: datetime) -> str:
+
+    if created_at.tzinfo is not None:
+        created_at = created_at.astimezone(timezone.utc)
+
+    return created_at.strftime("%Y-%m-%d")
+
+
+def _to_day(value: Union[str, date, None]) -> Optional[str]:
+
+    if value is None or isinstance(value, str):
+        return value
+
+    return value.strftime("%Y-%m-%d")
+
+
+def _copy_counts(counts):
+
+    if isinstance(counts, Counter):
+        return Counter(counts)
+
+    summary, count_min = counts
+    return SpaceSaving.from_dict(summary.to_dict()), CountMinSketch(
+        count_min.width, count_min.depth, array("q", count_min.table)
+    )
+
+
+def _in_ranges(ranges: list[list[int]], tweet_id: int) -> bool:
+
+    position = bisect_right(ranges, [tweet_id, float("inf")]) - 1
+    return position >= 0 and ranges[position][1] >= tweet_id
+
+
+def _merge_ranges(ranges: list[list[int]]) -> list[list[int]]:
+
+    merged = []
+
+    for first, last in sorted(ranges):
+        if merged and first <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], last)
+        else:
+            merged.append([first, last])
+
+    return merged
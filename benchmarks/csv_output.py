@@ -0,0 +1,71 @@
+"""Write throughput and output size of CSV output modes
+
+Rows of synthetic tweets are formatted once and written with a default
+csv.writer on a regular file, as CsvReporter did before OutputStream, and
+with OutputStream in plain, gzip and zstd modes.
+
+    python -m benchmarks.csv_output --tweets 1000000
+"""
+
+import csv
+import os
+import tempfile
+from argparse import ArgumentParser
+from time import perf_counter
+
+from benchmarks.synthetic import mixed_tweets
+from models.tweet import Tweet
+from reporters.file_reporter import FileReporter
+from reporters.output_stream import OutputStream
+
+
+def write_default(filename: str, rows: list[list]) -> list[str]:
+    """Write rows with the default file buffer"""
+
+    with open(filename, "w", newline="") as csvfile:
+        csv.writer(csvfile).writerows(rows)
+
+    return [filename]
+
+
+def write_stream(filename: str, rows: list[list], compression: str = None) -> list[str]:
+    """Write rows through OutputStream"""
+
+    with OutputStream(filename, compression=compression) as output:
+        csv.writer(output).writerows(rows)
+
+    return output.filenames
+
+
+if __name__ == "__main__":
+    arg_parser = ArgumentParser()
+    arg_parser.add_argument("--tweets", type=int, default=200_000)
+    args = arg_parser.parse_args()
+
+    rows = [
+        FileReporter._get_tweet_row_data(Tweet(tweet).data)
+        for tweet in mixed_tweets(args.tweets, author=True)
+    ]
+
+    modes = {
+        "default": write_default,
+        "plain": write_stream,
+        "gzip": lambda filename, rows: write_stream(filename, rows, "gzip"),
+        "zstd": lambda filename, rows: write_stream(filename, rows, "zstd"),
+    }
+
+    with tempfile.TemporaryDirectory() as directory:
+        plain_size = None
+
+        for name, write in modes.items():
+            started = perf_counter()
+            filenames = write(os.path.join(directory, f"{name}.csv"), rows)
+            elapsed = perf_counter() - started
+
+            size = sum(os.path.getsize(filename) for filename in filenames)
+            plain_size = plain_size or size
+
+            print(
+                f"{name:<8} {len(rows) / elapsed:10.0f} rows/s {size / 2**20:8.1f} MiB "
+                f"({size / plain_size:.0%} of plain)"
+            )
@@ -0,0 +1,77 @@
+"""Ingest throughput and view latency of the DuckDB reporter
+
+A batch of synthetic search tweets is converted to Arrow once and inserted
+repeatedly with shifted ids by DuckDBReporter._insert_batch until
+the table has the requested number of tweets. The end-to-end rate of
+DuckDBReporter.save, including the conversion of Tweet models, is measured
+on a smaller sample.
+
+    python -m benchmarks.duckdb_ingest --tweets 10000000
+"""
+
+import os
+import tempfile
+from argparse import ArgumentParser
+from time import perf_counter
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from benchmarks.synthetic import mixed_tweets
+from models.tweet import Tweet
+from reporters import arrow_schema
+from reporters import duckdb_reporter
+from reporters.duckdb_reporter import DuckDBReporter
+from utils import ExtractedDataType, logger
+
+
+if __name__ == "__main__":
+    arg_parser = ArgumentParser()
+    arg_parser.add_argument("--tweets", type=int, default=1_000_000)
+    arg_parser.add_argument("--sample", type=int, default=100_000)
+    args = arg_parser.parse_args()
+
+    logger.disabled = True
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+
+        tweets = [Tweet(tweet) for tweet in mixed_tweets(args.sample, author=True)]
+
+        started = perf_counter()
+        DuckDBReporter(ExtractedDataType.SEARCH_TWEETS).save(tweets)
+        elapsed = perf_counter() - started
+        print(f"save       {args.sample / elapsed:10.0f} rows/s (with model conversion)")
+
+        batch = next(
+            arrow_schema.record_batches(
+                (arrow_schema.tweet_record(tweet.data) for tweet in tweets),
+                arrow_schema.TWEET_SCHEMA,
+                DuckDBReporter.BATCH_SIZE,
+            )
+        )
+
+        reporter = DuckDBReporter(ExtractedDataType.SEARCH_TWEETS)
+        db = reporter._db
+        rows = db.execute("SELECT count(*) FROM search_tweets").fetchone()[0]
+
+        started = perf_counter()
+        inserted = 0
+        while rows + inserted < args.tweets:
+            ids = pc.add(batch.column("id"), pa.scalar(rows + inserted, pa.int64()))
+            shifted = batch.set_column(0, "id", ids)
+
+            reporter._insert_batch("search_tweets", shifted)
+
+            inserted += shifted.num_rows
+        elapsed = perf_counter() - started
+
+        print(f"ingest     {inserted / elapsed:10.0f} rows/s ({rows + inserted} tweets)")
+
+        for view in ("hashtag_counts", "engagement_by_day", "top_mentions"):
+            started = perf_counter()
+            db.execute(f"SELECT * FROM {view} LIMIT 10").fetchall()
+            print(f"{view:<18} {(perf_counter() - started) * 1000:8.1f} ms")
+
+        db.close()
+        print(f"database   {os.path.getsize(duckdb_reporter.DB_FILE) / 2**20:10.1f} MiB")
@@ -0,0 +1,111 @@
+"""Seconds of each engagement analysis on millions of synthetic tweets
+
+Arrays of --tweets tweets are generated directly with NumPy: authors
+and hashtags drawn from Zipf distributions, heavy tailed metrics over
+--days days, and 0 to 3 hashtags per tweet. Each stat of the analyze
+command is timed on them, and loading is timed on a Parquet file of the
+same tweets written to a temporary directory:
+
+    python -m benchmarks.engagement --tweets 10000000
+
+--models N also times collecting N synthetic Tweet models, the path of
+tweets streamed from an extractor.
+"""
+
+import os
+import tempfile
+from argparse import ArgumentParser
+from time import perf_counter
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from analysis.engagement import EngagementData
+from benchmarks.synthetic import mixed_tweets
+from models.tweet import Tweet
+from reporters.sqlite_schema import TWEET_METRICS
+
+
+def generate(count: int, days: int, seed: int = 0) -> EngagementData:
+    """Generate the arrays of the synthetic tweets"""
+
+    rng = np.random.default_rng(seed)
+
+    author_count = max(count // 20, 1)
+    hashtag_count = max(count // 200, 1)
+
+    authors = np.minimum(rng.zipf(1.3, count), author_count) - 1
+    likes = rng.pareto(1.5, count) * 10
+    metrics = np.column_stack([likes * 0.1, likes * 0.02, likes, likes * 0.005]) * rng.uniform(
+        0.5, 1.5, (count, len(TWEET_METRICS))
+    )
+
+    hashtags_per_tweet = rng.integers(0, 4, count)
+    hashtag_tweet = np.repeat(np.arange(count), hashtags_per_tweet)
+    hashtag = np.minimum(rng.zipf(1.2, len(hashtag_tweet)), hashtag_count) - 1
+
+    return EngagementData(
+        created_at=1_640_995_200 + rng.integers(0, days * 86400, count),
+        author=authors,
+        metrics=metrics.astype(np.int64),
+        hashtag_tweet=hashtag_tweet,
+        hashtag=hashtag,
+        authors=np.array([f"user_{index}" for index in range(author_count)], dtype=object),
+        hashtags=np.array([f"tag{index}" for index in range(hashtag_count)], dtype=object),
+    )
+
+
+def write_parquet(data: EngagementData, filename: str) -> None:
+    """Write the tweets with the columns of the parquet output that are analyzed"""
+
+    offsets = np.concatenate(([0], np.cumsum(np.bincount(data.hashtag_tweet, minlength=len(data)))))
+    hashtags = pa.array(data.hashtags.astype(str)).take(pa.array(data.hashtag))
+
+    columns = {
+        "created_at": pa.array(data.created_at * 1000, pa.timestamp("ms", tz="UTC")),
+        "author_id": pa.array(data.author + 1),
+        "hashtags": pa.ListArray.from_arrays(pa.array(offsets, pa.int32()), hashtags),
+        **{
+            metric: pa.array(data.metrics[:, column]) for column, metric in enumerate(TWEET_METRICS)
+        },
+    }
+
+    pq.write_table(pa.table(columns), filename)
+
+
+def timed(name: str, function, *args) -> object:
+    """Call the function and print the seconds it took"""
+
+    started = perf_counter()
+    result = function(*args)
+    print(f"{name:<24} {perf_counter() - started:8.3f} s")
+
+    return result
+
+
+if __name__ == "__main__":
+    arg_parser = ArgumentParser()
+    arg_parser.add_argument("--tweets", type=int, default=10_000_000)
+    arg_parser.add_argument("--days", type=int, default=90)
+    arg_parser.add_argument("--models", type=int, default=0, help="Tweet models to collect")
+    args = arg_parser.parse_args()
+
+    data = timed("generate", generate, args.tweets, args.days)
+    print(f"{len(data)} tweets, {len(data.hashtag)} hashtag occurrences")
+
+    timed("author_stats", data.author_stats)
+    timed("hashtag_stats", data.hashtag_stats)
+    timed("time_series (day)", data.time_series, "day", 7)
+    timed("time_series (hour)", data.time_series, "hour", 24)
+    timed("percentiles", data.percentiles)
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "tweets.parquet")
+        timed("write parquet", write_parquet, data, filename)
+        del data
+        timed("from_parquet", EngagementData.from_parquet, [filename])
+
+    if args.models:
+        tweets = [Tweet(tweet) for tweet in mixed_tweets(args.models, author=True)]
+        timed(f"from_tweets ({args.models})", EngagementData.from_tweets, tweets)
@@ -0,0 +1,85 @@
+"""Peak memory and throughput of Excel reports
+
+Writes synthetic followers with the write-only ExcelReporter and with a
+regular in-memory workbook, each in a fresh process so that peak RSS is
+measured per run.
+
+    python -m benchmarks.excel_streaming --rows 10000 100000 1000000
+"""
+
+import multiprocessing
+import os
+import resource
+import tempfile
+from argparse import ArgumentParser
+from time import perf_counter
+
+from benchmarks.synthetic import mixed_users
+from models.user import User
+from reporters.excel_reporter import ExcelReporter
+from reporters.file_reporter import FileReporter
+from utils import ExtractedDataType, logger
+
+
+def write_streaming(filename: str, rows: int) -> None:
+    """Save users with the write-only ExcelReporter"""
+
+    users = (User(user) for user in mixed_users(rows))
+    ExcelReporter(filename, ExtractedDataType.FOLLOWERS).save(users)
+
+
+def write_in_memory(filename: str, rows: int) -> None:
+    """Save users to a regular workbook, all cells are kept in memory until saved"""
+
+    import openpyxl
+
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(FileReporter(filename, ExtractedDataType.FOLLOWERS)._user_data_header)
+
+    for user in mixed_users(rows):
+        sheet.append(FileReporter._get_user_row_data(User(user).data))
+
+    workbook.save(filename)
+
+
+def run(mode: str, rows: int, results) -> None:
+    """Write rows in the given mode and report elapsed time and peak RSS"""
+
+    logger.disabled = True
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "benchmark.xlsx")
+
+        started = perf_counter()
+        (write_streaming if mode == "streaming" else write_in_memory)(filename, rows)
+        elapsed = perf_counter() - started
+
+        size = os.path.getsize(filename)
+
+    # kilobytes on Linux
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    results.put((elapsed, peak_rss, size))
+
+
+if __name__ == "__main__":
+    arg_parser = ArgumentParser()
+    arg_parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    arg_parser.add_argument("--modes", nargs="+", default=["streaming", "in_memory"])
+    args = arg_parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+
+    for rows in args.rows:
+        for mode in args.modes:
+            process = context.Process(target=run, args=(mode, rows, results))
+            process.start()
+            elapsed, peak_rss, size = results.get()
+            process.join()
+
+            print(
+                f"{mode:<10} {rows:>9} rows {rows / elapsed:9.0f} rows/s "
+                f"peak RSS {peak_rss:7.1f} MiB, file {size / 2**20:6.1f} MiB"
+            )
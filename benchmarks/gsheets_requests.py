@@ -0,0 +1,139 @@
+"""Request count and simulated duration of Google Sheets exports
+
+Runs GSheetsReporter against an in-memory fake of the gspread client,
+spreadsheet and worksheet APIs that counts requests. The rate limiter
+uses a simulated clock, so quota waits are measured without sleeping.
+
+    python -m benchmarks.gsheets_requests --users 10000
+"""
+
+from argparse import ArgumentParser
+from collections import Counter
+
+from benchmarks.synthetic import mixed_users
+from models.user import User
+from rate_limiter import TokenBucket
+from reporters.gsheets_reporter import WRITE_REQUESTS_PER_MINUTE, GSheetsReporter
+from utils import ExtractedDataType
+
+
+class FakeWorksheet:
+    """In-memory worksheet counting requests"""
+
+    def __init__(self, spreadsheet: "FakeSpreadsheet", title: str, rows: int, cols: int) -> None:
+
+        self._spreadsheet = spreadsheet
+        self.id = len(spreadsheet.worksheets())
+        self.title = title
+        self.rows = [[] for _ in range(rows)]
+        self.col_count = cols
+
+    @property
+    def row_count(self) -> int:
+        return len(self.rows)
+
+    def clear(self) -> None:
+        self._spreadsheet.requests["clear"] += 1
+        self.rows = []
+
+    def resize(self, rows: int, cols: int) -> None:
+        self._spreadsheet.requests["resize"] += 1
+        self.rows = self.rows[:rows]
+        self.col_count = cols
+
+    def update(self, range_name: str, values: list) -> None:
+        self._spreadsheet.requests["update"] += 1
+        self.rows[: len(values)] = values
+
+    def format(self, range_name: str, cell_format: dict) -> None:
+        self._spreadsheet.requests["format"] += 1
+
+    def append_rows(self, values: list, value_input_option: str = "RAW") -> None:
+        self._spreadsheet.requests["append_rows"] += 1
+        self.rows.extend(values)
+
+    def columns_auto_resize(self, start_column_index: int, end_column_index: int) -> None:
+        self._spreadsheet.requests["columns_auto_resize"] += 1
+
+
+class FakeSpreadsheet:
+    """In-memory spreadsheet counting requests of its worksheets"""
+
+    def __init__(self) -> None:
+
+        self.requests = Counter()
+        self._worksheets = []
+        self._worksheets.append(FakeWorksheet(self, "Sheet1", 1000, 26))
+
+    @property
+    def sheet1(self) -> FakeWorksheet:
+        return self._worksheets[0]
+
+    def worksheets(self) -> list[FakeWorksheet]:
+        return list(self._worksheets)
+
+    def add_worksheet(self, title: str, rows: int, cols: int) -> FakeWorksheet:
+        self.requests["add_worksheet"] += 1
+        worksheet = FakeWorksheet(self, title, rows, cols)
+        self._worksheets.append(worksheet)
+        return worksheet
+
+    def batch_update(self, body: dict) -> None:
+        self.requests["batch_update"] += 1
+        deleted = {request["deleteSheet"]["sheetId"] for request in body["requests"]}
+        self._worksheets = [ws for ws in self._worksheets if ws.id not in deleted]
+
+
+class FakeClient:
+    """gspread client returning a single in-memory spreadsheet"""
+
+    def __init__(self) -> None:
+
+        self.spreadsheet = FakeSpreadsheet()
+
+    def open(self, title: str) -> FakeSpreadsheet:
+        return self.spreadsheet
+
+
+class SimulatedClock:
+    """Clock advanced by sleep calls"""
+
+    def __init__(self) -> None:
+
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+
+if __name__ == "__main__":
+    arg_parser = ArgumentParser()
+    arg_parser.add_argument("--users", type=int, default=10_000)
+    arg_parser.add_argument("--cells_per_worksheet", type=int, default=2_000_000)
+    args = arg_parser.parse_args()
+
+    client = FakeClient()
+    clock = SimulatedClock()
+
+    reporter = GSheetsReporter(
+        "followers",
+        ExtractedDataType.FOLLOWERS,
+        "someone@example.com",
+        sheets_client=client,
+        rate_limiter=TokenBucket(WRITE_REQUESTS_PER_MINUTE, clock=clock, sleep=clock.sleep),
+        cells_per_worksheet=args.cells_per_worksheet,
+    )
+    reporter.save(User(user) for user in mixed_users(args.users))
+
+    requests = client.spreadsheet.requests
+    worksheets = client.spreadsheet.worksheets()
+
+    print(f"batched: {sum(requests.values())} write requests {dict(requests)}")
+    print(f"batched: {clock.now:.0f} s waiting for quota")
+    print(f"batched: {sum(len(ws.rows) for ws in worksheets)} rows in {len(worksheets)} worksheets")
+
+    # previous reporter sent one append_row request per user and slept 1 second after each
+    print(f"per row: {args.users + 4} write requests, {args.users} s sleeping")
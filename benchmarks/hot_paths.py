@@ -0,0 +1,216 @@
+"""Items/sec of the per-item model and row formatting code, checked against a baseline
+
+Each case runs a function once per synthetic item, as extraction and the
+reporters do for every user or tweet:
+
+* user_model, tweet_model, search_tweet_model: User and Tweet construction
+* user_row, tweet_row, search_tweet_row, media_tweet_row: row serializers
+  of the reporter headers, search tweets with their author and tweets with
+  four media items and a place
+* to_iso8601: formatting of the created_at values
+
+Each run of a case is paired with a run of a fixed pure Python reference
+loop, and the score of the case is the median ratio of the paired
+throughputs over --repeat runs. Baselines recorded on one machine can
+then be checked on another, and a busy machine slows both runs of a pair
+alike. Items/sec are of the fastest run.
+
+    python -m benchmarks.hot_paths                # print items/sec
+    python -m benchmarks.hot_paths --save         # record benchmarks/baseline.json
+    python -m benchmarks.hot_paths --check        # exit with 1 on a regression
+
+A case regresses when its relative score is more than --tolerance (15% by
+default) below the baseline.
+"""
+
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+from argparse import ArgumentParser
+from time import perf_counter
+from typing import Any, Callable
+
+from benchmarks.synthetic import mixed_tweets, mixed_users, synthetic_tweet
+from models.tweet import Tweet
+from models.user import User
+from reporters.reporter import TWEET_DATA_HEADER, USER_DATA_HEADER
+from reporters.row_serializers import get_row_serializer
+from utils import to_iso8601
+
+
+BASELINE_FILENAME = os.path.join(os.path.dirname(__file__), "baseline.json")
+DEFAULT_TOLERANCE = 0.15
+
+
+def get_cases(count: int) -> dict[str, tuple[Callable, list]]:
+    """Function and inputs of each case
+
+    :type count: int
+    :param count: Number of inputs of each case
+    :rtype: dict
+    :returns: Function and its inputs by case name
+    """
+
+    users = list(mixed_users(count))
+    tweets = list(mixed_tweets(count))
+    search_tweets = list(mixed_tweets(count, author=True))
+    media_tweets = [
+        synthetic_tweet(tweet_id, media_count=4, place=True) for tweet_id in range(count)
+    ]
+    user_row = get_row_serializer("user", USER_DATA_HEADER)
+    tweet_row = get_row_serializer("tweet", TWEET_DATA_HEADER[:-1])
+    search_tweet_row = get_row_serializer("tweet", TWEET_DATA_HEADER)
+
+    return {
+        "user_model": (User, users),
+        "tweet_model": (Tweet, tweets),
+        "search_tweet_model": (Tweet, search_tweets),
+        "user_row": (user_row, [User(user).data for user in users]),
+        "tweet_row": (tweet_row, [Tweet(tweet).data for tweet in tweets]),
+        "search_tweet_row": (search_tweet_row, [Tweet(tweet).data for tweet in search_tweets]),
+        "media_tweet_row": (tweet_row, [Tweet(tweet).data for tweet in media_tweets]),
+        "to_iso8601": (to_iso8601, [Tweet(tweet).data["created_at"] for tweet in tweets]),
+    }
+
+
+def reference(item: int) -> str:
+    """Fixed workload of dict, list and string operations like the hot paths"""
+
+    data = {"id": item, "name": f"user_{item}", "tags": [str(item), "python", "rust"]}
+
+    return " | ".join(f"{key}: {value}" for key, value in data.items())
+
+
+def time_calls(function: Callable[[Any], Any], inputs: list) -> float:
+    """Get the seconds of calling the function with each input, without garbage collection"""
+
+    gc.disable()
+
+    try:
+        started = perf_counter()
+        for item in inputs:
+            function(item)
+        return perf_counter() - started
+    finally:
+        gc.enable()
+
+
+def measure(function: Callable[[Any], Any], inputs: list, repeat: int) -> tuple[float, float]:
+    """Get the items/sec of the case and its score relative to the reference loop
+
+    :type function: Callable
+    :param function: Function of the case
+    :type inputs: list
+    :param inputs: Inputs of the case
+    :type repeat: int
+    :param repeat: Number of runs
+    :rtype: tuple
+    :returns: Items/sec of the fastest run and median relative score
+    """
+
+    reference_inputs = list(range(len(inputs)))
+    times = []
+    ratios = []
+
+    for _ in range(repeat):
+        reference_time = time_calls(reference, reference_inputs)
+        case_time = time_calls(function, inputs)
+
+        times.append(case_time)
+        ratios.append(reference_time / case_time)
+
+    return len(inputs) / min(times), statistics.median(ratios)
+
+
+def run(count: int, repeat: int) -> dict:
+    """Measure all cases
+
+    :type count: int
+    :param count: Number of inputs of each case
+    :type repeat: int
+    :param repeat: Number of runs of each case
+    :rtype: dict
+    :returns: Items/sec and relative score of each case
+    """
+
+    results = {}
+
+    for name, (function, inputs) in get_cases(count).items():
+        items_per_second, relative = measure(function, inputs, repeat)
+        results[name] = {
+            "items_per_second": round(items_per_second),
+            "relative": round(relative, 4),
+        }
+
+    return {"python": platform.python_version(), "cases": results}
+
+
+def check(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Compare relative scores with the baseline
+
+    :type results: dict
+    :param results: Results of run
+    :type baseline: dict
+    :param baseline: Results saved as the baseline
+    :type tolerance: float
+    :param tolerance: Allowed fraction of the baseline score lost
+    :rtype: list
+    :returns: Names of the regressed cases
+    """
+
+    regressed = []
+
+    for name, result in results["cases"].items():
+        if name not in baseline["cases"]:
+            continue
+
+        if result["relative"] < baseline["cases"][name]["relative"] * (1 - tolerance):
+            regressed.append(name)
+
+    return regressed
+
+
+if __name__ == "__main__":
+    arg_parser = ArgumentParser()
+    arg_parser.add_argument("--items", type=int, default=20_000, help="Inputs of each case")
+    arg_parser.add_argument("--repeat", type=int, default=11)
+    arg_parser.add_argument("--baseline", default=BASELINE_FILENAME)
+    arg_parser.add_argument("--save", action="store_true", help="Save the results as baseline")
+    arg_parser.add_argument("--check", action="store_true", help="Fail on regressions")
+    arg_parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = arg_parser.parse_args()
+
+    results = run(args.items, args.repeat)
+
+    baseline = None
+    if args.check:
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)
+
+    for name, result in results["cases"].items():
+        line = f"{name:<20} {result['items_per_second']:10d} items/s {result['relative']:8.4f}"
+
+        if baseline and name in baseline["cases"]:
+            change = result["relative"] / baseline["cases"][name]["relative"] - 1
+            line += f" {change:+7.1%} vs baseline"
+
+        print(line)
+
+    if args.save:
+        with open(args.baseline, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=4)
+            file.write("\n")
+
+        print(f"Baseline saved to {args.baseline}")
+
+    if baseline:
+        regressed = check(results, baseline, args.tolerance)
+
+        if regressed:
+            print(f"Regressed by more than {args.tolerance:.0%}: {', '.join(regressed)}")
+            sys.exit(1)
+
+        print(f"No regressions beyond {args.tolerance:.0%}")
@@ -0,0 +1,54 @@
+"""Write throughput of JSON Lines and CSV reports
+
+Synthetic search tweets with authors are built once and saved by
+JsonlReporter and CsvReporter, uncompressed and with zstd.
+
+    python -m benchmarks.jsonl_output --tweets 1000000
+"""
+
+import os
+import tempfile
+from argparse import ArgumentParser
+from time import perf_counter
+
+from benchmarks.synthetic import mixed_tweets
+from models.tweet import Tweet
+from reporters.csv_reporter import CsvReporter
+from reporters.jsonl_reporter import JsonlReporter
+from utils import ExtractedDataType, logger
+
+
+if __name__ == "__main__":
+    arg_parser = ArgumentParser()
+    arg_parser.add_argument("--tweets", type=int, default=200_000)
+    args = arg_parser.parse_args()
+
+    logger.disabled = True
+
+    tweets = [Tweet(tweet) for tweet in mixed_tweets(args.tweets, author=True)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        for reporter_class, filename in (
+            (JsonlReporter, "results.jsonl"),
+            (CsvReporter, "results.csv"),
+        ):
+            for compression in (None, "zstd"):
+                reporter = reporter_class(
+                    os.path.join(directory, filename),
+                    ExtractedDataType.SEARCH_TWEETS,
+                    compression=compression,
+                )
+
+                started = perf_counter()
+                reporter.save(tweets)
+                elapsed = perf_counter() - started
+
+                size = 0
+                for name in os.listdir(directory):
+                    size += os.path.getsize(os.path.join(directory, name))
+                    os.remove(os.path.join(directory, name))
+
+                print(
+                    f"{filename:<14} {compression or 'plain':<6} {len(tweets) / elapsed:9.0f} rows/s "
+                    f"{size / 2**20:8.1f} MiB"
+                )
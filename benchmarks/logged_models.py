@@ -0,0 +1,126 @@
+"""Check that models are saved after they were logged and written as rows
+
+Models are logged with str() and formatted by the CSV row serializers
+before the other reporters get them, e.g. with --output_type csv,parquet.
+Both read the entities of users and tweets without URLs, hashtags or
+mentions, which adds empty values for them to the model data. Synthetic
+users and tweets, some without entities, are logged, formatted and then
+saved by each output:
+
+* parquet: users and search tweets saved by ParquetReporter
+* mongodb: users and search tweets encoded as MongoDB documents, whose
+  urls, hashtags and mentions should be arrays or left out
+* duckdb: users saved twice by the same DuckDBReporter, as by multiple
+  saves of a job, and search tweets
+
+    python -m benchmarks.logged_models
+
+Exits with 1 if an output fails.
+"""
+
+import os
+import sys
+import tempfile
+import traceback
+from typing import Callable
+
+from benchmarks.synthetic import mixed_tweets, mixed_users, synthetic_tweet
+from models.tweet import Tweet
+from models.user import User
+from reporters.duckdb_reporter import DuckDBReporter
+from reporters.mongodb_encoder import encode_tweet, encode_user
+from reporters.parquet_reporter import ParquetReporter
+from reporters.reporter import TWEET_DATA_HEADER, USER_DATA_HEADER
+from reporters.row_serializers import get_row_serializer
+from utils import ExtractedDataType, logger
+
+
+def logged_models(count: int) -> tuple[list[User], list[Tweet]]:
+    """Get users and tweets, one in ten without entities, after logging and formatting them"""
+
+    users = [User(user) for user in mixed_users(count)]
+    tweets = [Tweet(tweet) for tweet in mixed_tweets(count, author=True)]
+    tweets += [
+        Tweet(synthetic_tweet(tweet_id, author=True, entities=False))
+        for tweet_id in range(count, count + count // 10)
+    ]
+
+    serialize_user = get_row_serializer("user", USER_DATA_HEADER)
+    serialize_tweet = get_row_serializer("tweet", TWEET_DATA_HEADER)
+
+    for user in users:
+        str(user)
+        serialize_user(user.data)
+
+    for tweet in tweets:
+        str(tweet)
+        serialize_tweet(tweet.data)
+
+    return users, tweets
+
+
+def save_parquet(users: list[User], tweets: list[Tweet], directory: str) -> None:
+
+    ParquetReporter(os.path.join(directory, "users.parquet"), ExtractedDataType.FOLLOWERS).save(
+        iter(users)
+    )
+    ParquetReporter(
+        os.path.join(directory, "tweets.parquet"), ExtractedDataType.SEARCH_TWEETS
+    ).save(iter(tweets))
+
+
+def encode_mongodb(users: list[User], tweets: list[Tweet], directory: str) -> None:
+
+    documents = [encode_user(user.data) for user in users]
+    documents += [encode_tweet(tweet.data)[0] for tweet in tweets]
+
+    for document in documents:
+        for field in ("urls", "hashtags", "mentions"):
+            if not isinstance(document.get(field, []), list):
+                raise TypeError(f"{field} of {document['id']} is {document[field]!r}")
+
+
+def save_duckdb(users: list[User], tweets: list[Tweet], directory: str) -> None:
+
+    # the database is created in the working directory
+    working_directory = os.getcwd()
+    os.chdir(directory)
+
+    try:
+        users_reporter = DuckDBReporter(ExtractedDataType.FOLLOWERS)
+        users_reporter.save(iter(users))
+        users_reporter.save(iter(users))
+        users_reporter.close()
+
+        tweets_reporter = DuckDBReporter(ExtractedDataType.SEARCH_TWEETS)
+        tweets_reporter.save(iter(tweets))
+        tweets_reporter.close()
+    finally:
+        os.chdir(working_directory)
+
+
+CHECKS: dict[str, Callable[[list[User], list[Tweet], str], None]] = {
+    "parquet": save_parquet,
+    "mongodb": encode_mongodb,
+    "duckdb": save_duckdb,
+}
+
+
+if __name__ == "__main__":
+    logger.disabled = True
+
+    users, tweets = logged_models(1000)
+    failed = []
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name, check in CHECKS.items():
+            try:
+                check(users, tweets, directory)
+            except Exception:
+                failed.append(name)
+                print(f"{name:<10} failed")
+                traceback.print_exc()
+            else:
+                print(f"{name:<10} ok")
+
+    sys.exit(1 if failed else 0)
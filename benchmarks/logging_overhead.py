@@ -0,0 +1,111 @@
+"""Followers/sec of an extraction with each logging setup
+
+Synthetic followers are extracted by the Followers extractor with the
+default log levels (DEBUG to the log file, INFO to the console), and
+optionally saved to SQLite, which logs a line per row:
+
+* sync: handlers called on the extraction thread, every item logged
+  (the setup before the queue handler and sampling)
+* queue: handlers called by the background listener, every item logged
+* sampled: handlers called by the background listener, one item in 100 logged
+
+The log file is written to a temporary directory, the console output is
+discarded. Times include waiting for the listener to write the queued
+records.
+
+    python -m benchmarks.logging_overhead --followers 100000
+"""
+
+import logging
+import os
+import tempfile
+import time
+from argparse import ArgumentParser
+from logging.handlers import QueueHandler, RotatingFileHandler
+
+import utils
+from benchmarks.synthetic import synthetic_user
+from extractors.followers import Followers
+from run_config import RunConfig
+
+
+class FollowersService:
+    """API service yielding synthetic followers"""
+
+    def __init__(self, count: int) -> None:
+        self._count = count
+
+    def get_followers(self, username: str, **kwargs):
+        return (synthetic_user(user_id) for user_id in range(self._count))
+
+
+def run(mode: str, count: int, sqlite: bool) -> float:
+    """Extract the followers with the logging mode, return followers/sec"""
+
+    logger = utils.logger
+    queue_handler = next(
+        handler for handler in logger.handlers if isinstance(handler, QueueHandler)
+    )
+
+    if mode == "sync":
+        logger.removeHandler(queue_handler)
+        for handler in utils.log_listener.handlers:
+            logger.addHandler(handler)
+
+    utils.item_logger.set_sample_rate(utils.DEFAULT_LOG_SAMPLE_RATE if mode == "sampled" else 1)
+
+    run_config = RunConfig(user="benchmark", followers=True, output_type="sqlite")
+    followers = Followers(run_config).extract_data(FollowersService(count))
+
+    started = time.perf_counter()
+
+    if sqlite:
+        from reporters.sqlite_reporter import SQLiteReporter
+
+        SQLiteReporter(run_config.extracted_data_type).save(followers)
+    else:
+        for _ in followers:
+            pass
+
+    while not utils.log_queue.empty():
+        time.sleep(0.001)
+
+    elapsed = time.perf_counter() - started
+
+    if mode == "sync":
+        for handler in utils.log_listener.handlers:
+            logger.removeHandler(handler)
+        logger.addHandler(queue_handler)
+
+    return count / elapsed
+
+
+if __name__ == "__main__":
+    arg_parser = ArgumentParser()
+    arg_parser.add_argument("--followers", type=int, default=100_000)
+    arg_parser.add_argument("--sqlite", action="store_true", help="Also save to SQLite")
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+
+        file_handler = RotatingFileHandler(
+            "benchmark.log", maxBytes=20971520, encoding="utf-8", backupCount=50
+        )
+        file_handler.setLevel(logging.DEBUG)
+        file_handler.setFormatter(utils.file_formatter)
+        console_handler = logging.StreamHandler(open(os.devnull, "w", encoding="utf-8"))
+        console_handler.setLevel(logging.INFO)
+        console_handler.setFormatter(utils.console_formatter)
+        utils.log_listener.handlers = (console_handler, file_handler)
+
+        for mode in ("sync", "queue", "sampled"):
+            if args.sqlite:
+                for filename in ("users.db", "user_tweets.db", "search_tweets.db"):
+                    if os.path.exists(filename):
+                        os.remove(filename)
+
+            items_per_second = run(mode, args.followers, args.sqlite)
+            print(f"{mode:<8} {items_per_second:9.0f} followers/s")
+
+        file_handler.close()
@@ -0,0 +1,89 @@
+"""Cost of the metrics instrumentation when disabled and enabled
+
+Synthetic followers are requested page by page through TwitterAPIService
+and tweepy.Paginator, built by the Followers extractor and saved by the
+JSONL reporter, so every instrumented layer except HTTP is exercised.
+The modes are run --repeat times in turn and the best followers/sec of
+each mode is reported:
+
+* disabled: the default, instruments are no-ops
+* enabled: counters and histograms recorded as with --metrics_report
+
+The cost of single disabled and enabled instrument calls is measured too.
+
+    python -m benchmarks.metrics_overhead --followers 100000
+"""
+
+import os
+import tempfile
+import time
+import timeit
+from argparse import ArgumentParser
+
+import metrics
+from benchmarks.synthetic import SyntheticClient
+from extractors.followers import Followers
+from reporters.jsonl_reporter import JsonlReporter
+from run_config import RunConfig
+from twitter_api_service import TwitterAPIService
+
+
+def run(count: int) -> float:
+    """Extract and save the followers, return followers/sec"""
+
+    api_service = TwitterAPIService(forme=True)
+    api_service._current_client = SyntheticClient(count)
+
+    run_config = RunConfig(user="benchmark", followers=True, output_type="jsonl")
+    followers = Followers(run_config).extract_data(api_service)
+
+    started = time.perf_counter()
+    JsonlReporter("followers.jsonl", run_config.extracted_data_type).save(followers)
+
+    return count / (time.perf_counter() - started)
+
+
+def instrument_call_ns() -> tuple[float, float]:
+    """Nanoseconds of a counter increment and a timed histogram block"""
+
+    def instrument_calls():
+        metrics.counter("benchmark_total").inc()
+        with metrics.histogram("benchmark_seconds").time():
+            pass
+
+    return min(timeit.repeat(instrument_calls, number=100_000, repeat=5)) / 100_000 * 1e9
+
+
+if __name__ == "__main__":
+    arg_parser = ArgumentParser()
+    arg_parser.add_argument("--followers", type=int, default=100_000)
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+
+        results = {"disabled": 0.0, "enabled": 0.0}
+
+        # modes are interleaved, so both see the same machine load
+        for _ in range(args.repeat):
+            for mode in results:
+                if mode == "enabled":
+                    metrics.enable()
+
+                results[mode] = max(results[mode], run(args.followers))
+                metrics.disable()
+
+        for mode, items_per_second in results.items():
+            if mode == "enabled":
+                metrics.enable()
+
+            print(
+                f"{mode:<9} {items_per_second:9.0f} followers/s, "
+                f"{instrument_call_ns():6.0f} ns per counter and histogram call"
+            )
+
+            metrics.disable()
+
+        overhead = (results["disabled"] / results["enabled"] - 1) * 100
+        print(f"enabled metrics cost {overhead:.1f}% of the disabled throughput")
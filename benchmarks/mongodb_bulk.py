@@ -0,0 +1,109 @@
+"""Write throughput of per-document and bulk upserts for MongoDB
+
+Runs against a mongod given by --uri, or against mongomock as an
+in-process stand-in when --mongomock is passed. mongomock scans its
+documents for every operation, so it only exercises the write paths;
+use a local mongod for throughput numbers.
+
+    python -m benchmarks.mongodb_bulk --documents 100000 --uri mongodb://localhost:27017
+"""
+
+from argparse import ArgumentParser
+from datetime import datetime, timezone
+from time import perf_counter
+
+from reporters.mongodb_reporter import BulkUpserter
+
+
+def synthetic_documents(count: int, offset: int = 0) -> list[dict]:
+    """Create tweet-like documents"""
+
+    created_at = datetime(2022, 3, 1, tzinfo=timezone.utc)
+
+    return [
+        {
+            "id": 10**18 + offset + i,
+            "text": f"synthetic tweet {i} #python",
+            "created_at": created_at,
+            "source": "Twitter Web App",
+            "language": "en",
+            "public_metrics": {"retweet_count": i % 7, "reply_count": 1, "like_count": i % 50},
+            "entities": {"hashtag_items": ["python"], "mention_items": [], "url_items": []},
+            "media": [],
+            "places": [],
+        }
+        for i in range(count)
+    ]
+
+
+def per_document(collection, documents: list[dict]) -> None:
+    """Previous write path, a lookup followed by insert or replace"""
+
+    for document in documents:
+        if not collection.find_one({"id": document["id"]}):
+            collection.insert_one(dict(document))
+        else:
+            collection.replace_one({"id": document["id"]}, document)
+
+
+def bulk(collection, documents: list[dict], batch_size: int) -> None:
+    """Unordered bulk upserts"""
+
+    upserter = BulkUpserter(collection, batch_size)
+
+    for document in documents:
+        upserter.add(document)
+
+    upserter.flush()
+
+
+def measure(name: str, function, collection, documents: list[dict], *args) -> None:
+    """Run the write function and print documents/sec"""
+
+    started = perf_counter()
+    function(collection, documents, *args)
+    elapsed = perf_counter() - started
+
+    print(f"{name:<36} {len(documents) / elapsed:12.0f} docs/s ({elapsed:.2f} s)")
+
+
+if __name__ == "__main__":
+    arg_parser = ArgumentParser()
+    arg_parser.add_argument("--documents", type=int, default=100_000)
+    arg_parser.add_argument("--batch_size", type=int, default=1000)
+    arg_parser.add_argument("--uri", default="mongodb://localhost:27017")
+    arg_parser.add_argument("--mongomock", action="store_true")
+    arg_parser.add_argument(
+        "--skip_per_document", action="store_true", help="Skip the slow per-document path"
+    )
+    args = arg_parser.parse_args()
+
+    if args.mongomock:
+        import mongomock
+
+        client = mongomock.MongoClient()
+    else:
+        from pymongo import MongoClient
+
+        client = MongoClient(args.uri)
+
+    db = client["tw_data_extractor_benchmark"]
+    documents = synthetic_documents(args.documents)
+
+    for indexed in (False, True):
+        db.drop_collection("tweets")
+        if indexed:
+            db["tweets"].create_index("id", unique=True)
+
+        label = "indexed" if indexed else "no index"
+
+        if not args.skip_per_document:
+            measure(f"find_one + insert ({label})", per_document, db["tweets"], documents)
+            db.drop_collection("tweets")
+            if indexed:
+                db["tweets"].create_index("id", unique=True)
+
+        measure(f"bulk upsert, insert ({label})", bulk, db["tweets"], documents, args.batch_size)
+        measure(f"bulk upsert, update ({label})", bulk, db["tweets"], documents, args.batch_size)
+
+    client.drop_database("tw_data_extractor_benchmark")
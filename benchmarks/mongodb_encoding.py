@@ -0,0 +1,87 @@
+"""Document size and insert throughput of the MongoDB document shapes
+
+Compares the compact documents built by mongodb_encoder with the previous
+shape, the Tweet model data as-is with tweepy objects replaced by their
+raw payloads (the objects themselves cannot be encoded).
+
+    python -m benchmarks.mongodb_encoding --tweets 100000 --uri mongodb://localhost:27017
+"""
+
+from argparse import ArgumentParser
+from time import perf_counter
+
+import bson
+
+from benchmarks.synthetic import mixed_tweets
+from models.tweet import Tweet
+from reporters.mongodb_encoder import encode_tweet
+
+
+def raw_document(data: dict) -> dict:
+    """Previous document shape with encodable tweepy payloads"""
+
+    document = dict(data)
+    document["entities"] = dict(data["entities"])
+    document["media"] = [media.data for media in data["media"]]
+    document["places"] = [place.data for place in data["places"]]
+
+    if "author" in data:
+        document["author"] = data["author"].data
+
+    return document
+
+
+def report_sizes(name: str, documents: list[dict]) -> None:
+    """Print total and average BSON size"""
+
+    sizes = [len(bson.encode(document)) for document in documents]
+
+    print(f"{name:<10} total {sum(sizes) / 2**20:8.1f} MiB, avg {sum(sizes) / len(sizes):6.0f} B")
+
+
+def measure_inserts(name: str, collection, documents: list[dict], batch_size: int) -> None:
+    """Insert documents in batches and print documents/sec"""
+
+    started = perf_counter()
+
+    for index in range(0, len(documents), batch_size):
+        collection.insert_many([dict(doc) for doc in documents[index : index + batch_size]])
+
+    elapsed = perf_counter() - started
+
+    print(f"{name:<10} {len(documents) / elapsed:10.0f} inserts/s")
+
+
+if __name__ == "__main__":
+    arg_parser = ArgumentParser()
+    arg_parser.add_argument("--tweets", type=int, default=100_000)
+    arg_parser.add_argument("--batch_size", type=int, default=1000)
+    arg_parser.add_argument("--uri", help="Measure insert throughput against this mongod")
+    args = arg_parser.parse_args()
+
+    tweets = [Tweet(tweet) for tweet in mixed_tweets(args.tweets, author=True)]
+
+    started = perf_counter()
+    raw_documents = [raw_document(tweet.data) for tweet in tweets]
+    print(f"raw shape built in {perf_counter() - started:.2f} s")
+
+    started = perf_counter()
+    compact_documents = []
+    for tweet in tweets:
+        tweet_document, author_document = encode_tweet(tweet.data)
+        compact_documents.append(tweet_document)
+    print(f"compact shape built in {perf_counter() - started:.2f} s")
+
+    report_sizes("raw", raw_documents)
+    report_sizes("compact", compact_documents)
+
+    if args.uri:
+        from pymongo import MongoClient
+
+        client = MongoClient(args.uri)
+        db = client["tw_data_extractor_benchmark"]
+
+        measure_inserts("raw", db["raw"], raw_documents, args.batch_size)
+        measure_inserts("compact", db["compact"], compact_documents, args.batch_size)
+
+        client.drop_database("tw_data_extractor_benchmark")
@@ -0,0 +1,52 @@
+"""File size and write time of Parquet, CSV and Excel reports
+
+Synthetic search tweets with authors are saved by each reporter.
+
+    python -m benchmarks.parquet_output --tweets 1000000
+"""
+
+import os
+import tempfile
+from argparse import ArgumentParser
+from time import perf_counter
+
+from benchmarks.synthetic import mixed_tweets
+from models.tweet import Tweet
+from reporters.csv_reporter import CsvReporter
+from reporters.excel_reporter import ExcelReporter
+from reporters.parquet_reporter import ParquetReporter
+from utils import ExtractedDataType, logger
+
+
+REPORTERS = {
+    "parquet": (ParquetReporter, "results.parquet"),
+    "csv": (CsvReporter, "results.csv"),
+    "xlsx": (ExcelReporter, "results.xlsx"),
+}
+
+
+if __name__ == "__main__":
+    arg_parser = ArgumentParser()
+    arg_parser.add_argument("--tweets", type=int, default=100_000)
+    arg_parser.add_argument("--formats", nargs="+", default=list(REPORTERS))
+    args = arg_parser.parse_args()
+
+    logger.disabled = True
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name in args.formats:
+            reporter_class, filename = REPORTERS[name]
+            filename = os.path.join(directory, filename)
+
+            tweets = (Tweet(tweet) for tweet in mixed_tweets(args.tweets, author=True))
+
+            started = perf_counter()
+            reporter_class(filename, ExtractedDataType.SEARCH_TWEETS).save(tweets)
+            elapsed = perf_counter() - started
+
+            size = os.path.getsize(filename)
+
+            print(
+                f"{name:<8} {elapsed:7.2f} s {args.tweets / elapsed:9.0f} rows/s "
+                f"{size / 2**20:8.1f} MiB"
+            )
@@ -0,0 +1,72 @@
+"""Rows/sec of CSV and Excel exports with rows formatted in 1, 2, 4 and 8 processes
+
+Synthetic search tweets with their authors are saved by CsvReporter and
+ExcelReporter to a temporary directory:
+
+* inline: rows formatted by the writing process, as without --format_workers
+* N workers: rows formatted, sanitized for Excel and encoded for CSV by N
+  worker processes and written in order by the reporter
+
+Speedups are relative to inline. A pool can only be faster when there
+are free CPUs for the workers besides the writing process; with fewer,
+the results show the overhead of packing models and passing batches
+between processes. The CPU count is printed with the results.
+
+    python -m benchmarks.row_pool --tweets 200000 --workers 1,2,4,8
+"""
+
+import os
+import statistics
+import tempfile
+from argparse import ArgumentParser
+from time import perf_counter
+
+from benchmarks.synthetic import mixed_tweets
+from models.tweet import Tweet
+from reporters.csv_reporter import CsvReporter
+from reporters.excel_reporter import ExcelReporter
+from utils import ExtractedDataType
+
+
+REPORTERS = {"csv": CsvReporter, "xlsx": ExcelReporter}
+
+
+def save(output_type: str, tweets: list[Tweet], directory: str, workers: int = None) -> float:
+    """Save the tweets with a new reporter, return the seconds it took"""
+
+    reporter = REPORTERS[output_type](
+        os.path.join(directory, f"results.{output_type}"),
+        ExtractedDataType.SEARCH_TWEETS,
+        format_workers=workers,
+    )
+
+    started = perf_counter()
+    reporter.save(iter(tweets))
+
+    return perf_counter() - started
+
+
+if __name__ == "__main__":
+    arg_parser = ArgumentParser()
+    arg_parser.add_argument("--tweets", type=int, default=100_000)
+    arg_parser.add_argument("--workers", default="1,2,4,8", help="Comma separated pool sizes")
+    arg_parser.add_argument("--output_types", default="csv,xlsx")
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    tweets = [Tweet(tweet) for tweet in mixed_tweets(args.tweets, author=True)]
+    pool_sizes = [None] + [int(workers) for workers in args.workers.split(",")]
+
+    print(f"{os.cpu_count()} CPUs, {args.tweets} search tweets")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for output_type in args.output_types.split(","):
+            inline_rate = None
+
+            for workers in pool_sizes:
+                times = [save(output_type, tweets, directory, workers) for _ in range(args.repeat)]
+                rate = args.tweets / statistics.median(times)
+                inline_rate = inline_rate or rate
+                name = f"{workers} workers" if workers else "inline"
+
+                print(f"{output_type:<5} {name:<10} {rate:9.0f} rows/s  {rate / inline_rate:5.2f}x")
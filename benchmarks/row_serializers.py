@@ -0,0 +1,176 @@
+"""Rows/sec of the precompiled row serializers and the row functions they replaced
+
+Rows are formatted from the data of synthetic User and Tweet models with
+the previous Reporter._get_user_row_data and Reporter._get_tweet_row_data,
+copied below, and with the serializers of the reporter headers:
+
+* users: all user columns
+* tweets: tweets without an author, all columns but Author
+* search_tweets: tweets with their author, all columns
+* media_tweets: tweets with four media items and a place
+* csv_subset: ID, Created At and Text only, as a reporter writing fewer
+  columns would get them
+
+Runs of the two implementations are interleaved and the median time of
+each is reported, so a busy machine slows both alike.
+
+    python -m benchmarks.row_serializers --items 100000
+"""
+
+import gc
+import statistics
+from argparse import ArgumentParser
+from time import perf_counter
+
+from benchmarks.synthetic import mixed_tweets, mixed_users, synthetic_tweet
+from models.tweet import Tweet
+from models.user import User
+from reporters.reporter import TWEET_DATA_HEADER, USER_DATA_HEADER
+from reporters.row_serializers import get_row_serializer
+from utils import to_iso8601
+
+
+def legacy_user_row(data: dict) -> list:
+    """Reporter._get_user_row_data before the serializers"""
+
+    return [
+        data["id"],
+        data["username"],
+        data["name"],
+        to_iso8601(data["created_at"]),
+        data["description"],
+        " ".join(url for url in data["entities"]["url_items"]),
+        " ".join(hashtag for hashtag in data["entities"]["hashtag_items"]),
+        " ".join(mention for mention in data["entities"]["mention_items"]),
+        data["location"],
+        data["pinned_tweet_id"],
+        data["pinned_tweet_text"],
+        data["profile_image_url"],
+        data["protected"],
+        " | ".join(f"{k}: {v}" for k, v in data["public_metrics"].items()),
+        data["url"],
+        data["verified"],
+    ]
+
+
+def legacy_tweet_row(data: dict) -> list:
+    """Reporter._get_tweet_row_data before the serializers"""
+
+    def _prepare_media_output():
+
+        media_data = ""
+        for media in data["media"]:
+            media_data += f"Key: {media['media_key']}, Type: {media['type']}\n"
+            media_data += f"URL: {media['url']}\n"
+            media_data += f"Width: {media['width']}, Height: {media['width']}"
+
+            if media["type"] == "video":
+                media_data += f"Duration: {media['duration_ms']}\n"
+                if media["public_metrics"]:
+                    media_data += f"View count: {media['public_metrics']['view_count']}\n"
+
+            if len(data["media"]) > 1:
+                media_data += "\n-------\n"
+
+        return media_data
+
+    def _prepare_place_output():
+
+        place_data = ""
+
+        for place in data["places"]:
+            place_data += f"ID: {place['id']}\nFull name: {place['full_name']}\n"
+            place_data += f"Country: {place['country']} ({place['country_code']})\n"
+            place_data += f"Type: {place['place_type']}\n"
+            place_data += f"Coords: {place['geo']['bbox']}"
+
+            if len(data["places"]) > 1:
+                place_data += "\n-------\n"
+
+        return place_data
+
+    result = [
+        data["id"],
+        data["text"],
+        to_iso8601(data["created_at"]),
+        data["source"],
+        data["language"],
+        " | ".join(f"{k}: {v}" for k, v in data["public_metrics"].items()),
+        " ".join(url for url in data["entities"]["url_items"]),
+        " ".join(hashtag for hashtag in data["entities"]["hashtag_items"]),
+        " ".join(mention for mention in data["entities"]["mention_items"]),
+        _prepare_media_output(),
+        _prepare_place_output(),
+    ]
+
+    if "author" in data:
+        author_data = User((data["author"], None))
+        result.append(str(author_data).strip())
+
+    return result
+
+
+def time_rows(function, inputs: list) -> float:
+    """Get the seconds of formatting a row of each input, without garbage collection"""
+
+    gc.disable()
+
+    try:
+        started = perf_counter()
+        for data in inputs:
+            function(data)
+        return perf_counter() - started
+    finally:
+        gc.enable()
+
+
+if __name__ == "__main__":
+    arg_parser = ArgumentParser()
+    arg_parser.add_argument("--items", type=int, default=50_000)
+    arg_parser.add_argument("--repeat", type=int, default=7)
+    args = arg_parser.parse_args()
+
+    users = [User(user).data for user in mixed_users(args.items)]
+    tweets = [Tweet(tweet).data for tweet in mixed_tweets(args.items)]
+    search_tweets = [Tweet(tweet).data for tweet in mixed_tweets(args.items, author=True)]
+    media_tweets = [
+        Tweet(synthetic_tweet(tweet_id, media_count=4, place=True)).data
+        for tweet_id in range(args.items)
+    ]
+    subset_header = ("ID", "Created At", "Text")
+
+    cases = {
+        "users": (legacy_user_row, get_row_serializer("user", USER_DATA_HEADER), users),
+        "tweets": (
+            legacy_tweet_row,
+            get_row_serializer("tweet", TWEET_DATA_HEADER[:-1]),
+            tweets,
+        ),
+        "search_tweets": (
+            legacy_tweet_row,
+            get_row_serializer("tweet", TWEET_DATA_HEADER),
+            search_tweets,
+        ),
+        "media_tweets": (
+            legacy_tweet_row,
+            get_row_serializer("tweet", TWEET_DATA_HEADER[:-1]),
+            media_tweets,
+        ),
+        "csv_subset": (legacy_tweet_row, get_row_serializer("tweet", subset_header), tweets),
+    }
+
+    for name, (legacy, serializer, inputs) in cases.items():
+        legacy_times = []
+        serializer_times = []
+
+        for _ in range(args.repeat):
+            legacy_times.append(time_rows(legacy, inputs))
+            serializer_times.append(time_rows(serializer, inputs))
+
+        legacy_rate = len(inputs) / statistics.median(legacy_times)
+        serializer_rate = len(inputs) / statistics.median(serializer_times)
+
+        print(
+            f"{name:<14} legacy {legacy_rate:9.0f} rows/s  "
+            f"serializer {serializer_rate:9.0f} rows/s  {serializer_rate / legacy_rate:5.2f}x"
+        )
@@ -0,0 +1,123 @@
+"""Full-text index benchmarks for SQLite tweet databases
+
+Fills a search_tweets table with synthetic tweet texts, measures the time
+to build the FTS5 index over them and the latency of ranked queries.
+
+    python -m benchmarks.sqlite_fts --tweets 2000000
+"""
+
+import os
+import random
+import sqlite3
+import tempfile
+from argparse import ArgumentParser
+from time import perf_counter
+
+from reporters import sqlite_schema
+
+
+WORDS = (
+    "python rust golang async await typing dataclass release bug fix performance "
+    "benchmark database index query memory cpu thread process cache network api "
+    "twitter data extractor open source community conference talk tutorial"
+).split()
+
+QUERIES = (
+    ("python", {}),
+    ("python AND performance", {}),
+    ('"open source"', {}),
+    ("rust OR golang", {"language": "en"}),
+    ("database NOT memory", {"since": "2022-06-01", "until": "2022-07-01"}),
+)
+
+
+def fill_table(connection: sqlite3.Connection, tweet_count: int) -> None:
+    """Insert synthetic tweets without the full-text index"""
+
+    connection.executescript(
+        """CREATE TABLE search_tweets (
+            tweet_id INTEGER PRIMARY KEY NOT NULL,
+            text TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            language TEXT
+        );"""
+    )
+
+    def rows():
+        for tweet_id in range(1, tweet_count + 1):
+            month = 1 + tweet_id % 12
+            yield (
+                tweet_id,
+                " ".join(random.choices(WORDS, k=random.randint(5, 25))),
+                f"2022-{month:02d}-{1 + tweet_id % 28:02d}T12:00:00+00:00",
+                "en" if tweet_id % 4 else "tr",
+            )
+
+    connection.executemany("INSERT INTO search_tweets VALUES (?, ?, ?, ?)", rows())
+    connection.commit()
+
+
+def build_index(connection: sqlite3.Connection) -> float:
+    """Create and populate the full-text index
+
+    :rtype: float
+    :returns: Elapsed seconds
+    """
+
+    started = perf_counter()
+
+    sqlite_schema.create_fts_table(connection.cursor(), "search_tweets")
+    connection.commit()
+
+    return perf_counter() - started
+
+
+def run_queries(connection: sqlite3.Connection, repeat: int, limit: int) -> None:
+    """Run each ranked query and print the best time"""
+
+    for query, filters in QUERIES:
+        sql = (
+            "SELECT t.tweet_id, bm25(search_tweets_fts) AS rank FROM search_tweets_fts "
+            "JOIN search_tweets AS t ON t.tweet_id = search_tweets_fts.rowid "
+            "WHERE search_tweets_fts MATCH ?"
+        )
+        params = [query]
+
+        if "language" in filters:
+            sql += " AND t.language = ?"
+            params.append(filters["language"])
+        if "since" in filters:
+            sql += " AND t.created_at >= ? AND t.created_at < ?"
+            params.extend((filters["since"], filters["until"]))
+
+        sql += " ORDER BY rank LIMIT ?"
+        params.append(limit)
+
+        timings = []
+        for _ in range(repeat):
+            started = perf_counter()
+            connection.execute(sql, params).fetchall()
+            timings.append(perf_counter() - started)
+
+        label = f"{query} {filters if filters else ''}"
+        print(f"{label:<70} {min(timings) * 1000:10.2f} ms")
+
+
+if __name__ == "__main__":
+    arg_parser = ArgumentParser()
+    arg_parser.add_argument("--tweets", type=int, default=2_000_000)
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    arg_parser.add_argument("--limit", type=int, default=20)
+    args = arg_parser.parse_args()
+
+    random.seed(0)
+
+    connection = sqlite3.connect(os.path.join(tempfile.mkdtemp(), "search_tweets.db"))
+
+    fill_table(connection, args.tweets)
+    elapsed = build_index(connection)
+    print(f"Indexed {args.tweets} tweets in {elapsed:.1f} s")
+
+    run_queries(connection, args.repeat, args.limit)
+
+    connection.close()
@@ -0,0 +1,135 @@
+"""Query benchmarks for the normalized SQLite schema
+
+Builds a search_tweets database with synthetic tweets and measures
+the time of common analytical queries.
+
+    python -m benchmarks.sqlite_queries --tweets 1000000
+"""
+
+import os
+import random
+import sqlite3
+import tempfile
+from argparse import ArgumentParser
+from datetime import datetime, timedelta, timezone
+from time import perf_counter
+
+from reporters import sqlite_schema
+
+
+QUERIES = {
+    "top hashtags": (
+        "SELECT hashtag, COUNT(*) AS total FROM search_tweets_hashtags "
+        "GROUP BY hashtag ORDER BY total DESC LIMIT 10",
+        (),
+    ),
+    "top hashtags in date range": (
+        "SELECT h.hashtag, COUNT(*) AS total FROM search_tweets AS t "
+        "JOIN search_tweets_hashtags AS h ON h.tweet_id = t.tweet_id "
+        "WHERE t.created_at BETWEEN ? AND ? "
+        "GROUP BY h.hashtag ORDER BY total DESC LIMIT 10",
+        ("2022-03-01", "2022-03-08"),
+    ),
+    "tweets by author in date range": (
+        "SELECT tweet_id, text, like_count FROM search_tweets "
+        "WHERE author_id = ? AND created_at BETWEEN ? AND ? ORDER BY created_at",
+        (42, "2022-03-01", "2022-06-01"),
+    ),
+    "tweets with hashtag": (
+        "SELECT COUNT(*) FROM search_tweets_hashtags WHERE hashtag = ?",
+        ("tag7",),
+    ),
+    "most liked tweets of a day": (
+        "SELECT tweet_id, like_count FROM search_tweets "
+        "WHERE created_at BETWEEN ? AND ? ORDER BY like_count DESC LIMIT 10",
+        ("2022-03-05", "2022-03-06"),
+    ),
+}
+
+
+def synthetic_tweet(tweet_id: int, created_at: datetime) -> dict:
+    """Create a tweet data dictionary like the one built by the Tweet model"""
+
+    return {
+        "id": tweet_id,
+        "text": f"synthetic tweet {tweet_id}",
+        "created_at": created_at,
+        "source": "Twitter Web App",
+        "language": "en",
+        "public_metrics": {
+            "retweet_count": random.randint(0, 100),
+            "reply_count": random.randint(0, 20),
+            "like_count": random.randint(0, 1000),
+            "quote_count": random.randint(0, 5),
+        },
+        "author_id": random.randint(1, 5000),
+        "entities": {
+            "url_items": ["https://t.co/abc"],
+            "hashtag_items": [f"tag{random.randint(0, 500)}" for _ in range(random.randint(0, 3))],
+            "mention_items": [f"user{random.randint(0, 5000)}"],
+        },
+        "media": [],
+        "places": [],
+    }
+
+
+def build_database(path: str, tweet_count: int) -> float:
+    """Fill the database with synthetic tweets
+
+    :rtype: float
+    :returns: Elapsed seconds
+    """
+
+    # tweets are spread over a year
+    start = datetime(2022, 1, 1, tzinfo=timezone.utc)
+    step = timedelta(days=365) / tweet_count
+    started = perf_counter()
+
+    connection = sqlite3.connect(path)
+    cursor = connection.cursor()
+    sqlite_schema.create_tweets_tables(cursor, "search_tweets")
+
+    for tweet_id in range(1, tweet_count + 1):
+        sqlite_schema.upsert_tweet(
+            cursor, synthetic_tweet(tweet_id, start + step * tweet_id), "search_tweets"
+        )
+
+    connection.commit()
+    connection.close()
+
+    return perf_counter() - started
+
+
+def run_queries(path: str, repeat: int) -> None:
+    """Run each query and print the best time"""
+
+    connection = sqlite3.connect(path)
+
+    for name, (query, params) in QUERIES.items():
+        timings = []
+        for _ in range(repeat):
+            started = perf_counter()
+            connection.execute(query, params).fetchall()
+            timings.append(perf_counter() - started)
+
+        print(f"{name:<32} {min(timings) * 1000:10.2f} ms")
+
+    connection.close()
+
+
+if __name__ == "__main__":
+    arg_parser = ArgumentParser()
+    arg_parser.add_argument("--tweets", type=int, default=1_000_000)
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    arg_parser.add_argument("--database", help="Reuse or create database at this path")
+    args = arg_parser.parse_args()
+
+    random.seed(0)
+
+    database = args.database or os.path.join(tempfile.mkdtemp(), "search_tweets.db")
+
+    if not os.path.exists(database):
+        elapsed = build_database(database, args.tweets)
+        print(f"Inserted {args.tweets} tweets in {elapsed:.1f} s ({args.tweets / elapsed:.0f}/s)")
+
+    run_queries(database, args.repeat)
@@ -0,0 +1,211 @@
+"""Synthetic tweepy objects shaped like Twitter API v2 responses"""
+
+import random
+from datetime import datetime, timedelta, timezone
+
+import tweepy
+
+
+START = datetime(2022, 1, 1, tzinfo=timezone.utc)
+WORDS = (
+    "python rust golang async await typing dataclass release bug fix performance "
+    "benchmark database index query memory cpu thread process cache network api"
+).split()
+
+
+def _timestamp(seconds: int) -> str:
+    """API formatted timestamp"""
+
+    return (START + timedelta(seconds=seconds)).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+def user_payload(user_id: int, entities: bool = True) -> dict:
+    """User object payload with public metrics, and entities unless entities is False"""
+
+    payload = {
+        "id": str(user_id),
+        "name": f"User {user_id}",
+        "username": f"user_{user_id}",
+        "created_at": _timestamp(user_id % 100_000_000),
+        "description": f"Building things with #python and #rust, thoughts are mine @employer{user_id % 10}",
+        "entities": {
+            "url": {"urls": [{"url": f"https://t.co/{user_id}"}]},
+            "description": {
+                "hashtags": [{"tag": "python"}, {"tag": "rust"}],
+                "mentions": [{"username": f"employer{user_id % 10}"}],
+            },
+        },
+        "location": "Istanbul, Turkey",
+        "pinned_tweet_id": str(10**18 + user_id),
+        "profile_image_url": f"https://pbs.twimg.com/profile_images/{user_id}/photo.jpg",
+        "protected": False,
+        "public_metrics": {
+            "followers_count": user_id % 10_000,
+            "following_count": user_id % 1_000,
+            "tweet_count": user_id % 50_000,
+            "listed_count": user_id % 100,
+        },
+        "url": f"https://t.co/{user_id}",
+        "verified": user_id % 50 == 0,
+    }
+
+    if not entities:
+        del payload["entities"]
+        payload["url"] = ""
+
+    return payload
+
+
+def synthetic_user(user_id: int, pinned_tweet: bool = True, entities: bool = True) -> tuple:
+    """User data and includes pair as yielded by TwitterAPIService"""
+
+    includes = {"text": "Pinned tweet text #python"} if pinned_tweet else None
+
+    return (tweepy.User(user_payload(user_id, entities)), includes)
+
+
+def synthetic_tweet(
+    tweet_id: int,
+    author: bool = False,
+    media_count: int = 0,
+    place: bool = False,
+    hashtag_count: int = 2,
+    entities: bool = True,
+) -> tuple:
+    """Tweet data and includes pair as yielded by TwitterAPIService
+
+    :type tweet_id: int
+    :param tweet_id: Sequence number of the tweet
+    :type author: bool
+    :param author: Whether author is included, as for search tweets
+    :type media_count: int
+    :param media_count: Number of media attachments
+    :type place: bool
+    :param place: Whether a place is included
+    :type hashtag_count: int
+    :param hashtag_count: Number of hashtags
+    :type entities: bool
+    :param entities: Whether the tweet has hashtags, mentions and URLs
+    """
+
+    rng = random.Random(tweet_id)
+    author_id = 1000 + tweet_id % 5000
+
+    payload = {
+        "id": str(10**18 + tweet_id),
+        "text": " ".join(rng.choices(WORDS, k=rng.randint(5, 30))),
+        "created_at": _timestamp(tweet_id * 30),
+        "source": "Twitter Web App",
+        "lang": "en" if tweet_id % 4 else "tr",
+        "author_id": str(author_id),
+        "public_metrics": {
+            "retweet_count": rng.randint(0, 100),
+            "reply_count": rng.randint(0, 20),
+            "like_count": rng.randint(0, 1000),
+            "quote_count": rng.randint(0, 5),
+        },
+        "entities": {
+            "hashtags": [{"tag": rng.choice(WORDS)} for _ in range(hashtag_count)],
+            "mentions": [{"username": f"user_{rng.randint(1000, 6000)}"}],
+            "urls": [{"url": f"https://t.co/{tweet_id}"}],
+        },
+    }
+
+    if not entities:
+        del payload["entities"]
+
+    includes = {}
+
+    if media_count:
+        includes["media"] = [
+            tweepy.Media(
+                {
+                    "media_key": f"3_{tweet_id}_{index}",
+                    "type": "video" if index % 2 else "photo",
+                    "url": f"https://pbs.twimg.com/media/{tweet_id}_{index}.jpg",
+                    "duration_ms": 15000 if index % 2 else None,
+                    "width": 1280,
+                    "height": 720,
+                    "public_metrics": {"view_count": rng.randint(0, 10000)} if index % 2 else None,
+                }
+            )
+            for index in range(media_count)
+        ]
+
+    if place:
+        includes["places"] = [
+            tweepy.Place(
+                {
+                    "id": "01a9a39529b27f36",
+                    "full_name": "Manhattan, NY",
+                    "country": "United States",
+                    "country_code": "US",
+                    "place_type": "city",
+                    "geo": {"bbox": [-74.026675, 40.683935, -73.910408, 40.877483]},
+                }
+            )
+        ]
+
+    if author:
+        includes["author"] = tweepy.User(user_payload(author_id))
+
+    return (tweepy.Tweet(payload), includes or None)
+
+
+def mixed_tweets(count: int, author: bool = False, offset: int = 0):
+    """Generate tweets with a realistic mix of media, places and entities
+
+    Roughly a quarter of the tweets have media, some with multiple items,
+    and one in twenty has a place.
+    """
+
+    for tweet_id in range(offset, offset + count):
+        yield synthetic_tweet(
+            tweet_id,
+            author=author,
+            media_count=(0, 0, 0, 1, 0, 0, 2, 4)[tweet_id % 8],
+            place=tweet_id % 20 == 0,
+            hashtag_count=tweet_id % 4,
+        )
+
+
+def mixed_users(count: int, offset: int = 0):
+    """Generate users, half of them with a pinned tweet and one in ten without entities"""
+
+    for user_id in range(offset, offset + count):
+        yield synthetic_user(user_id, pinned_tweet=user_id % 2 == 0, entities=user_id % 10 != 9)
+
+
+class SyntheticClient:
+    """tweepy.Client stand-in returning pages of synthetic followers
+
+    Used as the client of a TwitterAPIService, so requests go through the
+    service's request wrapper and tweepy.Paginator without network access.
+
+    :type followers: int
+    :param followers: Number of followers of every user
+    """
+
+    def __init__(self, followers: int) -> None:
+        self._followers = followers
+
+    def get_user(self, username: str, **kwargs) -> tweepy.Response:
+        """Get an unprotected user"""
+
+        return tweepy.Response(tweepy.User(user_payload(1)), {}, [], {})
+
+    def get_users_followers(
+        self, user_id: int, max_results: int = 1000, pagination_token: str = None, **kwargs
+    ) -> tweepy.Response:
+        """Get a page of followers, the next token is the offset of the next page"""
+
+        offset = int(pagination_token or 0)
+        count = min(max_results, self._followers - offset)
+        meta = {"result_count": count}
+
+        if offset + count < self._followers:
+            meta["next_token"] = str(offset + count)
+
+        users = [tweepy.User(user_payload(user_id)) for user_id in range(offset, offset + count)]
+
+        return tweepy.Response(users, {}, [], meta)
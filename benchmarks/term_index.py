@@ -0,0 +1,124 @@
+"""Speed, size and top-K accuracy of exact and sketched term indexes
+
+Hashtags drawn from a Zipf distribution over --vocabulary distinct
+terms are counted on --days days by an exact TermIndex and by sketched
+ones of each --capacities capacity. For each index the terms/sec of
+counting, the seconds of a top-K query over all days and over one day,
+and the size of the saved JSON file are printed. Sketched top terms are
+compared with the exact ones: recall is the share of the exact top K
+they contain, error the largest relative overestimate of their counts.
+
+    python -m benchmarks.term_index --terms 2000000 --capacities 100,1000
+
+--models N also times indexing N synthetic Tweet models, the path of
+tweets streamed from an extractor.
+"""
+
+import os
+import tempfile
+from argparse import ArgumentParser
+from datetime import date, timedelta
+from time import perf_counter
+
+import numpy as np
+
+from analysis.term_index import TermIndex
+from benchmarks.synthetic import mixed_tweets
+from models.tweet import Tweet
+
+
+def generate(count: int, vocabulary: int, days: int, seed: int = 0) -> dict[str, list[str]]:
+    """Generate the hashtags of each day"""
+
+    rng = np.random.default_rng(seed)
+    codes = np.minimum(rng.zipf(1.1, count), vocabulary) - 1
+    names = np.array([f"tag{code}" for code in range(vocabulary)], dtype=object)
+    first = date(2022, 1, 1)
+
+    return {
+        (first + timedelta(days=day)).isoformat(): names[part].tolist()
+        for day, part in enumerate(np.array_split(codes, days))
+    }
+
+
+def compare(exact: list[tuple[str, int]], sketched: list[tuple[str, int]]) -> tuple[float, float]:
+    """Get the recall of the exact top terms and the largest relative overestimate"""
+
+    exact_counts = dict(exact)
+    recall = len(exact_counts.keys() & dict(sketched).keys()) / max(len(exact_counts), 1)
+    error = max(
+        (count / exact_counts[term] - 1 for term, count in sketched if term in exact_counts),
+        default=0.0,
+    )
+
+    return recall, error
+
+
+if __name__ == "__main__":
+    arg_parser = ArgumentParser()
+    arg_parser.add_argument("--terms", type=int, default=1_000_000)
+    arg_parser.add_argument("--vocabulary", type=int, default=200_000)
+    arg_parser.add_argument("--days", type=int, default=30)
+    arg_parser.add_argument("--capacities", default="100,1000", help="Comma separated capacities")
+    arg_parser.add_argument("--top", type=int, default=20)
+    arg_parser.add_argument("--models", type=int, default=0, help="Tweet models to index")
+    args = arg_parser.parse_args()
+
+    days = generate(args.terms, args.vocabulary, args.days)
+    last_day = max(days)
+    capacities = [None] + [int(capacity) for capacity in args.capacities.split(",")]
+    exact_top = exact_day_top = None
+
+    print(f"{args.terms} hashtags, {args.vocabulary} distinct, {args.days} days, top {args.top}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for capacity in capacities:
+            index = TermIndex(capacity)
+
+            started = perf_counter()
+            for day, terms in days.items():
+                index.add_terms("hashtag", day, terms)
+            rate = args.terms / (perf_counter() - started)
+
+            started = perf_counter()
+            top = index.top("hashtag", args.top)
+            top_seconds = perf_counter() - started
+
+            started = perf_counter()
+            day_top = index.top("hashtag", args.top, since=last_day)
+            day_top_seconds = perf_counter() - started
+
+            filename = os.path.join(directory, "index.json")
+            index.save(filename)
+            size = os.path.getsize(filename) / 2**20
+
+            name = f"capacity {capacity}" if capacity else "exact"
+            result = (
+                f"{name:<14} {rate:9.0f} terms/s  top {top_seconds * 1000:8.1f} ms  "
+                f"day top {day_top_seconds * 1000:7.1f} ms  {size:7.2f} MiB"
+            )
+
+            if capacity is None:
+                exact_top, exact_day_top = top, day_top
+            else:
+                recall, error = compare(exact_top, top)
+                day_recall, day_error = compare(exact_day_top, day_top)
+                result += (
+                    f"  recall {recall:4.0%} / {day_recall:4.0%} (day)"
+                    f"  error {error:6.2%} / {day_error:6.2%} (day)"
+                )
+
+            print(result)
+
+    if args.models:
+        tweets = [Tweet(tweet) for tweet in mixed_tweets(args.models)]
+
+        for capacity in capacities:
+            index = TermIndex(capacity)
+
+            started = perf_counter()
+            index.update(tweets, "benchmark")
+            rate = args.models / (perf_counter() - started)
+
+            name = f"capacity {capacity}" if capacity else "exact"
+            print(f"{name:<14} {rate:9.0f} tweets/s")
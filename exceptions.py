@@ -26,6 +26,10 @@ class UnsupportedConfigFileError(TwitterDataExtractorException):
     """Unsupported config file error"""
 
 
+class InvalidConfigurationError(TwitterDataExtractorException):
+    """Invalid configuration setting error"""
+
+
 class UnsupportedReporterError(TwitterDataExtractorException):
     """Unsupported reporter error"""
 
@@ -36,3 +40,11 @@ class MissingShareMailError(TwitterDataExtractorException):
 
 class ExtractorDatabaseError(TwitterDataExtractorException):
     """Database operation error"""
+
+
+class SpreadsheetLimitError(TwitterDataExtractorException):
+    """Spreadsheet cell limit error"""
+
+
+class TermIndexError(TwitterDataExtractorException):
+    """Term index file or operation error"""
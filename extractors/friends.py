@@ -1,9 +1,11 @@
 from typing import Generator
 
+import metrics
 from extractors.user import UserExtractor
 from twitter_api_service import TwitterAPIService
 from models.user import User
-from utils import logger
+from run_config import RunConfig
+from utils import logger, item_logger
 
 
 FriendsData = Generator[User, None, None]
@@ -12,13 +14,13 @@ FriendsData = Generator[User, None, None]
 class Friends(UserExtractor):
     """Extract friends data of a user
 
-    :type cmdline_args: Namespace
-    :param cmdline_args: Command line args returned by ArgumentParser
+    :type run_config: RunConfig
+    :param run_config: Settings of the extraction job
     """
 
-    def __init__(self, cmdline_args: "Namespace") -> None:  # noqa: F821
+    def __init__(self, run_config: RunConfig) -> None:
 
-        super().__init__(cmdline_args)
+        super().__init__(run_config)
 
     def extract_data(self, api_service: TwitterAPIService) -> FriendsData:
         """Extract all friends of the given user
@@ -31,6 +33,9 @@ class Friends(UserExtractor):
 
         logger.info(f"Getting friends for username={self._username}")
 
+        build_seconds = metrics.histogram("model_build_seconds", model="user")
+        extracted_items = metrics.counter("extracted_items_total", extractor="friends")
+
         for friend_data in api_service.get_friends(
             self._username,
             user_fields=self._user_fields,
@@ -38,8 +43,10 @@ class Friends(UserExtractor):
             user_auth=self._is_authorized_user,
         ):
 
-            user_friend = User(friend_data)
+            with build_seconds.time():
+                user_friend = User(friend_data)
+            extracted_items.inc()
 
-            logger.debug(f"User friend data: {user_friend}")
+            item_logger.debug("User friend data: %s", user_friend)
 
             yield user_friend
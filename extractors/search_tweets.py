@@ -1,9 +1,11 @@
 from typing import Generator
 
+import metrics
 from extractors.tweets import TweetsExtractor
 from models.tweet import Tweet
+from run_config import RunConfig
 from twitter_api_service import TwitterAPIService
-from utils import logger
+from utils import logger, item_logger
 
 
 Tweets = Generator[Tweet, None, None]
@@ -12,13 +14,13 @@ Tweets = Generator[Tweet, None, None]
 class SearchTweets(TweetsExtractor):
     """Extract tweets for a search keyword
 
-    :type cmdline_args: Namespace
-    :param cmdline_args: Command line args returned by ArgumentParser
+    :type run_config: RunConfig
+    :param run_config: Settings of the extraction job
     """
 
-    def __init__(self, cmdline_args: "Namespace") -> None:  # noqa: F821
+    def __init__(self, run_config: RunConfig) -> None:
 
-        super().__init__(cmdline_args)
+        super().__init__(run_config)
 
     def extract_data(self, api_service: TwitterAPIService) -> Tweets:
         """Extract tweets for a search keyword
@@ -39,6 +41,9 @@ class SearchTweets(TweetsExtractor):
 
         tweet_counter = 0
 
+        build_seconds = metrics.histogram("model_build_seconds", model="tweet")
+        extracted_items = metrics.counter("extracted_items_total", extractor="search_tweets")
+
         for tweet_data in api_service.get_search_tweets(
             self._search_keyword,
             self._exclude,
@@ -49,9 +54,11 @@ class SearchTweets(TweetsExtractor):
             user_auth=self._is_authorized_user,
         ):
 
-            tweet = Tweet(tweet_data)
+            with build_seconds.time():
+                tweet = Tweet(tweet_data)
+            extracted_items.inc()
 
-            logger.debug(f"Search tweet data: {tweet}")
+            item_logger.debug("Search tweet data: %s", tweet)
 
             tweet_counter += 1
 
@@ -4,7 +4,7 @@ from typing import Generator
 from extractors.base_extractor import BaseExtractor
 from models.tweet import Tweet
 from twitter_api_service import TwitterAPIService
-from utils import get_configuration
+from run_config import RunConfig
 
 
 Tweets = Generator[Tweet, None, None]
@@ -13,24 +13,17 @@ Tweets = Generator[Tweet, None, None]
 class TweetsExtractor(BaseExtractor):
     """Extract tweets data
 
-    :type cmdline_args: Namespace
-    :param cmdline_args: Command line args returned by ArgumentParser
+    :type run_config: RunConfig
+    :param run_config: Settings of the extraction job
     """
 
-    def __init__(self, cmdline_args: "Namespace") -> None:  # noqa: F821
+    def __init__(self, run_config: RunConfig) -> None:
 
-        config = get_configuration(cmdline_args.configfile)
-
-        if cmdline_args.useconfig and config["user"]:
-            self._username = config["user"]
-        elif not cmdline_args.useconfig and cmdline_args.user:
-            self._username = cmdline_args.user
-        else:
-            self._username = None
-
-        self._is_authorized_user = not cmdline_args.forme
+        self._username = run_config.user or None
+        self._is_authorized_user = not run_config.forme
         self._tweet_fields = [
             "attachments",
+            "author_id",
             "created_at",
             "entities",
             "geo",
@@ -41,25 +34,9 @@ class TweetsExtractor(BaseExtractor):
         self._place_fields = ["country", "country_code", "geo", "place_type"]
         self._media_fields = ["url", "duration_ms", "width", "height", "public_metrics"]
         self._expansions = ["geo.place_id", "attachments.media_keys"]
-        self._exclude = (
-            config["excludes"].split(",")
-            if cmdline_args.useconfig
-            else cmdline_args.excludes.split(",")
-        )
-
-        if cmdline_args.useconfig and config["search"]:
-            self._search_keyword = config["search"]
-        elif not cmdline_args.useconfig and cmdline_args.search:
-            self._search_keyword = cmdline_args.search
-        else:
-            self._search_keyword = None
-
-        if cmdline_args.useconfig and config["tweet_count"]:
-            self._tweet_count = config["tweet_count"]
-        elif not cmdline_args.useconfig and cmdline_args.tweet_count:
-            self._tweet_count = cmdline_args.tweet_count
-        else:
-            self._tweet_count = 20
+        self._exclude = run_config.excludes.split(",")
+        self._search_keyword = run_config.search or None
+        self._tweet_count = run_config.tweet_count or 20
 
     @abstractmethod
     def extract_data(self, api_service: TwitterAPIService) -> Tweets:
@@ -1,9 +1,11 @@
 from typing import Generator
 
+import metrics
 from exceptions import MissingUsernameParameterError, UserNotFoundError
 from extractors.base_extractor import BaseExtractor
 from models.user import User
-from utils import logger, get_configuration
+from run_config import RunConfig
+from utils import logger, item_logger
 from twitter_api_service import TwitterAPIService
 
 
@@ -13,16 +15,14 @@ UsersData = Generator[User, None, None]
 class UserExtractor(BaseExtractor):
     """Extract data for a single user
 
-    :type cmdline_args: Namespace
-    :param cmdline_args: Command line args returned by ArgumentParser
+    :type run_config: RunConfig
+    :param run_config: Settings of the extraction job
     """
 
-    def __init__(self, cmdline_args: "Namespace") -> None:  # noqa: F821
+    def __init__(self, run_config: RunConfig) -> None:
 
-        self._config = get_configuration(cmdline_args.configfile)
-
-        self._username = self._config["user"] if cmdline_args.useconfig else cmdline_args.user
-        self._is_authorized_user = not cmdline_args.forme
+        self._username = run_config.user
+        self._is_authorized_user = not run_config.forme
         self._user_fields = [
             "created_at",
             "description",
@@ -65,9 +65,11 @@ class UserExtractor(BaseExtractor):
         if not user[0]:  # response.data
             raise UserNotFoundError(f"User with username={self._username} could not be found!")
 
-        user_data = User(user)
+        with metrics.histogram("model_build_seconds", model="user").time():
+            user_data = User(user)
+        metrics.counter("extracted_items_total", extractor="user").inc()
 
-        logger.debug(f"User data: {user_data}")
+        logger.debug("User data: %s", user_data)
 
         return user_data
 
@@ -75,15 +77,15 @@ class UserExtractor(BaseExtractor):
 class Users(UserExtractor):
     """Extract data for multiple users
 
-    :type cmdline_args: Namespace
-    :param cmdline_args: Command line args returned by ArgumentParser
+    :type run_config: RunConfig
+    :param run_config: Settings of the extraction job
     """
 
-    def __init__(self, cmdline_args: "Namespace") -> None:  # noqa: F821
+    def __init__(self, run_config: RunConfig) -> None:
 
-        super().__init__(cmdline_args)
+        super().__init__(run_config)
 
-        self._usernames = self._config["users"] if cmdline_args.useconfig else cmdline_args.users
+        self._usernames = run_config.users
 
     def extract_data(self, api_service: TwitterAPIService) -> UsersData:
         """Extract data for multiple users
@@ -105,14 +107,19 @@ class Users(UserExtractor):
 
         logger.info(f"Getting data for users: {self._usernames}")
 
+        build_seconds = metrics.histogram("model_build_seconds", model="user")
+        extracted_items = metrics.counter("extracted_items_total", extractor="users")
+
         for user_data in api_service.get_users(
             self._usernames,
             user_fields=self._user_fields,
             expansions=self._expansions,
             user_auth=self._is_authorized_user,
         ):
-            user = User(user_data)
+            with build_seconds.time():
+                user = User(user_data)
+            extracted_items.inc()
 
-            logger.debug(f"User data: {user}")
+            item_logger.debug("User data: %s", user)
 
             yield user
@@ -1,10 +1,12 @@
 from typing import Generator
 
+import metrics
 from exceptions import MissingUsernameParameterError
 from extractors.tweets import TweetsExtractor
 from models.tweet import Tweet
+from run_config import RunConfig
 from twitter_api_service import TwitterAPIService
-from utils import logger
+from utils import logger, item_logger
 
 
 Tweets = Generator[Tweet, None, None]
@@ -13,13 +15,13 @@ Tweets = Generator[Tweet, None, None]
 class UserTweets(TweetsExtractor):
     """Extract tweets of a user
 
-    :type cmdline_args: Namespace
-    :param cmdline_args: Command line args returned by ArgumentParser
+    :type run_config: RunConfig
+    :param run_config: Settings of the extraction job
     """
 
-    def __init__(self, cmdline_args: "Namespace") -> None:  # noqa: F821
+    def __init__(self, run_config: RunConfig) -> None:
 
-        super().__init__(cmdline_args)
+        super().__init__(run_config)
 
     def extract_data(self, api_service: TwitterAPIService) -> Tweets:
         """Extract tweets of a user
@@ -45,6 +47,9 @@ class UserTweets(TweetsExtractor):
 
         tweet_counter = 0
 
+        build_seconds = metrics.histogram("model_build_seconds", model="tweet")
+        extracted_items = metrics.counter("extracted_items_total", extractor="user_tweets")
+
         for tweet_data in api_service.get_user_tweets(
             self._username,
             tweet_fields=self._tweet_fields,
@@ -55,9 +60,11 @@ class UserTweets(TweetsExtractor):
             user_auth=self._is_authorized_user,
         ):
 
-            tweet = Tweet(tweet_data)
+            with build_seconds.time():
+                tweet = Tweet(tweet_data)
+            extracted_items.inc()
 
-            logger.debug(f"User tweet data: {tweet}")
+            item_logger.debug("User tweet data: %s", tweet)
 
             tweet_counter += 1
 
@@ -0,0 +1,97 @@
+from importlib import import_module
+from importlib.metadata import entry_points
+from typing import Optional
+
+
+class Registry:
+    """Classes resolved by name and imported only when selected
+
+    Built-in classes are given as "module:Class" paths, so their modules
+    and third-party dependencies are not imported until the name is used.
+    Classes of other packages are found by the entry points of the group,
+    e.g. in the pyproject.toml of a package providing a reporter:
+
+        [project.entry-points."twitter_data_extractor.reporters"]
+        bigquery = "my_package.bigquery_reporter:BigQueryReporter"
+
+    Built-in names take precedence over entry points with the same name.
+
+    :type group: str
+    :param group: Entry point group of the classes provided by other packages,
+        None to only use the built-in classes
+    :type paths: dict
+    :param paths: "module:Class" paths of the built-in classes by name
+    """
+
+    def __init__(self, group: Optional[str], paths: dict[str, str]) -> None:
+
+        self._group = group
+        self._paths = paths
+        self._entry_points = None
+
+    def get(self, name: str) -> Optional[type]:
+        """Import the class registered with the name
+
+        :type name: str
+        :param name: Registered name
+        :rtype: type
+        :returns: Class, None if the name is not registered
+        """
+
+        if name in self._paths:
+            module_name, class_name = self._paths[name].split(":")
+            return getattr(import_module(module_name), class_name)
+
+        entry_point = self._get_entry_points().get(name)
+
+        return entry_point.load() if entry_point else None
+
+    def names(self) -> list[str]:
+        """Get the registered names
+
+        :rtype: list
+        :returns: Built-in names followed by the names of the entry points
+        """
+
+        return list(self._paths) + [
+            name for name in self._get_entry_points() if name not in self._paths
+        ]
+
+    def _get_entry_points(self) -> dict:
+        """Get the entry points of the group by name, loaded once"""
+
+        if self._entry_points is None:
+            self._entry_points = {
+                entry_point.name: entry_point
+                for entry_point in (entry_points(group=self._group) if self._group else ())
+            }
+
+        return self._entry_points
+
+
+REPORTERS = Registry(
+    "twitter_data_extractor.reporters",
+    {
+        "csv": "reporters.csv_reporter:CsvReporter",
+        "xlsx": "reporters.excel_reporter:ExcelReporter",
+        "gsheets": "reporters.gsheets_reporter:GSheetsReporter",
+        "jsonl": "reporters.jsonl_reporter:JsonlReporter",
+        "parquet": "reporters.parquet_reporter:ParquetReporter",
+        "mongodb": "reporters.mongodb_reporter:MongoDBReporter",
+        "sqlite": "reporters.sqlite_reporter:SQLiteReporter",
+        "duckdb": "reporters.duckdb_reporter:DuckDBReporter",
+    },
+)
+
+# extracted data types are tied to the built-in extractors
+EXTRACTORS = Registry(
+    None,
+    {
+        "user": "extractors.user:UserExtractor",
+        "users": "extractors.user:Users",
+        "friends": "extractors.friends:Friends",
+        "followers": "extractors.followers:Followers",
+        "user_tweets": "extractors.user_tweets:UserTweets",
+        "search_tweets": "extractors.search_tweets:SearchTweets",
+    },
+)
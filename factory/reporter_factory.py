@@ -1,61 +1,152 @@
-from typing import Union
+import os
+from functools import partial
+from typing import Optional, Union
 
 from exceptions import UnsupportedReporterError
+from factory.registry import REPORTERS
 from reporters import file_reporter
 from reporters import database_reporter
-from reporters.csv_reporter import CsvReporter
-from reporters.excel_reporter import ExcelReporter
-from reporters.gsheets_reporter import GSheetsReporter
-from reporters.mongodb_reporter import MongoDBReporter
-from reporters.sqlite_reporter import SQLiteReporter
-from utils import get_configuration, get_extracted_data_type
+from reporters.partitioning import PartitionedReporter
+from run_config import RunConfig
+from utils import logger
+
+
+# output types written to files named with the type as extension
+FILE_EXTENSIONS = ("csv", "xlsx", "jsonl", "parquet")
 
 
 class ReporterFactory:
     """Factory class for reporters"""
 
+    @staticmethod
+    def get_reporters(
+        run_config: RunConfig,
+    ) -> list[Union[file_reporter.FileReporter, database_reporter.DatabaseReporter]]:
+        """Get reporters for the comma separated output types
+
+        If there are multiple output types, the extension of the output file
+        name is replaced by the output type for the file reporters, e.g.
+        results.csv and results.parquet for csv,parquet. Partitioned file
+        outputs get their own partition directories, e.g. results_csv/ and
+        results_parquet/, so their part files and manifests are separate.
+
+        Raises UnsupportedReporterError if an output format is not supported.
+
+        :type run_config: RunConfig
+        :param run_config: Settings of the extraction job
+        :rtype: list
+        :returns: Concrete FileReporter or DatabaseReporter objects
+        """
+
+        output_types = run_config.output_types
+
+        if len(output_types) != len(set(output_types)):
+            raise UnsupportedReporterError("Output types should not be repeated!")
+
+        if len(output_types) == 1:
+            return [ReporterFactory.get_reporter(run_config)]
+
+        root = os.path.splitext(run_config.output_file)[0]
+
+        return [
+            ReporterFactory.get_reporter(
+                run_config.with_output(
+                    output_type,
+                    f"{root}.{output_type}"
+                    if output_type in FILE_EXTENSIONS
+                    else run_config.output_file,
+                ),
+                partition_directory=f"{root}_{output_type}",
+            )
+            for output_type in output_types
+        ]
+
     @staticmethod
     def get_reporter(
-        cmdline_args: "Namespace",
-    ) -> Union[file_reporter.FileReporter, database_reporter.DatabaseReporter]:  # noqa: F821
+        run_config: RunConfig, partition_directory: Optional[str] = None
+    ) -> Union[file_reporter.FileReporter, database_reporter.DatabaseReporter]:
         """Get specific reporter
 
+        Reporter modules are imported only when their output type is
+        selected. Output types of other packages are found by entry points,
+        see the Registry class.
+
         Raises UnsupportedReporterError if output format is not supported.
 
-        :type cmdline_args: Namespace
-        :param cmdline_args: Command line args returned by ArgumentParser
+        :type run_config: RunConfig
+        :param run_config: Settings of the extraction job with a single output type
+        :type partition_directory: str
+        :param partition_directory: Root of the partition directories of a partitioned file output
         :rtype: file_reporter.FileReporter | database_reporter.DatabaseReporter
         :returns: Concrete FileReporter or DatabaseReporter object
         """
 
         reporter = None
 
-        config = get_configuration(cmdline_args.configfile)
-
-        if cmdline_args.useconfig:
-            output_type = config["output_type"]
-            output_file = config["output_file"]
-        else:
-            output_type = cmdline_args.output_type
-            output_file = cmdline_args.output_file
+        output_type = run_config.output_type
+        output_file = run_config.output_file
+        partition_by = run_config.partition_by
+        extracted_data_type = run_config.extracted_data_type
+        reporter_class = REPORTERS.get(output_type)
 
-        extracted_data_type = get_extracted_data_type(cmdline_args)
+        if reporter_class is None:
+            message = f"Unsupported output file! Should be one of {', '.join(REPORTERS.names())}"
+            raise UnsupportedReporterError(message)
 
-        if output_type == "csv":
-            reporter = CsvReporter(output_file, extracted_data_type)
+        if output_type in ("csv", "jsonl"):
+            reporter_factory = partial(
+                reporter_class,
+                extracted_data_type=extracted_data_type,
+                compression=run_config.compression,
+                shard_rows=run_config.shard_rows,
+                shard_bytes=run_config.shard_bytes,
+                append=run_config.append,
+            )
+            if output_type == "csv":
+                reporter_factory = partial(
+                    reporter_factory, format_workers=run_config.format_workers
+                )
         elif output_type == "xlsx":
-            reporter = ExcelReporter(output_file, extracted_data_type)
+            reporter_factory = partial(
+                reporter_class,
+                extracted_data_type=extracted_data_type,
+                rows_per_sheet=run_config.rows_per_sheet,
+                sheets_per_workbook=run_config.sheets_per_workbook,
+                format_workers=run_config.format_workers,
+            )
         elif output_type == "gsheets":
-            share_mail = config["share_mail"] if cmdline_args.useconfig else cmdline_args.share_mail
-            reporter = GSheetsReporter(output_file, extracted_data_type, share_mail)
+            reporter = reporter_class(output_file, extracted_data_type, run_config.share_mail)
+        elif output_type == "parquet":
+            reporter_factory = partial(reporter_class, extracted_data_type=extracted_data_type)
         elif output_type == "mongodb":
-            reporter = MongoDBReporter(extracted_data_type)
+            reporter = reporter_class(
+                extracted_data_type,
+                run_config.db_uri,
+                run_config.write_profile,
+                run_config.metrics_snapshots,
+            )
         elif output_type == "sqlite":
-            reporter = SQLiteReporter(extracted_data_type)
+            reporter = reporter_class(extracted_data_type, partition_by)
+        elif output_type == "duckdb":
+            reporter = reporter_class(extracted_data_type)
+        elif issubclass(reporter_class, file_reporter.FileReporter):
+            reporter = reporter_class(output_file, extracted_data_type)
         else:
-            message = (
-                "Unsupported output file! Should be one of csv, excel, gsheets, mongodb or sqlite"
-            )
-            raise UnsupportedReporterError(message)
+            reporter = reporter_class(extracted_data_type)
+
+        if output_type in FILE_EXTENSIONS:
+            if partition_by:
+                reporter = PartitionedReporter(
+                    output_file,
+                    extracted_data_type,
+                    reporter_factory,
+                    partition_by,
+                    partition_directory,
+                )
+            else:
+                reporter = reporter_factory(output_file)
+
+        elif partition_by and output_type != "sqlite":
+            logger.warning(f"Partitioning is not supported by {output_type} output, ignoring it.")
 
         return reporter
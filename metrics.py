@@ -0,0 +1,401 @@
+import json
+import os
+import threading
+from bisect import bisect_left
+from datetime import datetime, timezone
+from time import perf_counter
+from typing import Optional
+
+from utils import logger
+
+
+# upper bounds of the latency histogram buckets in seconds
+LATENCY_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    300.0,
+    900.0,
+    float("inf"),
+)
+
+DESCRIPTIONS = {
+    "api_requests_total": "API requests by endpoint",
+    "api_request_seconds": "API request time including response parsing by tweepy",
+    "api_http_seconds": "HTTP round trip time of API requests",
+    "api_response_bytes_total": "Bytes of API response bodies",
+    "api_pages_total": "API responses with a page of items",
+    "api_items_total": "Items in API responses",
+    "api_rate_limited_total": "API requests rejected by the rate limit",
+    "rate_limit_wait_seconds": "Time waited for the Twitter API rate limit or Sheets quota",
+    "model_build_seconds": "Time to build a User or Tweet model from API objects",
+    "extracted_items_total": "Users or tweets yielded by extractors",
+    "reporter_save_seconds": "Time spent in Reporter.save",
+    "reporter_wait_seconds_total": "Time a reporter waited for items from extraction",
+    "reported_items_total": "Users or tweets passed to reporters",
+    "write_batch_seconds": "Time to write a batch of rows",
+}
+
+
+class Counter:
+    """Monotonic counter
+
+    :type name: str
+    :param name: Metric name
+    :type labels: dict
+    :param labels: Label values by name
+    """
+
+    def __init__(self, name: str, labels: dict) -> None:
+
+        self.name = name
+        self.labels = labels
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1) -> None:
+        """Increase the counter
+
+        :type amount: float
+        :param amount: Amount to add
+        """
+
+        with self._lock:
+            self.value += amount
+
+
+class Histogram:
+    """Histogram of observed values with fixed buckets
+
+    :type name: str
+    :param name: Metric name
+    :type labels: dict
+    :param labels: Label values by name
+    :type buckets: tuple
+    :param buckets: Sorted upper bounds of the buckets, the last one is infinity
+    """
+
+    def __init__(self, name: str, labels: dict, buckets: tuple = LATENCY_BUCKETS) -> None:
+
+        self.name = name
+        self.labels = labels
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        """Add an observed value
+
+        :type value: float
+        :param value: Observed value
+        """
+
+        index = bisect_left(self.buckets, value)
+
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+            if value < self.min:
+                self.min = value
+            if value > self.max:
+                self.max = value
+
+    def time(self) -> "_Timer":
+        """Context manager observing the seconds spent in its block"""
+
+        return _Timer(self)
+
+    def quantile(self, quantile: float) -> float:
+        """Estimate a quantile by the upper bound of the bucket it falls in
+
+        :type quantile: float
+        :param quantile: Quantile between 0 and 1
+        :rtype: float
+        :returns: Estimated value, within the minimum and maximum observed values
+        """
+
+        rank = quantile * self.count
+        seen = 0
+
+        for upper_bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return max(self.min, min(upper_bound, self.max))
+
+        return self.max
+
+
+class _Timer:
+    """Observe the seconds spent in a with block"""
+
+    def __init__(self, histogram: Histogram) -> None:
+        self._histogram = histogram
+
+    def __enter__(self) -> None:
+        self._started = perf_counter()
+
+    def __exit__(self, *exc_info) -> None:
+        self._histogram.observe(perf_counter() - self._started)
+
+
+class _NullInstrument:
+    """Counter and histogram that ignore the values, used when metrics are disabled"""
+
+    def inc(self, amount: float = 1) -> None:
+        pass
+
+    def observe(self, value: float) -> None:
+        pass
+
+    def time(self) -> "_NullInstrument":
+        return self
+
+    def __enter__(self) -> None:
+        pass
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+
+NULL_INSTRUMENT = _NullInstrument()
+
+
+class MetricsRegistry:
+    """Counters and histograms of a run by name and labels"""
+
+    def __init__(self) -> None:
+
+        self.started_at = datetime.now(timezone.utc)
+        self._started = perf_counter()
+        self._instruments = {}
+        self._lock = threading.Lock()
+
+    def get(self, instrument_class: type, name: str, labels: dict):
+        """Get the instrument with the name and labels, create it if it does not exist"""
+
+        key = (name, tuple(sorted(labels.items())))
+        instrument = self._instruments.get(key)
+
+        if instrument is None:
+            with self._lock:
+                instrument = self._instruments.setdefault(key, instrument_class(name, labels))
+
+        return instrument
+
+    def to_dict(self) -> dict:
+        """Get the run report
+
+        :rtype: dict
+        :returns: Start time, duration, counters and histogram summaries
+        """
+
+        counters = []
+        histograms = []
+
+        for instrument in sorted(self._instruments.values(), key=_sort_key):
+            if isinstance(instrument, Counter):
+                counters.append(
+                    {
+                        "name": instrument.name,
+                        "labels": instrument.labels,
+                        "value": instrument.value,
+                    }
+                )
+            elif instrument.count:
+                histograms.append(
+                    {
+                        "name": instrument.name,
+                        "labels": instrument.labels,
+                        "count": instrument.count,
+                        "sum": instrument.sum,
+                        "mean": instrument.sum / instrument.count,
+                        "min": instrument.min,
+                        "max": instrument.max,
+                        "p50": instrument.quantile(0.5),
+                        "p90": instrument.quantile(0.9),
+                        "p99": instrument.quantile(0.99),
+                    }
+                )
+
+        return {
+            "started_at": self.started_at.isoformat(),
+            "duration_seconds": perf_counter() - self._started,
+            "counters": counters,
+            "histograms": histograms,
+        }
+
+    def to_prometheus(self) -> str:
+        """Get the metrics in the Prometheus text exposition format
+
+        :rtype: str
+        :returns: Metrics text
+        """
+
+        lines = []
+        described = set()
+
+        for instrument in sorted(self._instruments.values(), key=_sort_key):
+            name = f"twitter_extractor_{instrument.name}"
+            is_counter = isinstance(instrument, Counter)
+
+            if name not in described:
+                described.add(name)
+                lines.append(f"# HELP {name} {DESCRIPTIONS.get(instrument.name, instrument.name)}")
+                lines.append(f"# TYPE {name} {'counter' if is_counter else 'histogram'}")
+
+            if is_counter:
+                lines.append(f"{name}{_format_labels(instrument.labels)} {instrument.value}")
+                continue
+
+            cumulative = 0
+            for upper_bound, count in zip(instrument.buckets, instrument.counts):
+                cumulative += count
+                le = "+Inf" if upper_bound == float("inf") else repr(upper_bound)
+                labels = _format_labels({**instrument.labels, "le": le})
+                lines.append(f"{name}_bucket{labels} {cumulative}")
+
+            labels = _format_labels(instrument.labels)
+            lines.append(f"{name}_sum{labels} {instrument.sum}")
+            lines.append(f"{name}_count{labels} {instrument.count}")
+
+        return "\n".join(lines) + "\n"
+
+
+_registry: Optional[MetricsRegistry] = None
+
+
+def enable() -> MetricsRegistry:
+    """Start recording metrics to a new registry
+
+    :rtype: MetricsRegistry
+    :returns: Registry of the recorded metrics
+    """
+
+    global _registry
+    _registry = MetricsRegistry()
+
+    return _registry
+
+
+def disable() -> None:
+    """Stop recording metrics, instruments returned afterwards ignore the values"""
+
+    global _registry
+    _registry = None
+
+
+def enabled() -> bool:
+    """Whether metrics are recorded"""
+
+    return _registry is not None
+
+
+def counter(name: str, **labels: str):
+    """Get a counter of the current registry
+
+    Returns a no-op instrument when metrics are disabled, so call sites do
+    not need to check. Instruments should be fetched once per loop rather
+    than once per item.
+
+    :type name: str
+    :param name: Metric name
+    :rtype: Counter
+    :returns: Counter with the name and labels
+    """
+
+    if _registry is None:
+        return NULL_INSTRUMENT
+
+    return _registry.get(Counter, name, labels)
+
+
+def histogram(name: str, **labels: str):
+    """Get a latency histogram of the current registry
+
+    Returns a no-op instrument when metrics are disabled.
+
+    :type name: str
+    :param name: Metric name
+    :rtype: Histogram
+    :returns: Histogram with the name and labels
+    """
+
+    if _registry is None:
+        return NULL_INSTRUMENT
+
+    return _registry.get(Histogram, name, labels)
+
+
+def write_report(filename: str, **fields) -> None:
+    """Write the JSON run report of the current registry
+
+    :type filename: str
+    :param filename: Report file name
+    :type fields: dict
+    :param fields: Additional report fields, e.g. the job name
+    """
+
+    with open(filename, "w", encoding="utf-8") as file:
+        json.dump({**fields, **_registry.to_dict()}, file, indent=4)
+
+    logger.info(f"Metrics report written to {filename}")
+
+
+def write_textfile(filename: str) -> None:
+    """Write the metrics of the current registry as a Prometheus textfile
+
+    The file is replaced atomically, so the node_exporter textfile
+    collector never reads a partial file.
+
+    :type filename: str
+    :param filename: Textfile name, should end with .prom
+    """
+
+    temporary_filename = f"{filename}.{os.getpid()}.tmp"
+
+    with open(temporary_filename, "w", encoding="utf-8") as file:
+        file.write(_registry.to_prometheus())
+
+    os.replace(temporary_filename, filename)
+
+    logger.info(f"Metrics textfile written to {filename}")
+
+
+def _format_labels(labels: dict) -> str:
+    """Format labels as {name="value",...}"""
+
+    if not labels:
+        return ""
+
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in labels.items()
+    )
+
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def _sort_key(instrument) -> tuple:
+    """Sort instruments by name and labels"""
+
+    return (instrument.name, sorted(instrument.labels.items()))
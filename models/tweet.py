@@ -20,6 +20,7 @@ class Tweet:
         self.data["source"] = self._fields.source
         self.data["language"] = self._fields.lang
         self.data["public_metrics"] = self._fields.public_metrics
+        self.data["author_id"] = self._fields.author_id
 
         self.data["entities"] = defaultdict(dict)
 
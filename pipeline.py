@@ -0,0 +1,272 @@
+import queue
+import signal
+import threading
+from dataclasses import dataclass, field
+from time import perf_counter
+from typing import Any, Iterable, Iterator, Optional
+
+from reporters.reporter import Reporter
+from utils import logger
+
+
+# put on the queues after the last batch
+END_OF_DATA = None
+# seconds to wait on a queue before checking whether the other stages stopped
+POLL_INTERVAL = 0.1
+
+
+@dataclass
+class ReporterTimes:
+    """Seconds spent by a reporter stage
+
+    report is the time spent in the reporter and idle is the time the
+    reporter waited for a batch.
+    """
+
+    report: float = 0.0
+    idle: float = 0.0
+
+
+@dataclass
+class StageTimes:
+    """Seconds spent by the pipeline stages
+
+    extract is the time spent waiting on the extractor (API requests and
+    rate limit waits) and blocked is the time the extractor waited for space
+    in the reporter queues. A long blocked time means a reporter is the
+    bottleneck, long idle times of the reporters mean the extractor is.
+    """
+
+    extract: float = 0.0
+    blocked: float = 0.0
+    items: int = 0
+    batches: int = 0
+    reporters: dict[str, ReporterTimes] = field(default_factory=dict)
+
+
+class _ReporterStage:
+    """Reporter with its own thread and bounded queue of batches"""
+
+    def __init__(self, name: str, reporter: Reporter, queue_size: int) -> None:
+
+        self.name = name
+        self.reporter = reporter
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.done = threading.Event()
+        self.error = None
+        self.times = ReporterTimes()
+
+
+class Pipeline:
+    """Run extraction and reporting in separate threads
+
+    The extractor thread iterates the extracted data and puts batches of
+    items on a bounded queue for each reporter, and each reporter saves the
+    items of the batches on its own thread as they arrive, so API waits and
+    writes overlap, and a slow reporter only holds back the others once its
+    queue is full.
+
+    If a reporter fails, it stops receiving batches while the others go on,
+    and extraction stops when all reporters have failed. If the extractor
+    fails, the items extracted before the error are saved. In both cases the
+    first error is raised from run after all stages have finished.
+
+    On Ctrl-C, extraction stops, the batches in the queues are saved and the
+    reporters finish their output normally. A second Ctrl-C interrupts
+    immediately.
+
+    :type batch_size: int
+    :param batch_size: Number of items in a batch
+    :type queue_size: int
+    :param queue_size: Maximum number of batches waiting to be saved by a reporter
+    """
+
+    def __init__(self, batch_size: int = 1000, queue_size: int = 8) -> None:
+
+        self._batch_size = batch_size
+        self._queue_size = queue_size
+        self._stop = threading.Event()
+        self._stages = []
+        self._extractor_error = None
+
+        self.times = StageTimes()
+
+    def run(self, extracted_data: Iterable[Any], reporters: list[Reporter]) -> StageTimes:
+        """Extract the data and save it with each reporter, wait until all stages are finished
+
+        :type extracted_data: Iterable
+        :param extracted_data: Generator of Users or Tweets returned by the extractor
+        :type reporters: list
+        :param reporters: Reporters to save the data
+        :rtype: StageTimes
+        :returns: Time spent by the stages
+        """
+
+        for index, reporter in enumerate(reporters):
+            name = type(reporter).__name__
+            if name in self.times.reporters:
+                name = f"{name}-{index}"
+
+            stage = _ReporterStage(name, reporter, self._queue_size)
+            self._stages.append(stage)
+            self.times.reporters[name] = stage.times
+
+        threads = [
+            threading.Thread(
+                target=self._run_extractor, args=(extracted_data,), name="extractor", daemon=True
+            )
+        ] + [
+            threading.Thread(target=self._run_reporter, args=(stage,), name=stage.name, daemon=True)
+            for stage in self._stages
+        ]
+
+        previous_handler = signal.signal(signal.SIGINT, self._handle_interrupt)
+
+        try:
+            for thread in threads:
+                thread.start()
+
+            for thread in threads:
+                # joining with a timeout lets the main thread handle signals
+                while thread.is_alive():
+                    thread.join(POLL_INTERVAL)
+
+        finally:
+            signal.signal(signal.SIGINT, previous_handler)
+
+        self._log_times()
+
+        for stage in self._stages:
+            if stage.error is not None:
+                raise stage.error
+
+        if self._extractor_error is not None:
+            raise self._extractor_error
+
+        return self.times
+
+    def _run_extractor(self, extracted_data: Iterable[Any]) -> None:
+        """Iterate the extracted data and put it on the queues in batches
+
+        :type extracted_data: Iterable
+        :param extracted_data: Generator of Users or Tweets
+        """
+
+        items = iter(extracted_data)
+        batch = []
+
+        try:
+            while not self._stop.is_set():
+                started = perf_counter()
+                item = next(items, END_OF_DATA)
+                self.times.extract += perf_counter() - started
+
+                if item is END_OF_DATA:
+                    break
+
+                batch.append(item)
+
+                if len(batch) >= self._batch_size:
+                    self._put(batch)
+                    batch = []
+
+        except BaseException as exp:
+            logger.debug(f"Pipeline extractor failed: {exp!r}")
+            self._extractor_error = exp
+
+        finally:
+            # items extracted before an error are saved too
+            if batch:
+                self._put(batch)
+
+            self._put(END_OF_DATA)
+
+    def _put(self, batch: Optional[list]) -> None:
+        """Put the batch on the queue of each running reporter
+
+        Waits while a queue is full. Stops extraction if all reporters have stopped.
+
+        :type batch: list
+        :param batch: Items or END_OF_DATA
+        """
+
+        started = perf_counter()
+
+        for stage in self._stages:
+            while not stage.done.is_set():
+                try:
+                    stage.queue.put(batch, timeout=POLL_INTERVAL)
+                    break
+                except queue.Full:
+                    pass
+
+        self.times.blocked += perf_counter() - started
+
+        if all(stage.done.is_set() for stage in self._stages):
+            self._stop.set()
+        elif batch is not END_OF_DATA:
+            self.times.items += len(batch)
+            self.times.batches += 1
+
+    def _run_reporter(self, stage: _ReporterStage) -> None:
+        """Save the items of the batches taken from the reporter queue
+
+        :type stage: _ReporterStage
+        :param stage: Reporter stage
+        """
+
+        started = perf_counter()
+
+        try:
+            stage.reporter.save(self._consume(stage))
+
+        except BaseException as exp:
+            logger.error(f"Pipeline reporter {stage.name} failed: {exp}")
+            stage.error = exp
+
+        finally:
+            stage.times.report = perf_counter() - started - stage.times.idle
+            stage.done.set()
+
+    def _consume(self, stage: _ReporterStage) -> Iterator[Any]:
+        """Yield the items of the batches until the end of the data
+
+        :type stage: _ReporterStage
+        :param stage: Reporter stage
+        :rtype: Iterator
+        :returns: Users or Tweets
+        """
+
+        while True:
+            started = perf_counter()
+            batch = stage.queue.get()
+            stage.times.idle += perf_counter() - started
+
+            if batch is END_OF_DATA:
+                return
+
+            yield from batch
+
+    def _handle_interrupt(self, signum: int, frame) -> None:
+        """Stop extraction on the first Ctrl-C, restore the default handler"""
+
+        logger.info("Stopping extraction, saving the data extracted so far...")
+
+        self._stop.set()
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+
+    def _log_times(self) -> None:
+        """Log the time spent by the stages"""
+
+        times = self.times
+
+        logger.info(
+            f"Pipeline: {times.items} items in {times.batches} batches, "
+            f"extract {times.extract:.2f}s (blocked {times.blocked:.2f}s)"
+        )
+
+        for name, reporter_times in times.reporters.items():
+            logger.info(
+                f"Pipeline: {name} report {reporter_times.report:.2f}s "
+                f"(idle {reporter_times.idle:.2f}s)"
+            )
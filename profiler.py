@@ -0,0 +1,307 @@
+import json
+import os
+import sys
+import threading
+import tracemalloc
+from collections import Counter
+from time import perf_counter
+from types import CodeType
+from typing import Optional
+
+from twitter_api_service import TwitterAPIService
+from utils import logger
+
+
+# seconds between stack samples
+SAMPLE_INTERVAL = 0.005
+# frames kept for each allocation traceback
+ALLOCATION_FRAMES = 10
+TOP_ALLOCATIONS = 25
+# seconds between checks for a new peak of traced memory
+PEAK_CHECK_INTERVAL = 1.0
+# allocations by the import system are not reported
+IMPORT_FILTER = tracemalloc.Filter(False, "<frozen importlib.*>", all_frames=True)
+
+# functions sleeping on a rate limit or quota, samples with them on the stack are not profiled
+RATE_LIMIT_FUNCTIONS = {
+    ("twitter_api_service.py", "_wait_for_rate_limit"),
+    ("rate_limiter.py", "acquire"),
+}
+# functions waiting for other threads, samples with them on top of the stack are idle
+IDLE_FUNCTIONS = {
+    ("threading.py", "wait"),
+    ("threading.py", "join"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("queue.py", "put"),
+    ("handlers.py", "dequeue"),
+}
+# stage of a sample, from the innermost frame of the stage packages or modules
+STAGES = (
+    (("tweepy", "requests", "urllib3", "ssl", "socket"), "api"),
+    (("twitter_api_service.py",), "api"),
+    (("models",), "models"),
+    (("extractors",), "extraction"),
+    (("reporters",), "reporting"),
+    (("pipeline.py",), "pipeline"),
+)
+
+
+class Profiler:
+    """Sample the stacks of all threads and trace memory allocations of a run
+
+    Used as a context manager around a job. A background thread samples
+    the stack of every thread each SAMPLE_INTERVAL seconds. Samples of
+    threads sleeping on the Twitter rate limit or the Google Sheets quota
+    and samples of threads waiting for other threads are counted, but not
+    profiled. When the block exits, the directory gets:
+
+    * <thread>.folded: folded stacks of each thread, one "frame;frame count"
+      line per stack, for flamegraph.pl, inferno or speedscope
+    * all.folded: folded stacks of all threads under their thread names
+    * summary.json: samples by thread and stage, idle and rate limit samples,
+      and the seconds slept on the Twitter rate limit
+    * allocations.txt: top allocation sites with their tracebacks at the
+      peak of traced memory and at the end, if allocations are traced
+
+    Tracing allocations with tracemalloc slows Python code down several
+    times, allocation heavy code the most, so the stack samples of such a
+    run show where memory is allocated rather than where time is spent.
+
+    :type directory: str
+    :param directory: Output directory
+    :type api_service: TwitterAPIService
+    :param api_service: Twitter API client of the job, for the rate limit wait time
+    :type trace_allocations: bool
+    :param trace_allocations: Whether memory allocations are traced
+    :type interval: float
+    :param interval: Seconds between stack samples
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        api_service: Optional[TwitterAPIService] = None,
+        trace_allocations: bool = False,
+        interval: float = SAMPLE_INTERVAL,
+    ) -> None:
+
+        self._directory = directory
+        self._api_service = api_service
+        self._trace_allocations = trace_allocations
+        self._interval = interval
+        self._peak_snapshot = None
+        self._peak_memory = 0
+        self._stacks = Counter()
+        self._idle = Counter()
+        self._rate_limited = Counter()
+        self._frame_names = {}
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def __enter__(self) -> "Profiler":
+
+        self._started = perf_counter()
+        self._rate_limit_wait_seconds = self._get_rate_limit_wait_seconds()
+
+        if self._trace_allocations:
+            tracemalloc.start(ALLOCATION_FRAMES)
+
+        self._thread.start()
+
+        logger.info(f"Profiling to {self._directory}...")
+
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+
+        self._stopped.set()
+        self._thread.join()
+
+        os.makedirs(self._directory, exist_ok=True)
+
+        if self._trace_allocations:
+            end_snapshot = tracemalloc.take_snapshot()
+            self._peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            self._write_allocations(end_snapshot)
+
+        self._write_folded_stacks()
+        self._write_summary(perf_counter() - self._started)
+
+    def _run(self) -> None:
+        """Take samples until the profiler is stopped"""
+
+        last_peak_check = perf_counter()
+
+        while not self._stopped.wait(self._interval):
+            self._sample()
+
+            if self._trace_allocations and perf_counter() - last_peak_check >= PEAK_CHECK_INTERVAL:
+                self._check_peak()
+                last_peak_check = perf_counter()
+
+    def _check_peak(self) -> None:
+        """Take a snapshot of the traced allocations if memory use is at a new peak"""
+
+        current, _ = tracemalloc.get_traced_memory()
+
+        if current > self._peak_memory:
+            self._peak_snapshot = tracemalloc.take_snapshot()
+            self._peak_memory = current
+
+    def _sample(self) -> None:
+        """Count the current stack of every thread except the profiler's"""
+
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == self._thread.ident:
+                continue
+
+            thread_name = thread_names.get(thread_id, str(thread_id))
+            stack = []
+
+            while frame is not None:
+                stack.append(frame.f_code)
+                frame = frame.f_back
+
+            if any(self._get_function(code) in RATE_LIMIT_FUNCTIONS for code in stack):
+                self._rate_limited[thread_name] += 1
+            elif self._get_function(stack[0]) in IDLE_FUNCTIONS:
+                self._idle[thread_name] += 1
+            else:
+                # stacks are folded root first
+                self._stacks[(thread_name, tuple(reversed(stack)))] += 1
+
+    def _get_function(self, code: CodeType) -> tuple[str, str]:
+        """Get the file name and function name of the code"""
+
+        return (os.path.basename(code.co_filename), code.co_name)
+
+    def _get_frame_name(self, code: CodeType) -> str:
+        """Get frame name for the folded stacks, like save (reporter.py:54)"""
+
+        name = self._frame_names.get(code)
+
+        if name is None:
+            filename = os.path.basename(code.co_filename)
+            name = f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(";", ":")
+            self._frame_names[code] = name
+
+        return name
+
+    def _get_stage(self, stack: tuple) -> str:
+        """Get the stage of the innermost frame in a stage package or module"""
+
+        for code in reversed(stack):
+            path = code.co_filename.split(os.sep)
+
+            for names, stage in STAGES:
+                if any(name in path for name in names):
+                    return stage
+
+        return "other"
+
+    def _write_folded_stacks(self) -> None:
+        """Write folded stacks of each thread and of all threads"""
+
+        files = {}
+
+        try:
+            all_file = files["all"] = open(
+                os.path.join(self._directory, "all.folded"), "w", encoding="utf-8"
+            )
+
+            for (thread_name, stack), count in self._stacks.most_common():
+                if thread_name not in files:
+                    filename = f"{thread_name.replace(os.sep, '_')}.folded"
+                    files[thread_name] = open(
+                        os.path.join(self._directory, filename), "w", encoding="utf-8"
+                    )
+
+                folded = ";".join(self._get_frame_name(code) for code in stack)
+                files[thread_name].write(f"{folded} {count}\n")
+                all_file.write(f"{thread_name};{folded} {count}\n")
+
+        finally:
+            for file in files.values():
+                file.close()
+
+    def _write_allocations(self, end_snapshot: tracemalloc.Snapshot) -> None:
+        """Write the top allocation sites at the memory peak and at the end
+
+        :type end_snapshot: tracemalloc.Snapshot
+        :param end_snapshot: Snapshot taken when the job finished
+        """
+
+        snapshots = (("peak", self._peak_snapshot), ("end of the job", end_snapshot))
+
+        with open(os.path.join(self._directory, "allocations.txt"), "w", encoding="utf-8") as file:
+            file.write(f"Peak traced memory: {self._peak_memory / 1024:.1f} KiB\n")
+
+            for title, snapshot in snapshots:
+                if snapshot is None:
+                    continue
+
+                statistics = snapshot.filter_traces((IMPORT_FILTER,)).statistics("traceback")
+                total = sum(statistic.size for statistic in statistics)
+
+                file.write(f"\n=== Allocated at the {title}: {total / 1024:.1f} KiB ===\n")
+
+                for rank, statistic in enumerate(statistics[:TOP_ALLOCATIONS], start=1):
+                    file.write(
+                        f"\n#{rank}: {statistic.size / 1024:.1f} KiB in {statistic.count} blocks\n"
+                    )
+                    for line in statistic.traceback.format(most_recent_first=True):
+                        file.write(f"{line}\n")
+
+    def _write_summary(self, duration: float) -> None:
+        """Write the sample counts and log them
+
+        :type duration: float
+        :param duration: Seconds the profiler ran
+        """
+
+        threads = {}
+        stages = Counter()
+
+        for (thread_name, stack), count in self._stacks.items():
+            threads[thread_name] = threads.get(thread_name, 0) + count
+            stages[self._get_stage(stack)] += count
+
+        rate_limit_wait_seconds = (
+            self._get_rate_limit_wait_seconds() - self._rate_limit_wait_seconds
+        )
+
+        summary = {
+            "duration_seconds": duration,
+            "sample_interval_seconds": self._interval,
+            "samples": dict(sorted(threads.items())),
+            "stages": dict(stages.most_common()),
+            "idle_samples": dict(sorted(self._idle.items())),
+            "rate_limit_samples": dict(sorted(self._rate_limited.items())),
+            "rate_limit_wait_seconds": rate_limit_wait_seconds,
+            "peak_memory_bytes": self._peak_memory,
+        }
+
+        with open(os.path.join(self._directory, "summary.json"), "w", encoding="utf-8") as file:
+            json.dump(summary, file, indent=4)
+
+        busy = sum(stages.values()) or 1
+        stage_shares = ", ".join(
+            f"{stage} {count / busy:.0%}" for stage, count in stages.most_common()
+        )
+
+        logger.info(
+            f"Profiled {duration:.1f}s in {sum(stages.values())} samples ({stage_shares}), "
+            f"{sum(self._rate_limited.values())} samples in rate limit waits "
+            f"({rate_limit_wait_seconds:.1f}s slept on the Twitter rate limit) excluded"
+        )
+        logger.info(f"Profile written to {self._directory}")
+
+    def _get_rate_limit_wait_seconds(self) -> float:
+        """Get the seconds the API service slept on rate limits"""
+
+        return self._api_service.rate_limit_wait_seconds if self._api_service else 0.0
@@ -0,0 +1,61 @@
+import time
+from threading import Lock
+from typing import Callable, Optional
+
+
+class TokenBucket:
+    """Token bucket rate limiter
+
+    Tokens are refilled continuously at the given rate up to the capacity,
+    so short bursts are allowed while the average rate stays under the quota.
+
+    :type rate_per_minute: float
+    :param rate_per_minute: Number of tokens added per minute
+    :type capacity: int
+    :param capacity: Maximum number of tokens, equals to rate_per_minute if not given
+    :type clock: Callable
+    :param clock: Monotonic clock returning seconds
+    :type sleep: Callable
+    :param sleep: Function to sleep for the given seconds
+    """
+
+    def __init__(
+        self,
+        rate_per_minute: float,
+        capacity: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+
+        self._rate = rate_per_minute / 60
+        self._capacity = capacity or rate_per_minute
+        self._tokens = self._capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._last_refill = clock()
+        self._lock = Lock()
+
+        self.waited_seconds = 0.0
+
+    def acquire(self, tokens: int = 1) -> None:
+        """Take tokens from the bucket, wait until they are available
+
+        :type tokens: int
+        :param tokens: Number of tokens to take
+        """
+
+        with self._lock:
+            while True:
+                now = self._clock()
+                self._tokens = min(
+                    self._capacity, self._tokens + (now - self._last_refill) * self._rate
+                )
+                self._last_refill = now
+
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+
+                wait_seconds = (tokens - self._tokens) / self._rate
+                self.waited_seconds += wait_seconds
+                self._sleep(wait_seconds)
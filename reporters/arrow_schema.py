@@ -0,0 +1,211 @@
+from itertools import islice
+from typing import Iterable, Iterator, Optional
+
+import pyarrow as pa
+
+from models.user import User
+from utils import get_entity_items
+
+
+USER_METRICS = ("followers_count", "following_count", "tweet_count", "listed_count")
+TWEET_METRICS = ("retweet_count", "reply_count", "like_count", "quote_count")
+
+TIMESTAMP = pa.timestamp("ms", tz="UTC")
+
+USER_FIELDS = [
+    pa.field("id", pa.int64(), nullable=False),
+    pa.field("username", pa.string()),
+    pa.field("name", pa.string()),
+    pa.field("created_at", TIMESTAMP),
+    pa.field("description", pa.string()),
+    pa.field("location", pa.string()),
+    pa.field("pinned_tweet_id", pa.int64()),
+    pa.field("pinned_tweet_text", pa.string()),
+    pa.field("profile_image_url", pa.string()),
+    pa.field("protected", pa.bool_()),
+    pa.field("url", pa.string()),
+    pa.field("verified", pa.bool_()),
+    pa.field("urls", pa.list_(pa.string())),
+    pa.field("hashtags", pa.list_(pa.string())),
+    pa.field("mentions", pa.list_(pa.string())),
+] + [pa.field(metric, pa.int64()) for metric in USER_METRICS]
+
+MEDIA_TYPE = pa.struct(
+    [
+        pa.field("media_key", pa.string()),
+        pa.field("type", pa.string()),
+        pa.field("url", pa.string()),
+        pa.field("duration_ms", pa.int64()),
+        pa.field("width", pa.int64()),
+        pa.field("height", pa.int64()),
+        pa.field("view_count", pa.int64()),
+    ]
+)
+
+PLACE_TYPE = pa.struct(
+    [
+        pa.field("id", pa.string()),
+        pa.field("full_name", pa.string()),
+        pa.field("country", pa.string()),
+        pa.field("country_code", pa.string()),
+        pa.field("place_type", pa.string()),
+        pa.field("bbox", pa.list_(pa.float64())),
+    ]
+)
+
+USER_SCHEMA = pa.schema(USER_FIELDS)
+
+TWEET_SCHEMA = pa.schema(
+    [
+        pa.field("id", pa.int64(), nullable=False),
+        pa.field("text", pa.string()),
+        pa.field("created_at", TIMESTAMP),
+        pa.field("source", pa.string()),
+        pa.field("language", pa.string()),
+        pa.field("author_id", pa.int64()),
+    ]
+    + [pa.field(metric, pa.int64()) for metric in TWEET_METRICS]
+    + [
+        pa.field("urls", pa.list_(pa.string())),
+        pa.field("hashtags", pa.list_(pa.string())),
+        pa.field("mentions", pa.list_(pa.string())),
+        pa.field("media", pa.list_(MEDIA_TYPE)),
+        pa.field("places", pa.list_(PLACE_TYPE)),
+        # only search tweets have the author
+        pa.field("author", pa.struct(USER_FIELDS)),
+    ]
+)
+
+
+def user_record(data: dict) -> dict:
+    """Convert user data to a record of USER_SCHEMA
+
+    :type data: dict
+    :param data: Data dictionary for the User
+    :rtype: dict
+    :returns: Column values by name
+    """
+
+    metrics = data["public_metrics"] or {}
+    entities = data["entities"]
+    pinned_tweet_id = data["pinned_tweet_id"]
+
+    record = {
+        "id": int(data["id"]),
+        "username": data["username"],
+        "name": data["name"],
+        "created_at": data["created_at"],
+        "description": data["description"],
+        "location": data["location"],
+        "pinned_tweet_id": (
+            int(pinned_tweet_id) if pinned_tweet_id and pinned_tweet_id != "None" else None
+        ),
+        "pinned_tweet_text": data["pinned_tweet_text"] or None,
+        "profile_image_url": data["profile_image_url"],
+        "protected": data["protected"],
+        "url": data["url"],
+        "verified": data["verified"],
+        "urls": get_entity_items(entities, "url_items"),
+        "hashtags": get_entity_items(entities, "hashtag_items"),
+        "mentions": get_entity_items(entities, "mention_items"),
+    }
+
+    for metric in USER_METRICS:
+        record[metric] = metrics.get(metric)
+
+    return record
+
+
+def tweet_record(data: dict) -> dict:
+    """Convert tweet data to a record of TWEET_SCHEMA
+
+    :type data: dict
+    :param data: Data dictionary for the Tweet
+    :rtype: dict
+    :returns: Column values by name
+    """
+
+    metrics = data["public_metrics"] or {}
+    entities = data["entities"]
+    author_id = data.get("author_id")
+    author = None
+
+    if "author" in data:
+        author = user_record(User((data["author"], None)).data)
+        author_id = author["id"]
+
+    record = {
+        "id": int(data["id"]),
+        "text": data["text"],
+        "created_at": data["created_at"],
+        "source": data["source"],
+        "language": data["language"],
+        "author_id": int(author_id) if author_id else None,
+        "urls": get_entity_items(entities, "url_items"),
+        "hashtags": get_entity_items(entities, "hashtag_items"),
+        "mentions": get_entity_items(entities, "mention_items"),
+        "media": [_media_record(media) for media in data["media"]],
+        "places": [_place_record(place) for place in data["places"]],
+        "author": author,
+    }
+
+    for metric in TWEET_METRICS:
+        record[metric] = metrics.get(metric)
+
+    return record
+
+
+def record_batches(
+    records: Iterable[dict], schema: pa.Schema, batch_size: int, unique_key: Optional[str] = None
+) -> Iterator[pa.RecordBatch]:
+    """Group records into record batches
+
+    Only one batch of records is kept in memory at a time. If unique_key
+    is given, only the last record of each key is kept in a batch.
+
+    :type records: Iterable
+    :param records: Records of the schema
+    :type schema: pa.Schema
+    :param schema: Schema of the batches
+    :type batch_size: int
+    :param batch_size: Maximum number of rows in a batch
+    :type unique_key: str
+    :param unique_key: Field to remove duplicate records in a batch by
+    :rtype: Iterator
+    :returns: Record batches
+    """
+
+    records = iter(records)
+
+    while batch := list(islice(records, batch_size)):
+        if unique_key:
+            batch = list({record[unique_key]: record for record in batch}.values())
+
+        yield pa.RecordBatch.from_pylist(batch, schema=schema)
+
+
+def _media_record(media: "tweepy.Media") -> dict:  # noqa: F821
+    """Convert media attachment to a MEDIA_TYPE value"""
+
+    return {
+        "media_key": media["media_key"],
+        "type": media["type"],
+        "url": media["url"],
+        "duration_ms": media["duration_ms"],
+        "width": media["width"],
+        "height": media["height"],
+        "view_count": (media["public_metrics"] or {}).get("view_count"),
+    }
+
+
+def _place_record(place: "tweepy.Place") -> dict:  # noqa: F821
+    """Convert place to a PLACE_TYPE value"""
+
+    return {
+        "id": place["id"],
+        "full_name": place["full_name"],
+        "country": place["country"],
+        "country_code": place["country_code"],
+        "place_type": place["place_type"],
+        "bbox": place["geo"]["bbox"] if place["geo"] else None,
+    }
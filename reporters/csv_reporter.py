@@ -1,9 +1,12 @@
 import csv
-from typing import Generator, Union
+import io
+from typing import Generator, Iterable, Optional, Union
 
 from models.user import User
 from models.tweet import Tweet
 from reporters.file_reporter import FileReporter
+from reporters.row_serializers import get_row_serializer
+from reporters.output_stream import OutputStream
 from utils import logger, ExtractedDataType
 
 
@@ -15,15 +18,43 @@ Tweets = Generator[Tweet, None, None]
 class CsvReporter(FileReporter):
     """CSV report generator
 
+    Rows are written through an OutputStream, which can compress the output
+    with gzip or zstd, split it into shards by row count or size, and append
+    to the output of a previous run.
+
     :type filename: str
     :param filename: Name of the output file
     :type extracted_data_type: ExtractedDataType
     :param extracted_data_type: Enum value for the extracted data type
+    :type compression: str
+    :param compression: gzip, zstd or None for plain text
+    :type shard_rows: int
+    :param shard_rows: Maximum number of rows in a shard
+    :type shard_bytes: int
+    :param shard_bytes: Maximum size of a shard in bytes
+    :type append: bool
+    :param append: Whether to append to the existing output
+    :type format_workers: int
+    :param format_workers: Number of processes formatting rows
     """
 
-    def __init__(self, filename: str, extracted_data_type: ExtractedDataType) -> None:
+    def __init__(
+        self,
+        filename: str,
+        extracted_data_type: ExtractedDataType,
+        compression: Optional[str] = None,
+        shard_rows: Optional[int] = None,
+        shard_bytes: Optional[int] = None,
+        append: Optional[bool] = False,
+        format_workers: Optional[int] = None,
+    ) -> None:
+
+        super().__init__(filename, extracted_data_type, format_workers)
 
-        super().__init__(filename, extracted_data_type)
+        self._compression = compression
+        self._shard_rows = shard_rows
+        self._shard_bytes = shard_bytes
+        self._append = append
 
     def _save_user_data(self, extracted_data: User) -> None:
         """Save single user data
@@ -36,13 +67,9 @@ class CsvReporter(FileReporter):
 
         logger.info(extracted_data)
 
-        data = extracted_data.data
+        serialize = get_row_serializer("user", self._user_data_header)
 
-        with open(self._filename, "w", newline="") as csvfile:
-            writer = csv.writer(csvfile, delimiter=",", quotechar='"', quoting=csv.QUOTE_MINIMAL)
-
-            writer.writerow(self._user_data_header)
-            writer.writerow(FileReporter._get_user_row_data(data))
+        self._save_rows(self._user_data_header, [serialize(extracted_data.data)])
 
     def _save_users_data(
         self, extracted_data: Union[list[User], Union[Friends, Followers]]
@@ -60,13 +87,7 @@ class CsvReporter(FileReporter):
         else:
             logger.debug(f"Saving {'friends' if is_friends_data else 'followers'} data...")
 
-        with open(self._filename, "w", newline="") as csvfile:
-            writer = csv.writer(csvfile, delimiter=",", quotechar='"', quoting=csv.QUOTE_MINIMAL)
-
-            writer.writerow(self._user_data_header)
-
-            for user_data_item in extracted_data:
-                writer.writerow(CsvReporter._get_user_row_data(user_data_item.data))
+        self._save_models("user", self._user_data_header, extracted_data)
 
     def _save_tweets_data(self, extracted_data: Tweets) -> None:
         """Save tweets data
@@ -80,10 +101,79 @@ class CsvReporter(FileReporter):
         if self._extracted_data_type == ExtractedDataType.USER_TWEETS:
             self._tweet_data_header.remove("Author")
 
-        with open(self._filename, "w", newline="") as csvfile:
-            writer = csv.writer(csvfile, delimiter=",", quotechar='"', quoting=csv.QUOTE_MINIMAL)
+        self._save_models("tweet", self._tweet_data_header, extracted_data)
+
+    def _save_models(self, data_type: str, header: list[str], models: Iterable) -> None:
+        """Format the rows of Users or Tweets and write them
+
+        Rows formatted in worker processes are also encoded as CSV lines
+        there, so this process only writes them.
+
+        :type data_type: str
+        :param data_type: user or tweet
+        :type header: list
+        :param header: Column names
+        :type models: Iterable
+        :param models: User or Tweet objects
+        """
+
+        if self._format_workers:
+            self._save_rows(header, self._format_rows(data_type, header, models, encode_row), True)
+        else:
+            self._save_rows(header, self._format_rows(data_type, header, models))
+
+    def _save_rows(
+        self, header: list[str], rows: Iterable[Union[list, str]], encoded: bool = False
+    ) -> None:
+        """Write header and rows to the output stream
+
+        :type header: list
+        :param header: Column names
+        :type rows: Iterable
+        :param rows: Row values, or CSV lines if encoded
+        :type encoded: bool
+        :param encoded: Whether the rows are encoded with encode_row
+        """
+
+        header_line = io.StringIO()
+        csv.writer(header_line).writerow(header)
+
+        with OutputStream(
+            self._filename,
+            compression=self._compression,
+            shard_rows=self._shard_rows,
+            shard_bytes=self._shard_bytes,
+            append=self._append,
+            header=header_line.getvalue(),
+        ) as output:
+            if encoded:
+                for line in rows:
+                    output.write(line)
+            else:
+                # the writer makes a single write call per row
+                writer = csv.writer(output, delimiter=",", quotechar='"', quoting=csv.QUOTE_MINIMAL)
+                writer.writerows(rows)
+
+        self.filenames = output.filenames
+        logger.debug(f"Wrote {output.rows} rows to {', '.join(output.filenames)}")
+
+
+# buffer and writer reused by encode_row, each worker process has its own
+_line_buffer = io.StringIO()
+_line_writer = csv.writer(_line_buffer, delimiter=",", quotechar='"', quoting=csv.QUOTE_MINIMAL)
+
+
+def encode_row(row: tuple) -> str:
+    """Encode a row as a CSV line, as CsvReporter writes it
+
+    :type row: tuple
+    :param row: Row values
+    :rtype: str
+    :returns: CSV line with the line terminator
+    """
 
-            writer.writerow(self._tweet_data_header)
+    _line_buffer.seek(0)
+    _line_buffer.truncate()
+    _line_writer.writerow(row)
 
-            for tweet_data_item in extracted_data:
-                writer.writerow(CsvReporter._get_tweet_row_data(tweet_data_item.data))
+    return _line_buffer.getvalue()
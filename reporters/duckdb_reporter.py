@@ -0,0 +1,236 @@
+from typing import Generator, Iterable
+
+import duckdb
+import pyarrow as pa
+
+import metrics
+from exceptions import ExtractorDatabaseError
+from models.user import User
+from models.tweet import Tweet
+from reporters import arrow_schema
+from reporters.database_reporter import DatabaseReporter
+from utils import ExtractedDataType, logger
+
+Friends = Generator[User, None, None]
+Followers = Generator[User, None, None]
+Tweets = Generator[Tweet, None, None]
+
+DB_FILE = "twitter_data.duckdb"
+
+# analytical views over the tweets of both tweet tables
+VIEWS = {
+    "tweets": """
+        SELECT 'user_tweets' AS source, * FROM user_tweets
+        UNION ALL
+        SELECT 'search_tweets' AS source, * FROM search_tweets
+    """,
+    "hashtag_counts": """
+        SELECT lower(hashtag) AS hashtag, count(*) AS tweets
+        FROM (SELECT unnest(hashtags) AS hashtag FROM tweets)
+        GROUP BY 1
+        ORDER BY tweets DESC
+    """,
+    "engagement_by_day": """
+        SELECT
+            CAST(created_at AT TIME ZONE 'UTC' AS DATE) AS day,
+            count(*) AS tweets,
+            sum(like_count) AS likes,
+            sum(retweet_count) AS retweets,
+            sum(reply_count) AS replies,
+            sum(quote_count) AS quotes,
+            avg(like_count + retweet_count + reply_count + quote_count) AS avg_engagement
+        FROM tweets
+        GROUP BY 1
+        ORDER BY 1
+    """,
+    "top_mentions": """
+        SELECT lower(username) AS username, count(*) AS mentions
+        FROM (SELECT unnest(mentions) AS username FROM tweets)
+        GROUP BY 1
+        ORDER BY mentions DESC
+    """,
+}
+
+
+class DuckDBReporter(DatabaseReporter):
+    """DuckDB database reporter
+
+    Users are saved to the users table, tweets to the user_tweets or
+    search_tweets tables of twitter_data.duckdb with the typed columns of
+    the arrow_schema module. Rows are inserted in Arrow record batches of
+    BATCH_SIZE rows, and existing rows with the same id are replaced.
+
+    The hashtag_counts, engagement_by_day and top_mentions views aggregate
+    the tweets of both tweet tables.
+
+    The database stays open for further saves until close is called.
+
+    Raises ExtractorDatabaseError if the database could not be opened.
+
+    :type extracted_data_type: ExtractedDataType
+    :param extracted_data_type: Enum value for the extracted data type
+    """
+
+    BATCH_SIZE = 100_000
+
+    def __init__(self, extracted_data_type: ExtractedDataType) -> None:
+        super().__init__(extracted_data_type)
+
+        try:
+            self._db = duckdb.connect(DB_FILE)
+            self._create_db_tables()
+
+        except duckdb.Error as exp:
+            raise ExtractorDatabaseError(f"Failed to open {DB_FILE}! {exp}") from exp
+
+        # only used for logging
+        self._filename = f"DuckDB Database: {DB_FILE}"
+
+    def _save_user_data(self, extracted_data: User) -> None:
+        """Save single user data
+
+        :type extracted_data: User
+        :param extracted_data: User object
+        """
+
+        logger.info("Saving user data...")
+
+        self._filename += ", table: users"
+
+        logger.info(extracted_data)
+
+        self._insert_records(
+            "users", arrow_schema.USER_SCHEMA, [arrow_schema.user_record(extracted_data.data)]
+        )
+
+    def _save_users_data(self, extracted_data: list[User]) -> None:
+        """Save users/friends/followers data
+
+        :type extracted_data: list
+        :param extracted_data: List of Users(users/friends/followers)
+        """
+
+        self._filename += ", table: users"
+
+        is_friends_data = self._extracted_data_type == ExtractedDataType.FRIENDS
+
+        if self._extracted_data_type == ExtractedDataType.USERS:
+            logger.debug("Saving users data...")
+        else:
+            logger.debug(f"Saving {'friends' if is_friends_data else 'followers'} data...")
+
+        self._insert_records(
+            "users",
+            arrow_schema.USER_SCHEMA,
+            (arrow_schema.user_record(user_data_item.data) for user_data_item in extracted_data),
+        )
+
+    def _save_tweets_data(self, extracted_data: list[Tweet]) -> None:
+        """Save tweets data
+
+        Use user_tweets table if extracted data type is user tweets,
+        search_tweets table otherwise.
+
+        :type extracted_data: list
+        :param extracted_data: List of Tweets
+        """
+
+        logger.debug("Saving tweets data...")
+
+        if self._extracted_data_type == ExtractedDataType.USER_TWEETS:
+            table = "user_tweets"
+        else:
+            table = "search_tweets"
+
+        self._filename += f", table: {table}"
+
+        self._insert_records(
+            table,
+            arrow_schema.TWEET_SCHEMA,
+            (arrow_schema.tweet_record(tweet_data_item.data) for tweet_data_item in extracted_data),
+        )
+
+    def _insert_records(self, table: str, schema: pa.Schema, records: Iterable[dict]) -> None:
+        """Insert records to the table in record batches
+
+        Raises ExtractorDatabaseError if an error occurs
+        during the save operation.
+
+        :type table: str
+        :param table: Name of the table
+        :type schema: pa.Schema
+        :param schema: Schema of the records
+        :type records: Iterable
+        :param records: Records of the schema
+        """
+
+        rows = 0
+
+        try:
+            for batch in arrow_schema.record_batches(
+                records, schema, self.BATCH_SIZE, unique_key="id"
+            ):
+                self._insert_batch(table, batch)
+
+                rows += batch.num_rows
+                logger.debug(f"Inserted {rows} rows to {table}.")
+
+        # records that don't fit the schema fail with Arrow errors before they are inserted
+        except (duckdb.Error, pa.ArrowException) as exp:
+            raise ExtractorDatabaseError(exp) from exp
+
+        logger.info(f"Saved {rows} rows to {table}.")
+
+    def close(self) -> None:
+        """Close the database"""
+
+        self._db.close()
+
+    def _insert_batch(self, table: str, batch: pa.RecordBatch) -> None:
+        """Replace rows of the table with the rows of the batch in a transaction
+
+        Deleting the existing rows before a plain insert is faster than
+        INSERT OR REPLACE for wide rows with nested columns.
+
+        :type table: str
+        :param table: Name of the table
+        :type batch: pa.RecordBatch
+        :param batch: Record batch with unique ids
+        """
+
+        self._db.register("batch", batch)
+
+        try:
+            with metrics.histogram("write_batch_seconds", reporter="DuckDBReporter").time():
+                self._db.execute("BEGIN TRANSACTION")
+                self._db.execute(f"DELETE FROM {table} WHERE id IN (SELECT id FROM batch)")
+                self._db.execute(f"INSERT INTO {table} SELECT * FROM batch")
+                self._db.execute("COMMIT")
+
+        except duckdb.Error:
+            self._db.execute("ROLLBACK")
+            raise
+
+        finally:
+            self._db.unregister("batch")
+
+    def _create_db_tables(self) -> None:
+        """Create tables with id primary keys and the analytical views"""
+
+        for table, schema in (
+            ("users", arrow_schema.USER_SCHEMA),
+            ("user_tweets", arrow_schema.TWEET_SCHEMA),
+            ("search_tweets", arrow_schema.TWEET_SCHEMA),
+        ):
+            exists = self._db.execute(
+                "SELECT count(*) FROM information_schema.tables WHERE table_name = ?", [table]
+            ).fetchone()[0]
+
+            if not exists:
+                self._db.register("empty", schema.empty_table())
+                self._db.execute(f"CREATE TABLE {table} AS SELECT * FROM empty WITH NO DATA")
+                self._db.execute(f"ALTER TABLE {table} ADD PRIMARY KEY (id)")
+                self._db.unregister("empty")
+
+        for view, query in VIEWS.items():
+            self._db.execute(f"CREATE OR REPLACE VIEW {view} AS {query}")
@@ -1,34 +1,69 @@
-from string import ascii_uppercase
+import json
+import os
+from itertools import chain, islice
+from typing import Iterable, Optional
 
 import openpyxl
 from openpyxl.styles import Font
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
-from openpyxl.utils.exceptions import IllegalCharacterError
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet._write_only import WriteOnlyWorksheet
 
 from models.user import User
 from models.tweet import Tweet
 from reporters.file_reporter import FileReporter
+from reporters.row_serializers import get_row_serializer
 from utils import logger, ExtractedDataType
 
 
 MAX_ROWS_IN_SHEET = 1048576
+# data rows of a full worksheet, the first row is the header
+MAX_DATA_ROWS_IN_SHEET = MAX_ROWS_IN_SHEET - 1
+# number of rows to compute column widths from
+WIDTH_SAMPLE_ROWS = 100
+MAX_COLUMN_WIDTH = 255
 
 
 class ExcelReporter(FileReporter):
     """Excel report generator
 
+    Rows are streamed to the file with a write-only workbook, so memory use
+    does not depend on the number of rows. Column widths are computed from
+    the first rows before they are written.
+
+    A new worksheet is started every rows_per_sheet rows, and if
+    sheets_per_workbook is given, a new workbook file (results_002.xlsx,
+    results_003.xlsx, ...) every sheets_per_workbook worksheets. When rows
+    are split, a manifest (results_manifest.json) lists the file, worksheet
+    and row range of each part.
+
     :type filename: str
     :param filename: Name of the output file
     :type extracted_data_type: ExtractedDataType
     :param extracted_data_type: Enum value for the extracted data type
+    :type rows_per_sheet: int
+    :param rows_per_sheet: Maximum number of data rows in a worksheet
+    :type sheets_per_workbook: int
+    :param sheets_per_workbook: Maximum number of worksheets in a workbook file
+    :type format_workers: int
+    :param format_workers: Number of processes formatting and sanitizing rows
     """
 
-    def __init__(self, filename: str, extracted_data_type: ExtractedDataType) -> None:
+    def __init__(
+        self,
+        filename: str,
+        extracted_data_type: ExtractedDataType,
+        rows_per_sheet: Optional[int] = None,
+        sheets_per_workbook: Optional[int] = None,
+        format_workers: Optional[int] = None,
+    ) -> None:
 
-        super().__init__(filename, extracted_data_type)
+        super().__init__(filename, extracted_data_type, format_workers)
 
-        self._sheet = None
-        self._second_sheet = None
+        self._rows_per_sheet = min(rows_per_sheet or MAX_DATA_ROWS_IN_SHEET, MAX_DATA_ROWS_IN_SHEET)
+        self._sheets_per_workbook = sheets_per_workbook
+        self._column_widths = []
 
     def _save_user_data(self, extracted_data: User) -> None:
         """Save single user data
@@ -39,36 +74,14 @@ class ExcelReporter(FileReporter):
 
         logger.info("Saving user data...")
 
-        workbook = self._create_workbook()
-        self._sheet = workbook.active
-
         logger.info(extracted_data)
 
-        self._add_user_header(self._sheet)
-
-        try:
-            self._sheet.append(FileReporter._get_user_row_data(extracted_data.data))
-        except IllegalCharacterError:
-            extracted_data.data["description"] = ILLEGAL_CHARACTERS_RE.sub(
-                r"", extracted_data.data["description"]
-            )
-            extracted_data.data["name"] = ILLEGAL_CHARACTERS_RE.sub(
-                r"", extracted_data.data["name"]
-            )
-            extracted_data.data["pinned_tweet_text"] = ILLEGAL_CHARACTERS_RE.sub(
-                r"", extracted_data.data["pinned_tweet_text"]
-            )
-
-            try:
-                self._sheet.append(FileReporter._get_user_row_data(extracted_data.data))
-            except IllegalCharacterError:
-                logger.error(
-                    f"Received IllegalCharacterError for {extracted_data.data['username']}. Skipping..."
-                )
-
-        self._adjust_column_widths()
+        serialize = get_row_serializer("user", self._user_data_header)
 
-        workbook.save(self._filename)
+        self._save_rows(
+            self._user_data_header,
+            [ExcelReporter._sanitize_row(serialize(extracted_data.data))],
+        )
 
     def _save_users_data(self, extracted_data: list[User]) -> None:
         """Save users/friends/followers data
@@ -84,169 +97,202 @@ class ExcelReporter(FileReporter):
         else:
             logger.debug(f"Saving {'friends' if is_friends_data else 'followers'} data...")
 
+        self._save_rows(
+            self._user_data_header,
+            self._format_rows(
+                "user", self._user_data_header, extracted_data, ExcelReporter._sanitize_row
+            ),
+        )
+
+    def _save_tweets_data(self, extracted_data: list[Tweet]) -> None:
+        """Save tweets data
+
+        :type extracted_data: list
+        :param extracted_data: List of Tweets
+        """
+
+        logger.debug("Saving tweets data...")
+
+        if self._extracted_data_type == ExtractedDataType.USER_TWEETS:
+            self._tweet_data_header.remove("Author")
+
+        self._save_rows(
+            self._tweet_data_header,
+            self._format_rows(
+                "tweet", self._tweet_data_header, extracted_data, ExcelReporter._sanitize_row
+            ),
+        )
+
+    def _save_rows(self, header: list[str], rows: Iterable[list]) -> None:
+        """Stream rows to the workbooks and save them
+
+        :type header: list
+        :param header: Column names
+        :type rows: Iterable
+        :param rows: Row values, sanitized with _sanitize_row
+        """
+
+        sample_rows = list(islice(rows, WIDTH_SAMPLE_ROWS))
+
+        self._column_widths = [len(column) for column in header]
+        for row in sample_rows:
+            self._update_column_widths(row)
+
+        workbook_count = 1
+        filename = self._filename
         workbook = self._create_workbook()
-        self._sheet = workbook.active
+        sheet = self._create_sheet(workbook, header)
+        sheets_in_workbook = 1
+        rows_in_sheet = 0
 
-        self._add_user_header(self._sheet)
+        parts = [{"file": filename, "sheet": sheet.title, "first_row": 1, "last_row": 0}]
 
-        rows_added = 1
+        for row_number, row in enumerate(chain(sample_rows, rows), start=1):
+            if rows_in_sheet >= self._rows_per_sheet:
+                if sheets_in_workbook == self._sheets_per_workbook:
+                    workbook.save(filename)
 
-        for user_data_item in extracted_data:
-            try:
-                if rows_added == MAX_ROWS_IN_SHEET - 1:
+                    workbook_count += 1
+                    filename = self._get_workbook_filename(workbook_count)
                     logger.debug(
-                        "Max row per worksheet limit will be reached. Creating new worksheet..."
+                        f"Max worksheet per workbook limit is reached. Creating {filename}..."
                     )
-                    self._second_sheet = workbook.create_sheet()
-                    self._add_user_header(self._second_sheet)
 
-                if rows_added < MAX_ROWS_IN_SHEET:
-                    self._sheet.append(FileReporter._get_user_row_data(user_data_item.data))
+                    workbook = self._create_workbook()
+                    sheets_in_workbook = 0
                 else:
-                    self._second_sheet.append(FileReporter._get_user_row_data(user_data_item.data))
+                    logger.debug(
+                        "Max row per worksheet limit is reached. Creating new worksheet..."
+                    )
 
-                rows_added += 1
+                sheet = self._create_sheet(workbook, header)
+                sheets_in_workbook += 1
+                rows_in_sheet = 0
 
-            except IllegalCharacterError:
-                user_data_item.data["description"] = ILLEGAL_CHARACTERS_RE.sub(
-                    r"", user_data_item.data["description"]
-                )
-                user_data_item.data["name"] = ILLEGAL_CHARACTERS_RE.sub(
-                    r"", user_data_item.data["name"]
-                )
-                user_data_item.data["pinned_tweet_text"] = ILLEGAL_CHARACTERS_RE.sub(
-                    r"", user_data_item.data["pinned_tweet_text"]
+                parts.append(
+                    {"file": filename, "sheet": sheet.title, "first_row": row_number, "last_row": 0}
                 )
 
-                try:
-                    if rows_added < MAX_ROWS_IN_SHEET:
-                        self._sheet.append(FileReporter._get_user_row_data(user_data_item.data))
-                    else:
-                        self._second_sheet.append(
-                            FileReporter._get_user_row_data(user_data_item.data)
-                        )
-
-                    rows_added += 1
-                except IllegalCharacterError:
-                    logger.error(
-                        f"Received IllegalCharacterError for {user_data_item.data['username']}. Skipping..."
-                    )
+            sheet.append(row)
+            rows_in_sheet += 1
+            parts[-1]["last_row"] = row_number
 
-        self._adjust_column_widths()
+        workbook.save(filename)
 
-        workbook.save(self._filename)
+        self.filenames = list(dict.fromkeys(part["file"] for part in parts))
+        self._save_manifest(header, parts)
 
-    def _save_tweets_data(self, extracted_data: list[Tweet]) -> None:
-        """Save tweets data
+    def _save_manifest(self, header: list[str], parts: list[dict]) -> None:
+        """Save the file, worksheet and row range of each part if rows are split
 
-        :type extracted_data: list
-        :param extracted_data: List of Tweets
+        A manifest left by a previous export is removed otherwise.
+
+        :type header: list
+        :param header: Column names
+        :type parts: list
+        :param parts: File, sheet, first_row and last_row of each part
         """
 
-        logger.debug("Saving tweets data...")
+        manifest_filename = f"{os.path.splitext(self._filename)[0]}_manifest.json"
 
-        workbook = self._create_workbook()
-        self._sheet = workbook.active
+        if len(parts) == 1:
+            if os.path.exists(manifest_filename):
+                os.remove(manifest_filename)
 
-        self._add_tweet_header(self._sheet)
+            return
 
-        rows_added = 1
+        manifest = {
+            "header": header,
+            "rows": parts[-1]["last_row"],
+            "rows_per_sheet": self._rows_per_sheet,
+            "sheets_per_workbook": self._sheets_per_workbook,
+            "parts": parts,
+        }
 
-        for tweet_data_item in extracted_data:
-            try:
-                if rows_added == MAX_ROWS_IN_SHEET - 1:
-                    logger.debug(
-                        "Max row per worksheet limit will be reached. Creating new worksheet..."
-                    )
-                    self._second_sheet = workbook.create_sheet()
-                    self._add_tweet_header(self._second_sheet)
+        with open(manifest_filename, "w", encoding="utf-8") as manifest_file:
+            json.dump(manifest, manifest_file, indent=4)
 
-                if rows_added < MAX_ROWS_IN_SHEET:
-                    self._sheet.append(FileReporter._get_tweet_row_data(tweet_data_item.data))
-                else:
-                    self._second_sheet.append(
-                        FileReporter._get_tweet_row_data(tweet_data_item.data)
-                    )
+        logger.info(
+            f"Rows are split into {len(parts)} worksheets. See {manifest_filename} for row ranges."
+        )
 
-                rows_added += 1
+    def _get_workbook_filename(self, number: int) -> str:
+        """Get file name of the numbered workbook, the first one is the output file
 
-            except IllegalCharacterError:
-                tweet_data_item.data["text"] = ILLEGAL_CHARACTERS_RE.sub(
-                    r"", tweet_data_item.data["text"]
-                )
+        :type number: int
+        :param number: Workbook number starting from 1
+        :rtype: str
+        :returns: File name like results_002.xlsx
+        """
 
-                try:
-                    if rows_added < MAX_ROWS_IN_SHEET:
-                        self._sheet.append(FileReporter._get_tweet_row_data(tweet_data_item.data))
-                    else:
-                        self._second_sheet.append(
-                            FileReporter._get_tweet_row_data(tweet_data_item.data)
-                        )
-
-                    rows_added += 1
-                except IllegalCharacterError:
-                    logger.error(
-                        f"Received IllegalCharacterError for id={tweet_data_item.data['id']}. Skipping..."
-                    )
+        if number == 1:
+            return self._filename
 
-        self._adjust_column_widths()
+        root, extension = os.path.splitext(self._filename)
 
-        workbook.save(self._filename)
+        return f"{root}_{number:03d}{extension}"
 
     def _create_workbook(self) -> openpyxl.Workbook:
-        """Create workbook
+        """Create write-only workbook
 
         :rtype: Workbook
         :returns: Workbook instance
         """
 
-        workbook = openpyxl.Workbook()
+        workbook = openpyxl.Workbook(write_only=True)
 
         return workbook
 
-    def _add_user_header(self, sheet: openpyxl.worksheet.worksheet.Worksheet) -> None:
-        """Add user data header
+    def _create_sheet(self, workbook: openpyxl.Workbook, header: list[str]) -> WriteOnlyWorksheet:
+        """Create worksheet with column widths and bold header
 
-        :type sheet: openpyxl.worksheet.worksheet.Worksheet
-        :param sheet: Worksheet to add user data header
+        :type workbook: Workbook
+        :param workbook: Workbook to add the worksheet
+        :type header: list
+        :param header: Column names
+        :rtype: WriteOnlyWorksheet
+        :returns: Worksheet instance
         """
 
-        for i, value in enumerate(self._user_data_header, start=1):
-            cell = sheet.cell(row=1, column=i)
-            cell.value = value
-            cell.font = Font(bold=True)
+        sheet = workbook.create_sheet()
 
-    def _add_tweet_header(self, sheet: openpyxl.worksheet.worksheet.Worksheet) -> None:
-        """Add tweet data header
+        # column widths must be set before the first row is written
+        for i, width in enumerate(self._column_widths, start=1):
+            sheet.column_dimensions[get_column_letter(i)].width = min(width + 2, MAX_COLUMN_WIDTH)
 
-        :type sheet: openpyxl.worksheet.worksheet.Worksheet
-        :param sheet: Worksheet to add tweet data header
-        """
+        header_cells = []
+        for value in header:
+            cell = WriteOnlyCell(sheet, value=value)
+            cell.font = Font(bold=True)
+            header_cells.append(cell)
 
-        if self._extracted_data_type == ExtractedDataType.USER_TWEETS:
-            self._tweet_data_header.remove("Author")
+        sheet.append(header_cells)
 
-        for i, value in enumerate(self._tweet_data_header, start=1):
-            cell = sheet.cell(row=1, column=i)
-            cell.value = value
-            cell.font = Font(bold=True)
+        return sheet
 
-    def _adjust_column_widths(self) -> None:
-        """Adjust the column widths according to maximum length of content"""
+    def _update_column_widths(self, row: list) -> None:
+        """Update column widths with the content lengths of the row
 
-        columns = ascii_uppercase[: len(self._user_data_header)]
-        sheets = [self._sheet]
+        :type row: list
+        :param row: Row values
+        """
 
-        if self._second_sheet:
-            sheets.append(self._second_sheet)
+        for i, value in enumerate(row):
+            length = max(len(line) for line in str(value).split("\n"))
+            if length > self._column_widths[i]:
+                self._column_widths[i] = length
 
-        for sheet in sheets:
-            column_name = iter(columns)
+    @staticmethod
+    def _sanitize_row(row: list) -> list:
+        """Remove characters that are not allowed in worksheets
 
-            for col in sheet.iter_cols():
-                contents = []
-                for cell in col:
-                    contents.append(cell.value)
+        :type row: list
+        :param row: Row values
+        :rtype: list
+        :returns: Row values without illegal characters
+        """
 
-                max_content_length = max([len(str(content)) for content in contents])
-                sheet.column_dimensions[next(column_name)].width = max_content_length + 2
+        return [
+            ILLEGAL_CHARACTERS_RE.sub("", value) if isinstance(value, str) else value
+            for value in row
+        ]
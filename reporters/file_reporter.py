@@ -1,9 +1,11 @@
-from typing import Generator, Union
+from typing import Any, Callable, Generator, Iterable, Iterator, Optional, Union
 
 from models.user import User
 from models.tweet import Tweet
 from reporters.reporter import Reporter
-from utils import ExtractedDataType
+from reporters.row_pool import format_rows
+from reporters.row_serializers import get_row_serializer
+from utils import ExtractedDataType, logger
 
 Friends = Generator[User, None, None]
 Followers = Generator[User, None, None]
@@ -11,13 +13,29 @@ Tweets = Generator[Tweet, None, None]
 
 
 class FileReporter(Reporter):
-    """Base class for csv, excel, and gsheets reporters"""
+    """Base class for csv, excel, and gsheets reporters
 
-    def __init__(self, filename: str, extracted_data_type: ExtractedDataType) -> None:
+    :type filename: str
+    :param filename: Name of the output file
+    :type extracted_data_type: ExtractedDataType
+    :param extracted_data_type: Enum value for the extracted data type
+    :type format_workers: int
+    :param format_workers: Number of processes formatting rows, None formats them in this process
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        extracted_data_type: ExtractedDataType,
+        format_workers: Optional[int] = None,
+    ) -> None:
 
         super().__init__(extracted_data_type)
 
         self._filename = filename
+        self._format_workers = format_workers
+        # files written by the last save, e.g. shards or numbered workbooks of the output file
+        self.filenames = []
 
     def _save_user_data(self, extracted_data: User) -> None:
         """Save single user data"""
@@ -27,3 +45,33 @@ class FileReporter(Reporter):
 
     def _save_tweets_data(self, extracted_data: Tweets) -> None:
         """Save tweets data"""
+
+    def _format_rows(
+        self,
+        data_type: str,
+        header: list[str],
+        models: Iterable[Union[User, Tweet]],
+        transform: Optional[Callable[[tuple], Any]] = None,
+    ) -> Iterator[tuple]:
+        """Format the rows of the models, in worker processes if format_workers is set
+
+        :type data_type: str
+        :param data_type: user or tweet
+        :type header: list
+        :param header: Column names
+        :type models: Iterable
+        :param models: User or Tweet objects
+        :type transform: Callable
+        :param transform: Picklable function applied to each row
+        :rtype: Iterator
+        :returns: Rows in the order of the models
+        """
+
+        if self._format_workers:
+            logger.debug(f"Formatting rows in {self._format_workers} processes...")
+            return format_rows(data_type, header, models, self._format_workers, transform)
+
+        serialize = get_row_serializer(data_type, header)
+        rows = (serialize(model.data) for model in models)
+
+        return rows if transform is None else map(transform, rows)
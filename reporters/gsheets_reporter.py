@@ -1,29 +1,63 @@
-from time import sleep
+import re
+from typing import Iterable, Optional
 
 import gspread
 from gspread.spreadsheet import Spreadsheet
 from gspread.exceptions import SpreadsheetNotFound
 
-from exceptions import MissingShareMailError
+import metrics
+from exceptions import MissingShareMailError, SpreadsheetLimitError
 from models.user import User
 from models.tweet import Tweet
+from rate_limiter import TokenBucket
 from reporters.file_reporter import FileReporter
+from reporters.row_serializers import get_row_serializer
 from utils import logger, ExtractedDataType
 
 
+# Sheets API allows 60 write requests per minute per user
+WRITE_REQUESTS_PER_MINUTE = 60
+# recommended maximum payload size of a request
+MAX_REQUEST_BYTES = 2_000_000
+# a spreadsheet can have at most 10 million cells in all of its worksheets
+MAX_CELLS_IN_SPREADSHEET = 10_000_000
+MAX_CELLS_IN_WORKSHEET = 2_000_000
+# titles of the worksheets added when a worksheet is full
+ROLLOVER_TITLE_RE = re.compile(r"Sheet\d+")
+
+
 class GSheetsReporter(FileReporter):
     """Google Sheets report generator
 
+    Rows are buffered and appended in chunks sized to the request payload
+    limit, and write requests are rate limited by the per-minute quota.
+    When a worksheet reaches the cell limit, a new worksheet is added.
+    The first worksheet is cleared and the worksheets added by a previous
+    export are deleted before the rows are written. Other worksheets are
+    kept, and their cells count toward the spreadsheet cell limit.
+
     :type filename: str
     :param filename: Name or url of the output file
     :type extracted_data_type: ExtractedDataType
     :param extracted_data_type: Enum value for the extracted data type
     :type share_mail: str
     :param share_mail: Mail address to share Google Sheets document
+    :type sheets_client: gspread.Client
+    :param sheets_client: Client to use instead of the service account client
+    :type rate_limiter: TokenBucket
+    :param rate_limiter: Rate limiter for write requests
+    :type cells_per_worksheet: int
+    :param cells_per_worksheet: Maximum number of cells in a worksheet
     """
 
     def __init__(
-        self, filename: str, extracted_data_type: ExtractedDataType, share_mail: str
+        self,
+        filename: str,
+        extracted_data_type: ExtractedDataType,
+        share_mail: str,
+        sheets_client: Optional[gspread.Client] = None,
+        rate_limiter: Optional[TokenBucket] = None,
+        cells_per_worksheet: Optional[int] = MAX_CELLS_IN_WORKSHEET,
     ) -> None:
 
         super().__init__(filename, extracted_data_type)
@@ -32,8 +66,16 @@ class GSheetsReporter(FileReporter):
         if not self._share_mail:
             raise MissingShareMailError("share_mail(sm) parameter is missing!")
 
-        self._sheets_client = gspread.service_account(filename="credentials.json")
+        self._sheets_client = sheets_client or gspread.service_account(filename="credentials.json")
         self._gsheet = None
+        self._rate_limiter = rate_limiter or TokenBucket(WRITE_REQUESTS_PER_MINUTE)
+        self._cells_per_worksheet = cells_per_worksheet
+
+        self._worksheet = None
+        self._worksheet_count = 0
+        self._worksheet_titles = set()
+        self._rows_in_worksheet = 0
+        self._cells_in_spreadsheet = 0
 
     def _save_user_data(self, extracted_data: User) -> None:
         """Save single user data
@@ -42,22 +84,13 @@ class GSheetsReporter(FileReporter):
         :param extracted_data: User object
         """
 
-        gsheet = self._get_sheet()
-
         logger.info("Saving user data...")
 
-        worksheet = gsheet.sheet1
-        worksheet.clear()
-
         logger.info(extracted_data)
 
-        self._add_user_header(worksheet)
+        serialize = get_row_serializer("user", self._user_data_header)
 
-        worksheet.append_row(FileReporter._get_user_row_data(extracted_data.data))
-
-        worksheet.columns_auto_resize(
-            start_column_index=1, end_column_index=len(self._user_data_header)
-        )
+        self._save_rows(self._user_data_header, [serialize(extracted_data.data)])
 
     def _save_users_data(self, extracted_data: list[User]) -> None:
         """Save users/friends/followers data
@@ -73,19 +106,11 @@ class GSheetsReporter(FileReporter):
         else:
             logger.debug(f"Saving {'friends' if is_friends_data else 'followers'} data...")
 
-        gsheet = self._get_sheet()
-
-        worksheet = gsheet.sheet1
-        worksheet.clear()
+        serialize = get_row_serializer("user", self._user_data_header)
 
-        self._add_user_header(worksheet)
-
-        for user_data_item in extracted_data:
-            worksheet.append_row(FileReporter._get_user_row_data(user_data_item.data))
-            GSheetsReporter._wait_for_quota_limit()
-
-        worksheet.columns_auto_resize(
-            start_column_index=1, end_column_index=len(self._user_data_header)
+        self._save_rows(
+            self._user_data_header,
+            (serialize(user_data_item.data) for user_data_item in extracted_data),
         )
 
     def _save_tweets_data(self, extracted_data: list[Tweet]) -> None:
@@ -97,43 +122,193 @@ class GSheetsReporter(FileReporter):
 
         logger.debug("Saving tweets data...")
 
+        if self._extracted_data_type == ExtractedDataType.USER_TWEETS:
+            self._tweet_data_header.remove("Author")
+
+        serialize = get_row_serializer("tweet", self._tweet_data_header)
+
+        self._save_rows(
+            self._tweet_data_header,
+            (serialize(tweet_data_item.data) for tweet_data_item in extracted_data),
+        )
+
+    def _save_rows(self, header: list[str], rows: Iterable[list]) -> None:
+        """Append rows to the spreadsheet in chunks
+
+        A chunk is sent when its estimated payload size reaches the
+        request size limit, the rest is sent after all rows are read.
+
+        :type header: list
+        :param header: Column names
+        :type rows: Iterable
+        :param rows: Row values
+        """
+
         gsheet = self._get_sheet()
 
-        worksheet = gsheet.sheet1
-        worksheet.clear()
+        self._worksheet = gsheet.sheet1
+        kept_worksheets = self._delete_rollover_worksheets(gsheet)
+
+        self._write_request(self._worksheet.clear)
+        self._write_request(self._worksheet.resize, rows=1, cols=len(header))
+        self._cells_in_spreadsheet = len(header) + sum(
+            worksheet.row_count * worksheet.col_count for worksheet in kept_worksheets
+        )
+
+        self._add_header(header)
+
+        chunk = []
+        chunk_bytes = 0
+
+        for row in rows:
+            chunk.append(row)
+            chunk_bytes += sum(len(str(value)) for value in row) + 4 * len(row)
 
-        self._add_tweet_header(worksheet)
+            if chunk_bytes >= MAX_REQUEST_BYTES:
+                self._append_rows(header, chunk)
+                chunk = []
+                chunk_bytes = 0
 
-        for tweet_data_item in extracted_data:
-            worksheet.append_row(FileReporter._get_tweet_row_data(tweet_data_item.data))
-            GSheetsReporter._wait_for_quota_limit()
+        self._append_rows(header, chunk)
 
-        worksheet.columns_auto_resize(
-            start_column_index=1, end_column_index=len(self._tweet_data_header)
+        self._write_request(
+            self._worksheet.columns_auto_resize,
+            start_column_index=1,
+            end_column_index=len(header),
         )
 
-    def _add_user_header(self, worksheet: gspread.worksheet.Worksheet) -> None:
-        """Add user data header
+    def _delete_rollover_worksheets(self, gsheet: Spreadsheet) -> list:
+        """Delete the worksheets added by a previous export, in a single request
 
-        :type worksheet: gspread.worksheet.Worksheet
-        :param worksheet: Worksheet instance
+        :type gsheet: Spreadsheet
+        :param gsheet: Spreadsheet being written
+        :rtype: list
+        :returns: Worksheets other than the first one that are kept
         """
 
-        worksheet.append_row(self._user_data_header)
-        worksheet.format(f"A1:P1", {"textFormat": {"bold": True}})
+        other_worksheets = [
+            worksheet for worksheet in gsheet.worksheets() if worksheet.id != self._worksheet.id
+        ]
+        rollover_worksheets = [
+            worksheet
+            for worksheet in other_worksheets
+            if ROLLOVER_TITLE_RE.fullmatch(worksheet.title)
+        ]
+        kept_worksheets = [
+            worksheet for worksheet in other_worksheets if worksheet not in rollover_worksheets
+        ]
+
+        if rollover_worksheets:
+            self._write_request(
+                gsheet.batch_update,
+                {
+                    "requests": [
+                        {"deleteSheet": {"sheetId": worksheet.id}}
+                        for worksheet in rollover_worksheets
+                    ]
+                },
+            )
+            logger.debug(f"Deleted {len(rollover_worksheets)} worksheets of the previous export.")
+
+        self._worksheet_count = 1
+        self._worksheet_titles = {self._worksheet.title}
+        self._worksheet_titles.update(worksheet.title for worksheet in kept_worksheets)
+
+        return kept_worksheets
+
+    def _append_rows(self, header: list[str], rows: list[list]) -> None:
+        """Append rows to the current worksheet, add worksheets when it is full
+
+        Raises SpreadsheetLimitError if the spreadsheet cell limit is reached.
+
+        :type header: list
+        :param header: Column names
+        :type rows: list
+        :param rows: Row values
+        """
+
+        rows_per_worksheet = self._cells_per_worksheet // len(header)
+
+        while rows:
+            capacity = rows_per_worksheet - self._rows_in_worksheet
+
+            if capacity <= 0:
+                self._add_worksheet(header)
+                continue
+
+            if self._cells_in_spreadsheet + min(capacity, len(rows)) * len(header) > (
+                MAX_CELLS_IN_SPREADSHEET
+            ):
+                raise SpreadsheetLimitError(
+                    f"Spreadsheet {self._filename} reached the limit of "
+                    f"{MAX_CELLS_IN_SPREADSHEET} cells!"
+                )
+
+            chunk, rows = rows[:capacity], rows[capacity:]
+
+            self._write_request(self._worksheet.append_rows, chunk, value_input_option="RAW")
 
-    def _add_tweet_header(self, worksheet: gspread.worksheet.Worksheet) -> None:
-        """Add tweet data header
+            self._rows_in_worksheet += len(chunk)
+            self._cells_in_spreadsheet += len(chunk) * len(header)
 
-        :type worksheet: gspread.worksheet.Worksheet
-        :param worksheet: Worksheet instance
+    def _add_worksheet(self, header: list[str]) -> None:
+        """Add a new worksheet with header and make it the current worksheet
+
+        :type header: list
+        :param header: Column names
         """
 
-        if self._extracted_data_type == ExtractedDataType.USER_TWEETS:
-            self._tweet_data_header.remove("Author")
+        self._write_request(
+            self._worksheet.columns_auto_resize,
+            start_column_index=1,
+            end_column_index=len(header),
+        )
+
+        self._worksheet_count += 1
+        title = f"Sheet{self._worksheet_count}"
+        while title in self._worksheet_titles:
+            self._worksheet_count += 1
+            title = f"Sheet{self._worksheet_count}"
+        self._worksheet_titles.add(title)
+
+        logger.debug(f"Worksheet cell limit reached. Creating new worksheet {title}...")
+
+        self._worksheet = self._write_request(
+            self._gsheet.add_worksheet, title=title, rows=1, cols=len(header)
+        )
+        self._cells_in_spreadsheet += len(header)
+
+        self._add_header(header)
+
+    def _add_header(self, header: list[str]) -> None:
+        """Add data header to the current worksheet
+
+        :type header: list
+        :param header: Column names
+        """
+
+        self._write_request(self._worksheet.update, "A1", [header])
+        self._write_request(
+            self._worksheet.format,
+            f"A1:{gspread.utils.rowcol_to_a1(1, len(header))}",
+            {"textFormat": {"bold": True}},
+        )
 
-        worksheet.append_row(self._tweet_data_header)
-        worksheet.format(f"A1:L1", {"textFormat": {"bold": True}})
+        self._rows_in_worksheet = 1
+
+    def _write_request(self, request, *args, **kwargs):
+        """Send write request after waiting for the quota
+
+        :type request: Callable
+        :param request: gspread method that sends a write request
+        :returns: Return value of the request
+        """
+
+        with metrics.histogram("rate_limit_wait_seconds", api="sheets").time():
+            self._rate_limiter.acquire()
+
+        with metrics.histogram("write_batch_seconds", reporter="GSheetsReporter").time():
+            return request(*args, **kwargs)
 
     def _get_sheet(self) -> Spreadsheet:
         """Create or open spreadsheet
@@ -159,9 +334,3 @@ class GSheetsReporter(FileReporter):
                 self._gsheet.share(self._share_mail, perm_type="user", role="writer")
 
         return self._gsheet
-
-    @staticmethod
-    def _wait_for_quota_limit():
-        """Sleep 1 second between write requests"""
-
-        sleep(1)
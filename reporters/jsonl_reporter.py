@@ -0,0 +1,165 @@
+from typing import Generator, Iterable, Optional, Union
+
+import orjson
+
+from models.user import User
+from models.tweet import Tweet
+from reporters.file_reporter import FileReporter
+from reporters.output_stream import OutputStream
+from utils import logger, ExtractedDataType
+
+
+Friends = Generator[User, None, None]
+Followers = Generator[User, None, None]
+Tweets = Generator[Tweet, None, None]
+
+JSON_OPTIONS = orjson.OPT_APPEND_NEWLINE | orjson.OPT_UTC_Z
+
+
+class JsonlReporter(FileReporter):
+    """JSON Lines report generator
+
+    Each user or tweet is written as one compact JSON object per line with
+    the fields of the User and Tweet models. Entities are kept as arrays,
+    and media, places and the author of search tweets are kept as the
+    objects returned by the API, so nothing is flattened to text.
+
+    Lines are written through an OutputStream like CsvReporter, with the
+    same compression, sharding and append options.
+
+    :type filename: str
+    :param filename: Name of the output file
+    :type extracted_data_type: ExtractedDataType
+    :param extracted_data_type: Enum value for the extracted data type
+    :type compression: str
+    :param compression: gzip, zstd or None for plain text
+    :type shard_rows: int
+    :param shard_rows: Maximum number of lines in a shard
+    :type shard_bytes: int
+    :param shard_bytes: Maximum size of a shard in bytes
+    :type append: bool
+    :param append: Whether to append to the existing output
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        extracted_data_type: ExtractedDataType,
+        compression: Optional[str] = None,
+        shard_rows: Optional[int] = None,
+        shard_bytes: Optional[int] = None,
+        append: Optional[bool] = False,
+    ) -> None:
+
+        super().__init__(filename, extracted_data_type)
+
+        self._compression = compression
+        self._shard_rows = shard_rows
+        self._shard_bytes = shard_bytes
+        self._append = append
+
+    def _save_user_data(self, extracted_data: User) -> None:
+        """Save single user data
+
+        :type extracted_data: User
+        :param extracted_data: User object
+        """
+
+        logger.info("Saving user data...")
+
+        logger.info(extracted_data)
+
+        self._save_records([JsonlReporter._get_user_record(extracted_data.data)])
+
+    def _save_users_data(
+        self, extracted_data: Union[list[User], Union[Friends, Followers]]
+    ) -> None:
+        """Save users/friends/followers data
+
+        :type extracted_data: Generator
+        :param extracted_data: List of Users(users/friends/followers)
+        """
+
+        is_friends_data = self._extracted_data_type == ExtractedDataType.FRIENDS
+
+        if self._extracted_data_type == ExtractedDataType.USERS:
+            logger.debug("Saving users data...")
+        else:
+            logger.debug(f"Saving {'friends' if is_friends_data else 'followers'} data...")
+
+        self._save_records(
+            JsonlReporter._get_user_record(user_data_item.data) for user_data_item in extracted_data
+        )
+
+    def _save_tweets_data(self, extracted_data: Tweets) -> None:
+        """Save tweets data
+
+        :type extracted_data: Generator
+        :param extracted_data: List of Tweets
+        """
+
+        logger.debug("Saving tweets data...")
+
+        self._save_records(
+            JsonlReporter._get_tweet_record(tweet_data_item.data)
+            for tweet_data_item in extracted_data
+        )
+
+    def _save_records(self, records: Iterable[dict]) -> None:
+        """Serialize records to the output stream, one per line
+
+        :type records: Iterable
+        :param records: User or tweet records
+        """
+
+        with OutputStream(
+            self._filename,
+            compression=self._compression,
+            shard_rows=self._shard_rows,
+            shard_bytes=self._shard_bytes,
+            append=self._append,
+            binary=True,
+        ) as output:
+            for record in records:
+                output.write(orjson.dumps(record, option=JSON_OPTIONS))
+
+        self.filenames = output.filenames
+        logger.debug(f"Wrote {output.rows} lines to {', '.join(output.filenames)}")
+
+    @staticmethod
+    def _get_user_record(data: dict) -> dict:
+        """Get JSON serializable user record
+
+        :type data: dict
+        :param data: Data dictionary for the User
+        :rtype: dict
+        :returns: User record
+        """
+
+        record = dict(data)
+
+        if record["pinned_tweet_id"] == "None":
+            record["pinned_tweet_id"] = None
+
+        return record
+
+    @staticmethod
+    def _get_tweet_record(data: dict) -> dict:
+        """Get JSON serializable tweet record
+
+        Media, places and the author are replaced by their API payloads.
+
+        :type data: dict
+        :param data: Data dictionary for the Tweet
+        :rtype: dict
+        :returns: Tweet record
+        """
+
+        record = dict(data)
+        record["media"] = [media.data for media in data["media"]]
+        record["places"] = [place.data for place in data["places"]]
+
+        if "author" in data:
+            record["author"] = data["author"].data
+
+        return record
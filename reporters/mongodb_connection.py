@@ -0,0 +1,121 @@
+import atexit
+import os
+from importlib.util import find_spec
+from threading import Lock
+from typing import Optional
+
+from pymongo import MongoClient
+from pymongo.errors import ConfigurationError, PyMongoError
+from pymongo.uri_parser import parse_uri
+from pymongo.write_concern import WriteConcern
+
+from exceptions import ExtractorDatabaseError
+from utils import logger
+
+
+DEFAULT_URI = "mongodb://0.0.0.0:27017"
+DEFAULT_DB_NAME = "tw_data_extractor_db"
+
+# wire protocol compressors in order of preference and the modules they need
+COMPRESSORS = {"zstd": "zstandard", "snappy": "snappy", "zlib": "zlib"}
+
+# used for the options that are not given in the connection URI
+DEFAULT_CLIENT_OPTIONS = {
+    "maxPoolSize": 20,
+    "serverSelectionTimeoutMS": 10000,
+    "compressors": ",".join(
+        compressor for compressor, module in COMPRESSORS.items() if find_spec(module)
+    ),
+}
+
+# bulk skips journal and replica set acknowledgement for faster loads,
+# durable waits until writes are journaled on the majority of the replica set
+WRITE_PROFILES = {
+    "durable": WriteConcern(w="majority", j=True),
+    "bulk": WriteConcern(w=1, j=False),
+}
+
+_clients = {}
+_clients_lock = Lock()
+
+
+def get_uri(uri: Optional[str] = None) -> str:
+    """Get connection URI from the given value or MONGODB_URI environment variable
+
+    :type uri: str
+    :param uri: MongoDB connection URI
+    :rtype: str
+    :returns: Connection URI
+    """
+
+    return uri or os.environ.get("MONGODB_URI", DEFAULT_URI)
+
+
+def get_client(uri: str) -> MongoClient:
+    """Get a connected client for the URI
+
+    Clients are created once per URI and shared by all reporters in the
+    process, so jobs reuse the same connection pool. Pool size, timeouts
+    and compression can be tuned with URI options, e.g.
+    mongodb://host1,host2/?replicaSet=rs0&maxPoolSize=50&compressors=zstd
+
+    Raises ExtractorDatabaseError if the URI is invalid or
+    the server could not be reached.
+
+    :type uri: str
+    :param uri: MongoDB connection URI
+    :rtype: MongoClient
+    :returns: MongoDB client
+    """
+
+    with _clients_lock:
+        if uri in _clients:
+            return _clients[uri]
+
+        try:
+            uri_options = {option.lower() for option in parse_uri(uri)["options"]}
+            options = {
+                option: value
+                for option, value in DEFAULT_CLIENT_OPTIONS.items()
+                if option.lower() not in uri_options
+            }
+
+            client = MongoClient(uri, **options)
+            client.admin.command("ping")
+
+        except ConfigurationError as exp:
+            raise ExtractorDatabaseError(f"Invalid MongoDB connection URI! {exp}") from exp
+
+        except PyMongoError as exp:
+            raise ExtractorDatabaseError(
+                "Failed to connect to database! Please check if database server is running."
+            ) from exp
+
+        logger.debug(f"Connected to MongoDB with options {options}")
+
+        _clients[uri] = client
+
+        return client
+
+
+def get_db_name(uri: str) -> str:
+    """Get database name given in the URI path, or the default name
+
+    :type uri: str
+    :param uri: MongoDB connection URI
+    :rtype: str
+    :returns: Database name
+    """
+
+    return parse_uri(uri)["database"] or DEFAULT_DB_NAME
+
+
+@atexit.register
+def close_clients() -> None:
+    """Close all shared clients"""
+
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+
+        _clients.clear()
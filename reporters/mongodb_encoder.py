@@ -0,0 +1,130 @@
+from typing import Optional
+
+from bson.int64 import Int64
+
+from models.user import User
+from utils import get_entity_items
+
+
+USER_METRICS = ("followers_count", "following_count", "tweet_count", "listed_count")
+TWEET_METRICS = ("retweet_count", "reply_count", "like_count", "quote_count")
+
+
+def encode_user(data: dict) -> dict:
+    """Encode user data as a compact BSON document
+
+    Ids are int64, public metrics are top level fields and entities
+    are arrays. Empty and missing values are left out.
+
+    :type data: dict
+    :param data: Data dictionary for the User
+    :rtype: dict
+    :returns: Document to save
+    """
+
+    metrics = data["public_metrics"] or {}
+    entities = data["entities"]
+    pinned_tweet_id = data["pinned_tweet_id"]
+
+    document = {
+        "id": Int64(data["id"]),
+        "username": data["username"],
+        "name": data["name"],
+        "created_at": data["created_at"],
+        "description": data["description"],
+        "location": data["location"],
+        "pinned_tweet_id": (
+            Int64(pinned_tweet_id) if pinned_tweet_id and pinned_tweet_id != "None" else None
+        ),
+        "pinned_tweet_text": data["pinned_tweet_text"],
+        "profile_image_url": data["profile_image_url"],
+        "protected": data["protected"],
+        "url": data["url"],
+        "verified": data["verified"],
+        "urls": get_entity_items(entities, "url_items"),
+        "hashtags": get_entity_items(entities, "hashtag_items"),
+        "mentions": get_entity_items(entities, "mention_items"),
+    }
+
+    for metric in USER_METRICS:
+        document[metric] = metrics.get(metric)
+
+    return _compact(document)
+
+
+def encode_tweet(data: dict) -> tuple[dict, Optional[dict]]:
+    """Encode tweet data as a compact BSON document
+
+    Author of a search tweet is encoded as a separate user document
+    and referenced from the tweet by author_id.
+
+    :type data: dict
+    :param data: Data dictionary for the Tweet
+    :rtype: tuple
+    :returns: Tweet document and author document, or None if there is no author
+    """
+
+    metrics = data["public_metrics"] or {}
+    entities = data["entities"]
+    author_id = data.get("author_id")
+    author_document = None
+
+    if "author" in data:
+        author_document = encode_user(User((data["author"], None)).data)
+        author_id = author_document["id"]
+
+    document = {
+        "id": Int64(data["id"]),
+        "text": data["text"],
+        "created_at": data["created_at"],
+        "source": data["source"],
+        "language": data["language"],
+        "author_id": Int64(author_id) if author_id else None,
+        "urls": get_entity_items(entities, "url_items"),
+        "hashtags": get_entity_items(entities, "hashtag_items"),
+        "mentions": get_entity_items(entities, "mention_items"),
+        "media": [_encode_media(media) for media in data["media"]],
+        "places": [_encode_place(place) for place in data["places"]],
+    }
+
+    for metric in TWEET_METRICS:
+        document[metric] = metrics.get(metric)
+
+    return (_compact(document), author_document)
+
+
+def _encode_media(media: "tweepy.Media") -> dict:  # noqa: F821
+    """Encode media attachment as an embedded document"""
+
+    return _compact(
+        {
+            "media_key": media["media_key"],
+            "type": media["type"],
+            "url": media["url"],
+            "duration_ms": media["duration_ms"],
+            "width": media["width"],
+            "height": media["height"],
+            "view_count": (media["public_metrics"] or {}).get("view_count"),
+        }
+    )
+
+
+def _encode_place(place: "tweepy.Place") -> dict:  # noqa: F821
+    """Encode place as an embedded document"""
+
+    return _compact(
+        {
+            "id": place["id"],
+            "full_name": place["full_name"],
+            "country": place["country"],
+            "country_code": place["country_code"],
+            "place_type": place["place_type"],
+            "bbox": place["geo"]["bbox"] if place["geo"] else None,
+        }
+    )
+
+
+def _compact(document: dict) -> dict:
+    """Remove missing values, empty strings and empty arrays from the document"""
+
+    return {key: value for key, value in document.items() if value not in (None, "", [])}
@@ -1,12 +1,18 @@
-from typing import Generator
+from typing import Generator, Optional
+from datetime import datetime, timezone
 
-from pymongo import MongoClient
-from pymongo.errors import PyMongoError, ServerSelectionTimeoutError
+from bson.errors import InvalidDocument
+from pymongo import ReplaceOne
+from pymongo.collection import Collection
+from pymongo.errors import BulkWriteError, CollectionInvalid, PyMongoError
 
+import metrics
 from exceptions import ExtractorDatabaseError
 from models.user import User
 from models.tweet import Tweet
+from reporters import mongodb_connection
 from reporters.database_reporter import DatabaseReporter
+from reporters.mongodb_encoder import TWEET_METRICS, USER_METRICS, encode_tweet, encode_user
 from utils import ExtractedDataType, logger
 
 Friends = Generator[User, None, None]
@@ -14,43 +20,150 @@ Followers = Generator[User, None, None]
 Tweets = Generator[Tweet, None, None]
 
 
+class BulkUpserter:
+    """Buffer documents and upsert them by id with unordered bulk writes
+
+    Documents that fail in a batch are logged and collected in failed_ids,
+    the rest of the batch is still written.
+
+    :type collection: Collection
+    :param collection: MongoDB collection
+    :type batch_size: int
+    :param batch_size: Number of documents to send in a single bulk write
+    """
+
+    def __init__(self, collection: Collection, batch_size: int = 1000) -> None:
+
+        self._collection = collection
+        self._batch_size = batch_size
+        self._requests = []
+        self._ids = []
+
+        self.written = 0
+        self.failed_ids = []
+
+    @property
+    def collection_name(self) -> str:
+        """Name of the collection documents are written to"""
+
+        return self._collection.name
+
+    def add(self, document: dict) -> None:
+        """Add document to the batch, write the batch if it is full
+
+        :type document: dict
+        :param document: Document with an id field
+        """
+
+        self._requests.append(ReplaceOne({"id": document["id"]}, document, upsert=True))
+        self._ids.append(document["id"])
+
+        if len(self._requests) >= self._batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write buffered documents
+
+        Raises PyMongoError for errors other than write errors of
+        single documents, e.g. connection failures.
+        """
+
+        if not self._requests:
+            return
+
+        requests, ids = self._requests, self._ids
+        self._requests, self._ids = [], []
+
+        write_batch_seconds = metrics.histogram(
+            "write_batch_seconds", reporter="MongoDBReporter", collection=self._collection.name
+        )
+
+        try:
+            with write_batch_seconds.time():
+                result = self._collection.bulk_write(requests, ordered=False)
+            details = result.bulk_api_result
+
+        except BulkWriteError as exp:
+            details = exp.details
+
+            for error in details["writeErrors"]:
+                failed_id = ids[error["index"]]
+                self.failed_ids.append(failed_id)
+                logger.error(f"Failed to save document [{failed_id}]: {error['errmsg']}")
+
+        self.written += details["nUpserted"] + details["nMatched"]
+
+        logger.debug(
+            f"Bulk write to {self._collection.name}: {details['nUpserted']} inserted, "
+            f"{details['nMatched']} updated, {len(details['writeErrors'])} failed"
+        )
+
+
 class MongoDBReporter(DatabaseReporter):
     """MongoDB database reporter
 
+    Users and tweets are saved as compact documents built by the
+    mongodb_encoder module. Authors of search tweets are saved to
+    the users collection and referenced by author_id.
+
+    Public metrics of the saved users or tweets can also be recorded to the
+    user_metrics or tweet_metrics time-series collections, one snapshot
+    per item and run, which needs MongoDB 5.0 or later.
+
     Raises ExtractorDatabaseError if database connection
-    is not established in 2 seconds.
+    could not be established.
 
     :type extracted_data_type: ExtractedDataType
     :param extracted_data_type: Enum value for the extracted data type
+    :type db_uri: str
+    :param db_uri: MongoDB connection URI, MONGODB_URI environment variable is used if not given
+    :type write_profile: str
+    :param write_profile: Write concern profile (durable or bulk)
+    :type metrics_snapshots: bool
+    :param metrics_snapshots: Whether to record public metrics snapshots
     """
 
-    DB_NAME = "tw_data_extractor_db"
-    DB_ADDR = "0.0.0.0"
-    DB_PORT = 27017
+    BATCH_SIZE = 1000
 
-    def __init__(self, extracted_data_type: ExtractedDataType) -> None:
+    def __init__(
+        self,
+        extracted_data_type: ExtractedDataType,
+        db_uri: Optional[str] = None,
+        write_profile: Optional[str] = "durable",
+        metrics_snapshots: Optional[bool] = False,
+    ) -> None:
 
         super().__init__(extracted_data_type)
 
-        try:
-            self.db_client = MongoClient(self.DB_ADDR, self.DB_PORT, serverSelectionTimeoutMS=2000)
-            self.db_client.server_info()
-
-        except ServerSelectionTimeoutError as exp:
+        if write_profile not in mongodb_connection.WRITE_PROFILES:
             raise ExtractorDatabaseError(
-                "Failed to connect to database! Please check if database server is running."
-            ) from exp
+                f"Unsupported write profile! Should be one of "
+                f"{', '.join(mongodb_connection.WRITE_PROFILES)}"
+            )
+
+        db_uri = mongodb_connection.get_uri(db_uri)
 
-        self.db = self.db_client[self.DB_NAME]
+        self.db_client = mongodb_connection.get_client(db_uri)
+        db_name = mongodb_connection.get_db_name(db_uri)
+        self.db = self.db_client.get_database(
+            db_name, write_concern=mongodb_connection.WRITE_PROFILES[write_profile]
+        )
         self.users_db = self.db["users"]
+        self.tweets_db = None
+        self.metrics_db = None
 
         if self._extracted_data_type == ExtractedDataType.USER_TWEETS:
             self.tweets_db = self.db["user_tweets"]
         elif self._extracted_data_type == ExtractedDataType.SEARCH_TWEETS:
             self.tweets_db = self.db["search_tweets"]
 
+        self._create_indexes()
+
+        if metrics_snapshots:
+            self.metrics_db = self._get_metrics_collection()
+
         # only used for logging
-        self._filename = f"MongoDB Database: {self.DB_NAME}"
+        self._filename = f"MongoDB Database: {db_name}"
 
     def _save_user_data(self, extracted_data: User) -> None:
         """Save single user data
@@ -65,7 +178,7 @@ class MongoDBReporter(DatabaseReporter):
 
         logger.info(extracted_data)
 
-        self._save_one_user(extracted_data)
+        self._save_users([extracted_data])
 
     def _save_users_data(self, extracted_data: list[User]) -> None:
         """Save users/friends/followers data
@@ -83,62 +196,180 @@ class MongoDBReporter(DatabaseReporter):
         else:
             logger.debug(f"Saving {'friends' if is_friends_data else 'followers'} data...")
 
-        for user_data_item in extracted_data:
-            self._save_one_user(user_data_item)
+        self._save_users(extracted_data)
 
-    def _save_one_user(self, extracted_data) -> None:
-        """Save one user to database
+    def _save_tweets_data(self, extracted_data: list[Tweet]) -> None:
+        """Save tweets data
 
-        Raises ExtractorDatabaseError if an error occurs
-        during the save operation.
+        Use user_tweets collection if extracted data type is user tweets,
+        search_tweets collection otherwise.
 
-        :type extracted_data: User
-        :param extracted_data: User object
+        :type extracted_data: list
+        :param extracted_data: List of Tweets
         """
 
+        logger.debug("Saving tweets data...")
+
+        if self._extracted_data_type == ExtractedDataType.USER_TWEETS:
+            self._filename += ", MongoDB Collection: user_tweets"
+        else:
+            self._filename += ", MongoDB Collection: search_tweets"
+
+        tweets_upserter = BulkUpserter(self.tweets_db, self.BATCH_SIZE)
+        authors_upserter = BulkUpserter(self.users_db, self.BATCH_SIZE)
+        saved_author_ids = set()
+        snapshots = []
+
         try:
-            if not self.users_db.find_one({"id": extracted_data.data["id"]}):
-                self.users_db.insert_one(extracted_data.data)
+            for tweet_data_item in extracted_data:
+                tweet_document, author_document = encode_tweet(tweet_data_item.data)
 
-            else:
-                user_id = extracted_data.data["id"]
-                name = extracted_data.data["name"]
-                username = extracted_data.data["username"]
-                logger.info(f"User [{user_id}:{username}:{name}] already exists. Updating...")
+                tweets_upserter.add(tweet_document)
+                self._add_metrics_snapshot(snapshots, tweet_document, TWEET_METRICS)
 
-                self.users_db.replace_one({"id": user_id}, extracted_data.data)
+                if author_document and author_document["id"] not in saved_author_ids:
+                    saved_author_ids.add(author_document["id"])
+                    authors_upserter.add(author_document)
 
-        except PyMongoError as exp:
+            tweets_upserter.flush()
+            authors_upserter.flush()
+            self._flush_metrics_snapshots(snapshots)
+
+        except (PyMongoError, InvalidDocument) as exp:
             raise ExtractorDatabaseError(exp) from exp
 
-    def _save_tweets_data(self, extracted_data: list[Tweet]) -> None:
-        """Save tweets data
+        MongoDBReporter._check_failed_documents(tweets_upserter, authors_upserter)
 
-        Use user_tweets collection if extracted data type is user tweets,
-        search_tweets collection otherwise.
+    def _save_users(self, extracted_data: list[User]) -> None:
+        """Upsert users to the users collection in bulk writes
+
+        Raises ExtractorDatabaseError if an error occurs during the
+        save operation, or if some of the documents could not be saved.
 
         :type extracted_data: list
-        :param extracted_data: List of Tweets
+        :param extracted_data: List of Users
         """
 
-        logger.debug("Saving tweets data...")
+        upserter = BulkUpserter(self.users_db, self.BATCH_SIZE)
+        snapshots = []
 
-        if self._extracted_data_type == ExtractedDataType.USER_TWEETS:
-            self._filename += ", MongoDB Collection: user_tweets"
+        try:
+            for user_data_item in extracted_data:
+                document = encode_user(user_data_item.data)
+                upserter.add(document)
+                self._add_metrics_snapshot(snapshots, document, USER_METRICS)
+
+            upserter.flush()
+            self._flush_metrics_snapshots(snapshots)
+
+        except (PyMongoError, InvalidDocument) as exp:
+            raise ExtractorDatabaseError(exp) from exp
+
+        MongoDBReporter._check_failed_documents(upserter)
+
+    @staticmethod
+    def _check_failed_documents(*upserters: BulkUpserter) -> None:
+        """Raise ExtractorDatabaseError if some of the documents could not be saved
+
+        :type upserters: BulkUpserter
+        :param upserters: Upserters used for the save operation
+        """
+
+        for upserter in upserters:
+            failed_ids = upserter.failed_ids
+
+            if failed_ids:
+                raise ExtractorDatabaseError(
+                    f"Failed to save {len(failed_ids)} documents to {upserter.collection_name}: "
+                    f"{failed_ids[:10]}{'...' if len(failed_ids) > 10 else ''}"
+                )
+
+    def _add_metrics_snapshot(self, snapshots: list, document: dict, metrics: tuple) -> None:
+        """Buffer public metrics snapshot of the document, write the batch if it is full
+
+        :type snapshots: list
+        :param snapshots: Buffered snapshots
+        :type document: dict
+        :param document: Encoded user or tweet document
+        :type metrics: tuple
+        :param metrics: Names of the public metric fields
+        """
+
+        if self.metrics_db is None:
+            return
+
+        snapshot = {
+            "snapshot_at": self._snapshot_time,
+            "meta": {"id": document["id"], "collection": self._metrics_source},
+        }
+        for metric in metrics:
+            snapshot[metric] = document.get(metric)
+
+        snapshots.append(snapshot)
+
+        if len(snapshots) >= self.BATCH_SIZE:
+            self._flush_metrics_snapshots(snapshots)
+
+    def _flush_metrics_snapshots(self, snapshots: list) -> None:
+        """Write buffered public metrics snapshots
+
+        :type snapshots: list
+        :param snapshots: Buffered snapshots
+        """
+
+        if snapshots:
+            self.metrics_db.insert_many(snapshots, ordered=False)
+            snapshots.clear()
+
+    def _get_metrics_collection(self) -> Collection:
+        """Get or create the time-series collection for public metrics snapshots
+
+        Raises ExtractorDatabaseError if the collection could not be created.
+
+        :rtype: Collection
+        :returns: user_metrics or tweet_metrics collection
+        """
+
+        if self.tweets_db is None:
+            name, self._metrics_source = "user_metrics", "users"
         else:
-            self._filename += ", MongoDB Collection: search_tweets"
+            name, self._metrics_source = "tweet_metrics", self.tweets_db.name
 
-        for tweet_data_item in extracted_data:
+        self._snapshot_time = datetime.now(timezone.utc)
 
-            try:
-                if not self.tweets_db.find_one({"id": tweet_data_item.data["id"]}):
-                    self.tweets_db.insert_one(tweet_data_item.data)
+        try:
+            if name not in self.db.list_collection_names(filter={"name": name}):
+                self.db.create_collection(
+                    name,
+                    timeseries={
+                        "timeField": "snapshot_at",
+                        "metaField": "meta",
+                        "granularity": "hours",
+                    },
+                )
+
+        except CollectionInvalid:
+            # created by another job in the meantime
+            pass
+
+        except PyMongoError as exp:
+            raise ExtractorDatabaseError(
+                f"Failed to create time-series collection {name}! {exp}"
+            ) from exp
+
+        return self.db[name]
 
-                else:
-                    tweet_id = tweet_data_item.data["id"]
-                    logger.info(f"Tweet [{tweet_id}] already exists. Updating...")
+    def _create_indexes(self) -> None:
+        """Create unique id indexes for the collections
 
-                    self.tweets_db.replace_one({"id": tweet_id}, tweet_data_item.data)
+        Raises ExtractorDatabaseError if an index could not be created.
+        """
+
+        try:
+            self.users_db.create_index("id", unique=True)
 
-            except PyMongoError as exp:
-                raise ExtractorDatabaseError(exp) from exp
+            if self.tweets_db is not None:
+                self.tweets_db.create_index("id", unique=True)
+
+        except PyMongoError as exp:
+            raise ExtractorDatabaseError(exp) from exp
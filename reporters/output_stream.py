@@ -0,0 +1,241 @@
+import gzip
+import io
+import os
+import re
+from typing import Optional, Union
+
+from exceptions import UnsupportedReporterError
+from utils import logger
+
+
+COMPRESSIONS = ("gzip", "zstd")
+EXTENSIONS = {"gzip": ".gz", "zstd": ".zst"}
+# write buffer between the text encoder and the compressor or file
+BUFFER_SIZE = 1 << 20
+MIN_BUFFER_SIZE = 1 << 13
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+
+class OutputStream:
+    """Buffered output with optional compression and sharding
+
+    Each write call is one record, e.g. a CSV row or a JSON line. Records
+    are text, or bytes if binary is set. If
+    shard_rows or shard_bytes is given, records are written to numbered
+    shards (results_001.csv.gz, results_002.csv.gz, ...) and a new shard is
+    started when the current one has shard_rows records or shard_bytes bytes
+    on disk. The size on disk is checked as the buffers are flushed, so a
+    shard can exceed shard_bytes by about the buffer size, which is reduced
+    to a sixteenth of shard_bytes.
+
+    The header is written at the beginning of every new file. In append
+    mode, existing output is kept: a single file is appended to without a
+    header, and a shard set is continued with a new shard after the last
+    existing one. Otherwise shards left by a previous run are removed.
+
+    Raises UnsupportedReporterError if the compression is not supported.
+
+    :type filename: str
+    :param filename: Name of the output file, the compression extension is added if missing
+    :type compression: str
+    :param compression: gzip, zstd or None for plain text
+    :type shard_rows: int
+    :param shard_rows: Maximum number of records in a shard
+    :type shard_bytes: int
+    :param shard_bytes: Maximum size of a shard in bytes
+    :type append: bool
+    :param append: Whether to keep existing output and continue after it
+    :type header: str | bytes
+    :param header: Text to write at the beginning of every file
+    :type buffer_size: int
+    :param buffer_size: Size of the write buffer in bytes
+    :type binary: bool
+    :param binary: Whether records are bytes instead of text
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        compression: Optional[str] = None,
+        shard_rows: Optional[int] = None,
+        shard_bytes: Optional[int] = None,
+        append: Optional[bool] = False,
+        header: Optional[Union[str, bytes]] = None,
+        buffer_size: Optional[int] = BUFFER_SIZE,
+        binary: Optional[bool] = False,
+    ) -> None:
+
+        if compression and compression not in COMPRESSIONS:
+            raise UnsupportedReporterError(
+                f"Unsupported compression! Should be one of {', '.join(COMPRESSIONS)}"
+            )
+
+        if compression == "zstd":
+            try:
+                import zstandard  # noqa: F401
+            except ImportError as exp:
+                raise UnsupportedReporterError(
+                    "zstd compression needs the zstandard package!"
+                ) from exp
+
+        extension = EXTENSIONS.get(compression, "")
+        if extension and filename.endswith(extension):
+            filename = filename[: -len(extension)]
+
+        self._root, self._extension = os.path.splitext(filename)
+        self._extension += extension
+        self._filename = filename + extension
+
+        self._compression = compression
+        self._shard_rows = shard_rows
+        self._shard_bytes = shard_bytes
+        self._sharded = bool(shard_rows or shard_bytes)
+        self._header = header
+        self._binary = binary
+        self._buffer_size = buffer_size
+        if shard_bytes:
+            # keep the size on disk close to the written data
+            self._buffer_size = max(min(buffer_size, shard_bytes // 16), MIN_BUFFER_SIZE)
+
+        self._file = None
+        self._writer = None
+        self._shard_number = 0
+        self._rows_in_shard = 0
+
+        self.filenames = []
+        self.rows = 0
+
+        existing_shards = self._get_existing_shards() if self._sharded else []
+
+        if append:
+            if existing_shards:
+                self._shard_number = max(existing_shards)
+            self._open(append=not self._sharded)
+        else:
+            for number in existing_shards:
+                os.remove(self._get_shard_filename(number))
+            if existing_shards:
+                logger.debug(f"Removed {len(existing_shards)} shards of the previous output.")
+            self._open()
+
+    def __enter__(self) -> "OutputStream":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def write(self, record: Union[str, bytes]) -> int:
+        """Write a record, start a new shard first if the current one is full
+
+        :type record: str | bytes
+        :param record: Record with its line terminator
+        :rtype: int
+        :returns: Number of characters or bytes written
+        """
+
+        if self._sharded and self._rows_in_shard and self._is_shard_full():
+            self._close_file()
+            self._open()
+
+        self._rows_in_shard += 1
+        self.rows += 1
+
+        return self._writer.write(record)
+
+    def close(self) -> None:
+        """Flush buffers and close the current file"""
+
+        if self._writer is not None:
+            self._close_file()
+
+    def _is_shard_full(self) -> bool:
+        """Check the record and byte limits of the current shard
+
+        :rtype: bool
+        :returns: True if no more records should be written to the shard
+        """
+
+        if self._shard_rows and self._rows_in_shard >= self._shard_rows:
+            return True
+
+        return bool(self._shard_bytes and self._file.tell() >= self._shard_bytes)
+
+    def _open(self, append: bool = False) -> None:
+        """Open the next shard or the output file
+
+        :type append: bool
+        :param append: Whether to append to the file instead of truncating it
+        """
+
+        if self._sharded:
+            self._shard_number += 1
+            filename = self._get_shard_filename(self._shard_number)
+        else:
+            filename = self._filename
+
+        write_header = not (append and os.path.exists(filename) and os.path.getsize(filename))
+
+        # unbuffered, the buffer is added on top of the compressor
+        self._file = open(filename, "ab" if append else "wb", buffering=0)
+
+        if self._compression == "gzip":
+            stream = gzip.GzipFile(fileobj=self._file, mode="wb", compresslevel=GZIP_LEVEL)
+        elif self._compression == "zstd":
+            import zstandard
+
+            stream = zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(
+                self._file, closefd=False, write_return_read=True
+            )
+        else:
+            stream = self._file
+
+        self._writer = io.BufferedWriter(stream, self._buffer_size)
+        if not self._binary:
+            self._writer = io.TextIOWrapper(self._writer, encoding="utf-8", newline="")
+
+        self._rows_in_shard = 0
+        self.filenames.append(filename)
+
+        if self._header and write_header:
+            self._writer.write(self._header)
+
+        logger.debug(f"Writing to {filename}...")
+
+    def _close_file(self) -> None:
+        """Flush the buffer, compression and file layers and close them"""
+
+        # closing the writer closes the compressor, which does not close the file
+        self._writer.close()
+        if not self._file.closed:
+            self._file.close()
+
+        self._writer = None
+        self._file = None
+
+    def _get_shard_filename(self, number: int) -> str:
+        """Get file name of the numbered shard
+
+        :type number: int
+        :param number: Shard number starting from 1
+        :rtype: str
+        :returns: File name like results_001.csv.gz
+        """
+
+        return f"{self._root}_{number:03d}{self._extension}"
+
+    def _get_existing_shards(self) -> list[int]:
+        """Find shards of the output in the output directory
+
+        :rtype: list
+        :returns: Shard numbers
+        """
+
+        directory, root = os.path.split(self._root)
+        pattern = re.compile(rf"{re.escape(root)}_(\d{{3,}}){re.escape(self._extension)}$")
+
+        return [
+            int(match.group(1))
+            for match in map(pattern.match, os.listdir(directory or "."))
+            if match
+        ]
@@ -0,0 +1,110 @@
+from typing import Generator, Iterable, Union
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import metrics
+from models.user import User
+from models.tweet import Tweet
+from reporters import arrow_schema
+from reporters.file_reporter import FileReporter
+from utils import logger, ExtractedDataType
+
+
+Friends = Generator[User, None, None]
+Followers = Generator[User, None, None]
+Tweets = Generator[Tweet, None, None]
+
+
+class ParquetReporter(FileReporter):
+    """Parquet report generator
+
+    Users and tweets are written with the typed schemas of the arrow_schema
+    module, one row group per ROW_GROUP_SIZE rows, so only one row group is
+    kept in memory while the extracted data is streamed to the file.
+
+    :type filename: str
+    :param filename: Name of the output file
+    :type extracted_data_type: ExtractedDataType
+    :param extracted_data_type: Enum value for the extracted data type
+    """
+
+    ROW_GROUP_SIZE = 50_000
+    COMPRESSION = "zstd"
+
+    def __init__(self, filename: str, extracted_data_type: ExtractedDataType) -> None:
+
+        super().__init__(filename, extracted_data_type)
+
+    def _save_user_data(self, extracted_data: User) -> None:
+        """Save single user data
+
+        :type extracted_data: User
+        :param extracted_data: User object
+        """
+
+        logger.info("Saving user data...")
+
+        logger.info(extracted_data)
+
+        self._save_records(
+            arrow_schema.USER_SCHEMA, [arrow_schema.user_record(extracted_data.data)]
+        )
+
+    def _save_users_data(
+        self, extracted_data: Union[list[User], Union[Friends, Followers]]
+    ) -> None:
+        """Save users/friends/followers data
+
+        :type extracted_data: Generator
+        :param extracted_data: List of Users(users/friends/followers)
+        """
+
+        is_friends_data = self._extracted_data_type == ExtractedDataType.FRIENDS
+
+        if self._extracted_data_type == ExtractedDataType.USERS:
+            logger.debug("Saving users data...")
+        else:
+            logger.debug(f"Saving {'friends' if is_friends_data else 'followers'} data...")
+
+        self._save_records(
+            arrow_schema.USER_SCHEMA,
+            (arrow_schema.user_record(user_data_item.data) for user_data_item in extracted_data),
+        )
+
+    def _save_tweets_data(self, extracted_data: Tweets) -> None:
+        """Save tweets data
+
+        :type extracted_data: Generator
+        :param extracted_data: List of Tweets
+        """
+
+        logger.debug("Saving tweets data...")
+
+        self._save_records(
+            arrow_schema.TWEET_SCHEMA,
+            (arrow_schema.tweet_record(tweet_data_item.data) for tweet_data_item in extracted_data),
+        )
+
+    def _save_records(self, schema: pa.Schema, records: Iterable[dict]) -> None:
+        """Write records to the file in row groups
+
+        :type schema: pa.Schema
+        :param schema: Schema of the records
+        :type records: Iterable
+        :param records: Records of the schema
+        """
+
+        rows = 0
+        write_batch_seconds = metrics.histogram("write_batch_seconds", reporter="ParquetReporter")
+
+        with pq.ParquetWriter(self._filename, schema, compression=self.COMPRESSION) as writer:
+            for batch in arrow_schema.record_batches(records, schema, self.ROW_GROUP_SIZE):
+                with write_batch_seconds.time():
+                    writer.write_batch(batch, row_group_size=self.ROW_GROUP_SIZE)
+                rows += batch.num_rows
+
+                logger.debug(f"Wrote row group of {batch.num_rows} rows.")
+
+        self.filenames = [self._filename]
+        logger.debug(f"Wrote {rows} rows to {self._filename}")
@@ -0,0 +1,257 @@
+import json
+import os
+import re
+import threading
+from datetime import datetime
+from typing import Callable, Generator, Optional, Union
+
+from models.user import User
+from models.tweet import Tweet
+from reporters.file_reporter import FileReporter
+from utils import logger, ExtractedDataType
+
+
+Friends = Generator[User, None, None]
+Followers = Generator[User, None, None]
+Tweets = Generator[Tweet, None, None]
+
+# partition column name and value format by partitioning option
+PARTITION_FORMATS = {"day": ("date", "%Y-%m-%d"), "month": ("month", "%Y-%m")}
+MANIFEST_FILENAME = "_manifest.json"
+# buffered tweets of a partition written as a part file at once
+PART_SIZE = 100_000
+# buffered tweets of all partitions, the largest partition is written when it is reached
+MAX_BUFFERED_TWEETS = 200_000
+
+# lock of each partition directory, held while a part number is taken and the manifest updated
+_directory_locks = {}
+_directory_locks_lock = threading.Lock()
+
+
+def get_partition(created_at: datetime, partition_by: str) -> str:
+    """Get partition value of the creation time
+
+    :type created_at: datetime
+    :param created_at: Creation time of the tweet
+    :type partition_by: str
+    :param partition_by: day or month
+    :rtype: str
+    :returns: Partition value like 2022-03-01 or 2022-03
+    """
+
+    return created_at.strftime(PARTITION_FORMATS[partition_by][1])
+
+
+class PartitionedReporter(FileReporter):
+    """Write tweets to Hive-style partition directories by creation date
+
+    Tweets are routed by created_at into directories named after the
+    output file, e.g. results/date=2022-03-01/ for day partitions or
+    results/month=2022-03/ for month partitions. Tweets of a partition are
+    buffered and written as a new part file (part-00001.csv, ...) by the
+    file reporter when PART_SIZE tweets are buffered, when all partitions
+    have MAX_BUFFERED_TWEETS tweets in total, or when the data ends.
+
+    Each partition directory has a _manifest.json listing the parts with
+    the files written for them, several if the output is sharded, their
+    tweet counts, min/max ids and min/max creation times. Parts of later
+    runs are added after the existing ones.
+
+    Users are not partitioned, they are written to the output file.
+
+    Reporters writing to the same partition directories, e.g. on the
+    threads of the pipeline, take part numbers and update manifests one
+    at a time.
+
+    :type filename: str
+    :param filename: Name of the output file
+    :type extracted_data_type: ExtractedDataType
+    :param extracted_data_type: Enum value for the extracted data type
+    :type reporter_factory: Callable
+    :param reporter_factory: Function returning the file reporter for a file name
+    :type partition_by: str
+    :param partition_by: day or month
+    :type directory: str
+    :param directory: Root of the partition directories, the output file without extension by default
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        extracted_data_type: ExtractedDataType,
+        reporter_factory: Callable[[str], FileReporter],
+        partition_by: str,
+        directory: Optional[str] = None,
+    ) -> None:
+
+        super().__init__(filename, extracted_data_type)
+
+        self._reporter_factory = reporter_factory
+        self._partition_column = PARTITION_FORMATS[partition_by][0]
+        self._partition_by = partition_by
+        root, self._extension = os.path.splitext(filename)
+        self._directory = directory or root
+
+    def _save_user_data(self, extracted_data: User) -> None:
+        """Save single user data to the output file
+
+        :type extracted_data: User
+        :param extracted_data: User object
+        """
+
+        self._reporter_factory(self._filename).save(extracted_data)
+
+    def _save_users_data(
+        self, extracted_data: Union[list[User], Union[Friends, Followers]]
+    ) -> None:
+        """Save users/friends/followers data to the output file
+
+        :type extracted_data: Generator
+        :param extracted_data: List of Users(users/friends/followers)
+        """
+
+        logger.warning("Users are not partitioned, saving them to a single file...")
+
+        self._reporter_factory(self._filename).save(extracted_data)
+
+    def _save_tweets_data(self, extracted_data: Tweets) -> None:
+        """Route tweets to partition buffers and write the buffers as part files
+
+        :type extracted_data: Generator
+        :param extracted_data: List of Tweets
+        """
+
+        logger.debug(f"Saving tweets data partitioned by {self._partition_by}...")
+
+        buffers = {}
+        buffered = 0
+
+        for tweet_data_item in extracted_data:
+            partition = get_partition(tweet_data_item.data["created_at"], self._partition_by)
+            buffer = buffers.setdefault(partition, [])
+            buffer.append(tweet_data_item)
+            buffered += 1
+
+            if len(buffer) >= PART_SIZE:
+                buffered -= len(buffer)
+                self._write_part(partition, buffers.pop(partition))
+
+            elif buffered >= MAX_BUFFERED_TWEETS:
+                largest = max(buffers, key=lambda key: len(buffers[key]))
+                buffered -= len(buffers[largest])
+                self._write_part(largest, buffers.pop(largest))
+
+        for partition, buffer in sorted(buffers.items()):
+            self._write_part(partition, buffer)
+
+        self._filename = f"{self._directory}/{self._partition_column}=*/"
+
+    def _write_part(self, partition: str, tweets: list[Tweet]) -> None:
+        """Write tweets as a new part file of the partition and update its manifest
+
+        :type partition: str
+        :param partition: Partition value
+        :type tweets: list
+        :param tweets: Tweets of the partition
+        """
+
+        directory = os.path.join(self._directory, f"{self._partition_column}={partition}")
+        os.makedirs(directory, exist_ok=True)
+
+        with _get_directory_lock(directory):
+            self._write_part_locked(directory, partition, tweets)
+
+    def _write_part_locked(self, directory: str, partition: str, tweets: list[Tweet]) -> None:
+        """Write the part file and update the manifest, holding the lock of the directory
+
+        :type directory: str
+        :param directory: Partition directory
+        :type partition: str
+        :param partition: Partition value
+        :type tweets: list
+        :param tweets: Tweets of the partition
+        """
+
+        manifest = self._read_manifest(directory, partition)
+        part_filename = f"part-{self._get_next_part_number(directory):05d}{self._extension}"
+
+        part_path = os.path.join(directory, part_filename)
+        reporter = self._reporter_factory(part_path)
+        reporter.save(tweets)
+        # compression and sharding change the names of the written files
+        files = [os.path.relpath(path, directory) for path in reporter.filenames or [part_path]]
+
+        ids = [int(tweet.data["id"]) for tweet in tweets]
+        created_at = [tweet.data["created_at"] for tweet in tweets]
+
+        manifest["parts"].append(
+            {
+                "files": files,
+                "count": len(tweets),
+                "min_id": min(ids),
+                "max_id": max(ids),
+                "min_created_at": min(created_at).isoformat(),
+                "max_created_at": max(created_at).isoformat(),
+            }
+        )
+
+        parts = manifest["parts"]
+        manifest["count"] = sum(part["count"] for part in parts)
+        manifest["min_id"] = min(part["min_id"] for part in parts)
+        manifest["max_id"] = max(part["max_id"] for part in parts)
+        manifest["min_created_at"] = min(part["min_created_at"] for part in parts)
+        manifest["max_created_at"] = max(part["max_created_at"] for part in parts)
+
+        with open(os.path.join(directory, MANIFEST_FILENAME), "w", encoding="utf-8") as file:
+            json.dump(manifest, file, indent=4)
+
+        logger.debug(f"Wrote {len(tweets)} tweets to {directory}/{', '.join(files)}")
+
+    def _read_manifest(self, directory: str, partition: str) -> dict:
+        """Read the manifest of the partition, or create an empty one
+
+        :type directory: str
+        :param directory: Partition directory
+        :type partition: str
+        :param partition: Partition value
+        :rtype: dict
+        :returns: Manifest
+        """
+
+        manifest_filename = os.path.join(directory, MANIFEST_FILENAME)
+
+        if os.path.exists(manifest_filename):
+            with open(manifest_filename, encoding="utf-8") as file:
+                return json.load(file)
+
+        return {"partition": {self._partition_column: partition}, "parts": []}
+
+    def _get_next_part_number(self, directory: str) -> int:
+        """Get the number after the last part file in the partition directory
+
+        :type directory: str
+        :param directory: Partition directory
+        :rtype: int
+        :returns: Part number
+        """
+
+        numbers = [
+            int(match.group(1))
+            for match in map(re.compile(r"part-(\d+)").match, os.listdir(directory))
+            if match
+        ]
+
+        return max(numbers, default=0) + 1
+
+
+def _get_directory_lock(directory: str) -> threading.Lock:
+    """Get the lock of a partition directory
+
+    :type directory: str
+    :param directory: Partition directory
+    :rtype: threading.Lock
+    :returns: Lock shared by all reporters writing to the directory
+    """
+
+    with _directory_locks_lock:
+        return _directory_locks.setdefault(os.path.abspath(directory), threading.Lock())
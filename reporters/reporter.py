@@ -1,16 +1,50 @@
 from abc import ABC, abstractmethod
-from typing import Any, Generator, Union
-
-from openpyxl.utils.datetime import to_ISO8601
+from time import perf_counter
+from typing import Any, Generator, Iterable, Iterator, Union
 
+import metrics
 from models.user import User
 from models.tweet import Tweet
+from reporters.row_serializers import get_row_serializer
 from utils import ExtractedDataType, logger
 
 Friends = Generator[User, None, None]
 Followers = Generator[User, None, None]
 Tweets = Generator[Tweet, None, None]
 
+USER_DATA_HEADER = (
+    "ID",
+    "Username",
+    "Name",
+    "Created At",
+    "Bio",
+    "URLs",
+    "Hashtags",
+    "Mentions",
+    "Location",
+    "Pinned Tweet ID",
+    "Pinned Tweet",
+    "Profile Image URL",
+    "Account Protected",
+    "Public Metrics",
+    "Url",
+    "Verified",
+)
+TWEET_DATA_HEADER = (
+    "ID",
+    "Text",
+    "Created At",
+    "Source",
+    "Language",
+    "Public Metrics",
+    "URLs",
+    "Hashtags",
+    "Mentions",
+    "Media",
+    "Place",
+    "Author",
+)
+
 
 class Reporter(ABC):
     """Base class for report generators"""
@@ -18,38 +52,8 @@ class Reporter(ABC):
     def __init__(self, extracted_data_type: ExtractedDataType) -> None:
 
         self._extracted_data_type = extracted_data_type
-        self._user_data_header = [
-            "ID",
-            "Username",
-            "Name",
-            "Created At",
-            "Bio",
-            "URLs",
-            "Hashtags",
-            "Mentions",
-            "Location",
-            "Pinned Tweet ID",
-            "Pinned Tweet",
-            "Profile Image URL",
-            "Account Protected",
-            "Public Metrics",
-            "Url",
-            "Verified",
-        ]
-        self._tweet_data_header = [
-            "ID",
-            "Text",
-            "Created At",
-            "Source",
-            "Language",
-            "Public Metrics",
-            "URLs",
-            "Hashtags",
-            "Mentions",
-            "Media",
-            "Place",
-            "Author",
-        ]
+        self._user_data_header = list(USER_DATA_HEADER)
+        self._tweet_data_header = list(TWEET_DATA_HEADER)
 
     def save(self, extracted_data: Union[Any, list[Any]]) -> None:
         """Save extracted data on the output file
@@ -60,19 +64,69 @@ class Reporter(ABC):
 
         logger.debug(f"Saving data to {self._filename}")
 
-        if self._extracted_data_type == ExtractedDataType.USER:
-            self._save_user_data(extracted_data)
-        elif (
-            self._extracted_data_type == ExtractedDataType.USERS
-            or self._extracted_data_type == ExtractedDataType.FRIENDS
-            or self._extracted_data_type == ExtractedDataType.FOLLOWERS
-        ):
-            self._save_users_data(extracted_data)
-        else:
-            self._save_tweets_data(extracted_data)
+        reporter_name = type(self).__name__
+
+        with metrics.histogram("reporter_save_seconds", reporter=reporter_name).time():
+            if self._extracted_data_type == ExtractedDataType.USER:
+                self._save_user_data(extracted_data)
+            elif (
+                self._extracted_data_type == ExtractedDataType.USERS
+                or self._extracted_data_type == ExtractedDataType.FRIENDS
+                or self._extracted_data_type == ExtractedDataType.FOLLOWERS
+            ):
+                self._save_users_data(self._measure_items(extracted_data, reporter_name))
+            else:
+                self._save_tweets_data(self._measure_items(extracted_data, reporter_name))
 
         logger.info(f"Data saved to {self._filename}")
 
+    def close(self) -> None:
+        """Release resources kept between saves, called once when the job ends"""
+
+    @staticmethod
+    def _measure_items(items: Iterable[Any], reporter_name: str) -> Iterable[Any]:
+        """Count the items passed to the reporter and the time spent waiting for them
+
+        The waiting time is spent by extraction, or by the pipeline queue,
+        the rest of the save time is spent by the reporter. Items are
+        passed through unchanged if metrics are disabled.
+
+        :type items: Iterable
+        :param items: Users or tweets to save
+        :type reporter_name: str
+        :param reporter_name: Class name of the reporter
+        :rtype: Iterable
+        :returns: Same items
+        """
+
+        if not metrics.enabled():
+            return items
+
+        def measured_items() -> Iterator[Any]:
+
+            iterator = iter(items)
+            count = 0
+            waited = 0.0
+
+            # counted locally, the counters are updated once when the items end or fail
+            try:
+                while True:
+                    started = perf_counter()
+                    item = next(iterator, StopIteration)
+                    waited += perf_counter() - started
+
+                    if item is StopIteration:
+                        return
+
+                    count += 1
+                    yield item
+
+            finally:
+                metrics.counter("reported_items_total", reporter=reporter_name).inc(count)
+                metrics.counter("reporter_wait_seconds_total", reporter=reporter_name).inc(waited)
+
+        return measured_items()
+
     @abstractmethod
     def _save_user_data(self, extracted_data: User) -> None:
         """Save single user data"""
@@ -89,86 +143,23 @@ class Reporter(ABC):
     def _get_user_row_data(data: dict) -> list:
         """Get user data for the row
 
+        Reporters writing many rows should get the serializer of their
+        header from row_serializers once instead.
+
         :type data: dict
         :param data: Data dictionary for the User
         """
 
-        return [
-            data["id"],
-            data["username"],
-            data["name"],
-            to_ISO8601(data["created_at"]),
-            data["description"],
-            " ".join(url for url in data["entities"]["url_items"]),
-            " ".join(hashtag for hashtag in data["entities"]["hashtag_items"]),
-            " ".join(mention for mention in data["entities"]["mention_items"]),
-            data["location"],
-            data["pinned_tweet_id"],
-            data["pinned_tweet_text"],
-            data["profile_image_url"],
-            data["protected"],
-            " | ".join(f"{k}: {v}" for k, v in data["public_metrics"].items()),
-            data["url"],
-            data["verified"],
-        ]
+        return list(get_row_serializer("user", USER_DATA_HEADER)(data))
 
     @staticmethod
     def _get_tweet_row_data(data: dict) -> list:
-        """Get tweet data for the row
+        """Get tweet data for the row, with the Author column if the tweet has an author
 
         :type data: dict
         :param data: Data dictionary for the Tweet
         """
 
-        def _prepare_media_output():
-
-            media_data = ""
-            for media in data["media"]:
-                media_data += f"Key: {media['media_key']}, Type: {media['type']}\n"
-                media_data += f"URL: {media['url']}\n"
-                media_data += f"Width: {media['width']}, Height: {media['width']}"
-
-                if media["type"] == "video":
-                    media_data += f"Duration: {media['duration_ms']}\n"
-                    if media["public_metrics"]:
-                        media_data += f"View count: {media['public_metrics']['view_count']}\n"
-
-                if len(data["media"]) > 1:
-                    media_data += "\n-------\n"
-
-            return media_data
-
-        def _prepare_place_output():
-
-            place_data = ""
-
-            for place in data["places"]:
-                place_data += f"ID: {place['id']}\nFull name: {place['full_name']}\n"
-                place_data += f"Country: {place['country']} ({place['country_code']})\n"
-                place_data += f"Type: {place['place_type']}\n"
-                place_data += f"Coords: {place['geo']['bbox']}"
-
-                if len(data["places"]) > 1:
-                    place_data += "\n-------\n"
-
-            return place_data
-
-        result = [
-            data["id"],
-            data["text"],
-            to_ISO8601(data["created_at"]),
-            data["source"],
-            data["language"],
-            " | ".join(f"{k}: {v}" for k, v in data["public_metrics"].items()),
-            " ".join(url for url in data["entities"]["url_items"]),
-            " ".join(hashtag for hashtag in data["entities"]["hashtag_items"]),
-            " ".join(mention for mention in data["entities"]["mention_items"]),
-            _prepare_media_output(),
-            _prepare_place_output(),
-        ]
-
-        if "author" in data:
-            author_data = User((data["author"], None))
-            result.append(str(author_data).strip())
+        header = TWEET_DATA_HEADER if "author" in data else TWEET_DATA_HEADER[:-1]
 
-        return result
+        return list(get_row_serializer("tweet", header)(data))
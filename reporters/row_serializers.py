@@ -0,0 +1,192 @@
+from functools import lru_cache
+from typing import Callable, Sequence
+
+from utils import to_iso8601
+
+
+# Python expression of each column, evaluated with the data dictionary of a
+# User or Tweet as data and its entities as entities
+USER_COLUMNS = {
+    "ID": 'data["id"]',
+    "Username": 'data["username"]',
+    "Name": 'data["name"]',
+    "Created At": 'to_iso8601(data["created_at"])',
+    "Bio": 'data["description"]',
+    "URLs": 'join_items(entities["url_items"])',
+    "Hashtags": 'join_items(entities["hashtag_items"])',
+    "Mentions": 'join_items(entities["mention_items"])',
+    "Location": 'data["location"]',
+    "Pinned Tweet ID": 'data["pinned_tweet_id"]',
+    "Pinned Tweet": 'data["pinned_tweet_text"]',
+    "Profile Image URL": 'data["profile_image_url"]',
+    "Account Protected": 'data["protected"]',
+    "Public Metrics": 'format_metrics(data["public_metrics"])',
+    "Url": 'data["url"]',
+    "Verified": 'data["verified"]',
+}
+
+TWEET_COLUMNS = {
+    "ID": 'data["id"]',
+    "Text": 'data["text"]',
+    "Created At": 'to_iso8601(data["created_at"])',
+    "Source": 'data["source"]',
+    "Language": 'data["language"]',
+    "Public Metrics": 'format_metrics(data["public_metrics"])',
+    "URLs": 'join_items(entities["url_items"])',
+    "Hashtags": 'join_items(entities["hashtag_items"])',
+    "Mentions": 'join_items(entities["mention_items"])',
+    "Media": 'format_media(data["media"]) if data["media"] else ""',
+    "Place": 'format_places(data["places"]) if data["places"] else ""',
+    "Author": 'format_author(data["author"]) if "author" in data else None',
+}
+
+COLUMNS = {"user": USER_COLUMNS, "tweet": TWEET_COLUMNS}
+
+
+def get_row_serializer(data_type: str, header: Sequence[str]) -> Callable[[dict], tuple]:
+    """Get the function converting the data of a User or Tweet to a row of the header
+
+    The function is generated once for each header, so a row is a single
+    tuple built from the values of the header's columns, without the
+    lookups and intermediate lists of the generic row formatting. Columns
+    that are not in the header are not computed.
+
+    Raises KeyError for unknown columns.
+
+    :type data_type: str
+    :param data_type: user or tweet
+    :type header: Sequence
+    :param header: Column names
+    :rtype: Callable
+    :returns: Function returning the row values of a data dictionary
+    """
+
+    return _compile_serializer(data_type, tuple(header))
+
+
+@lru_cache(maxsize=None)
+def _compile_serializer(data_type: str, header: tuple[str, ...]) -> Callable[[dict], tuple]:
+    """Generate and compile the serializer of the header"""
+
+    expressions = [COLUMNS[data_type][column] for column in header]
+
+    lines = [f"def serialize_{data_type}_row(data):"]
+    if any("entities" in expression for expression in expressions):
+        lines.append('    entities = data["entities"]')
+    lines.append("    return (")
+    lines.extend(f"        {expression}," for expression in expressions)
+    lines.append("    )")
+
+    namespace = {
+        "to_iso8601": to_iso8601,
+        "join_items": " ".join,
+        "format_metrics": format_metrics,
+        "format_media": format_media,
+        "format_places": format_places,
+        "format_author": format_author,
+    }
+    exec(compile("\n".join(lines), f"<{data_type} row serializer>", "exec"), namespace)
+
+    return namespace[f"serialize_{data_type}_row"]
+
+
+def format_metrics(metrics: dict) -> str:
+    """Format public metrics like retweet_count: 1 | reply_count: 0"""
+
+    return " | ".join([f"{name}: {value}" for name, value in metrics.items()])
+
+
+def format_media(media_items: list) -> str:
+    """Format the media of a tweet
+
+    :type media_items: list
+    :param media_items: tweepy.Media objects
+    :rtype: str
+    :returns: Key, type, URL and size of each media, duration and views of videos
+    """
+
+    separator = "\n-------\n" if len(media_items) > 1 else ""
+    parts = []
+
+    for media in media_items:
+        parts.append(
+            f"Key: {media.media_key}, Type: {media.type}\n"
+            f"URL: {media.url}\n"
+            f"Width: {media.width}, Height: {media.width}"
+        )
+
+        if media.type == "video":
+            parts.append(f"Duration: {media.duration_ms}\n")
+            if media.public_metrics:
+                parts.append(f"View count: {media.public_metrics['view_count']}\n")
+
+        parts.append(separator)
+
+    return "".join(parts)
+
+
+def format_places(places: list) -> str:
+    """Format the places of a tweet
+
+    :type places: list
+    :param places: tweepy.Place objects
+    :rtype: str
+    :returns: Id, name, country, type and coordinates of each place
+    """
+
+    separator = "\n-------\n" if len(places) > 1 else ""
+
+    return "".join(
+        [
+            f"ID: {place.id}\nFull name: {place.full_name}\n"
+            f"Country: {place.country} ({place.country_code})\n"
+            f"Type: {place.place_type}\n"
+            f"Coords: {place.geo['bbox']}{separator}"
+            for place in places
+        ]
+    )
+
+
+def format_author(author: "tweepy.User") -> str:  # noqa: F821
+    """Format the author of a search tweet as str(User((author, None))).strip() does
+
+    :type author: tweepy.User
+    :param author: Author of the tweet
+    :rtype: str
+    :returns: Author data
+    """
+
+    lines = [
+        f"{author.id}:{author.username}:{author.name}",
+        f"\tCreated at: {author.created_at}",
+        f"\tBio: {author.description}",
+    ]
+
+    entities = author.entities
+    if entities:
+        description = entities.get("description", {})
+
+        _add_items(lines, "URLs", [url["url"] for url in entities.get("url", {}).get("urls", ())])
+        _add_items(lines, "Hashtags", [tag["tag"] for tag in description.get("hashtags", ())])
+        _add_items(
+            lines, "Mentions", [user["username"] for user in description.get("mentions", ())]
+        )
+
+    lines.append(f"\tLocation: {author.location}")
+    lines.append(f"\tPinned tweet id: {author.pinned_tweet_id}")
+    lines.append(f"\tProfile image url: {author.profile_image_url}")
+    lines.append(f"\tIs account private: {'YES' if author.protected else 'NO'}")
+    lines.append("\tPublic metrics")
+    lines.extend(f"\t\t{metric}: {value}" for metric, value in author.public_metrics.items())
+    lines.append(f"\tUrl: {author.url}")
+    lines.append(f"\tVerified: {author.verified}")
+
+    return "\n".join(lines).strip()
+
+
+def _add_items(lines: list, title: str, items: list) -> None:
+    """Add a title line followed by a line for each item, if there are items"""
+
+    if items:
+        lines.append(f"\t{title}")
+        lines.extend(f"\t\t{item}" for item in items)
@@ -1,4 +1,4 @@
-from typing import Generator
+from typing import Generator, Optional
 from contextlib import contextmanager
 
 import sqlite3
@@ -6,8 +6,10 @@ import sqlite3
 from exceptions import ExtractorDatabaseError
 from models.user import User
 from models.tweet import Tweet
+from reporters import sqlite_schema
 from reporters.database_reporter import DatabaseReporter
-from utils import ExtractedDataType, logger
+from reporters.partitioning import get_partition
+from utils import ExtractedDataType, logger, item_logger
 
 Friends = Generator[User, None, None]
 Followers = Generator[User, None, None]
@@ -18,13 +20,24 @@ DBCursor = sqlite3.Connection.cursor
 class SQLiteReporter(DatabaseReporter):
     """SQLite database reporter
 
+    If partition_by is given, the user_tweets_partitions or
+    search_tweets_partitions table is updated with the tweet counts,
+    min/max ids and min/max creation times of the day or month partitions
+    the saved tweets belong to.
+
     :type extracted_data_type: ExtractedDataType
     :param extracted_data_type: Enum value for the extracted data type
+    :type partition_by: str
+    :param partition_by: day, month or None for no partitions
     """
 
-    def __init__(self, extracted_data_type: ExtractedDataType) -> None:
+    def __init__(
+        self, extracted_data_type: ExtractedDataType, partition_by: Optional[str] = None
+    ) -> None:
         super().__init__(extracted_data_type)
 
+        self._partition_by = partition_by
+
         self._create_db_tables()
 
         # only used for logging
@@ -43,7 +56,12 @@ class SQLiteReporter(DatabaseReporter):
 
         logger.info(extracted_data)
 
-        self._save_one_user(extracted_data)
+        try:
+            with self._users_db() as users_db_cursor:
+                self._save_one_user(users_db_cursor, extracted_data)
+
+        except sqlite3.Error as exp:
+            raise ExtractorDatabaseError(exp) from exp
 
     def _save_users_data(self, extracted_data: list[User]) -> None:
         """Save users/friends/followers data
@@ -61,48 +79,31 @@ class SQLiteReporter(DatabaseReporter):
         else:
             logger.debug(f"Saving {'friends' if is_friends_data else 'followers'} data...")
 
-        for user_data_item in extracted_data:
-            self._save_one_user(user_data_item)
+        try:
+            with self._users_db() as users_db_cursor:
+                for user_data_item in extracted_data:
+                    self._save_one_user(users_db_cursor, user_data_item)
+
+        except sqlite3.Error as exp:
+            raise ExtractorDatabaseError(exp) from exp
 
-    def _save_one_user(self, extracted_data: User) -> None:
+    def _save_one_user(self, users_db_cursor: DBCursor, extracted_data: User) -> None:
         """Save one user to database
 
-        Raises ExtractorDatabaseError if an error occurs
-        during the save operation.
-
+        :type users_db_cursor: sqlite3.Connection.cursor
+        :param users_db_cursor: Users database cursor
         :type extracted_data: User
         :param extracted_data: User object
         """
 
-        try:
-            with self._users_db() as users_db_cursor:
-                user_id = extracted_data.data["id"]
-                name = extracted_data.data["name"]
-                username = extracted_data.data["username"]
-
-                users_db_cursor.execute("SELECT user_id FROM users WHERE user_id=?", (user_id,))
-
-                found = users_db_cursor.fetchone()
-
-                params = DatabaseReporter._get_user_row_data(extracted_data.data)
+        user_id = extracted_data.data["id"]
+        name = extracted_data.data["name"]
+        username = extracted_data.data["username"]
 
-                if not found:
-                    users_db_cursor.execute(
-                        "INSERT INTO users VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-                        params,
-                    )
-                    logger.info(f"User [{user_id}:{username}:{name}] added to database.")
+        # the upsert adds new users and updates existing ones without a lookup per row
+        sqlite_schema.upsert_user(users_db_cursor, extracted_data.data)
 
-                else:
-                    logger.info(f"User [{user_id}:{username}:{name}] already exists. Updating...")
-
-                    users_db_cursor.execute(
-                        "REPLACE INTO users VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-                        params,
-                    )
-
-        except sqlite3.Error as exp:
-            raise ExtractorDatabaseError(exp) from exp
+        item_logger.info("User [%s:%s:%s] saved to database.", user_id, username, name)
 
     def _save_tweets_data(self, extracted_data: list[Tweet]) -> None:
         """Save tweets data
@@ -128,110 +129,63 @@ class SQLiteReporter(DatabaseReporter):
             self._filename += "search_tweets.db"
             table = "search_tweets"
 
+        partitions = set()
+
         try:
             with tweets_db() as tweets_db_cursor:
                 for tweet_data_item in extracted_data:
                     tweet_id = tweet_data_item.data["id"]
 
-                    tweets_db_cursor.execute(
-                        f"SELECT tweet_id FROM {table} WHERE tweet_id=?", (tweet_id,)
-                    )
-
-                    found = tweets_db_cursor.fetchone()
-
-                    params = DatabaseReporter._get_tweet_row_data(tweet_data_item.data)
-
-                    if not found:
-                        if table == "user_tweets":
-                            tweets_db_cursor.execute(
-                                f"INSERT INTO {table} VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-                                params,
-                            )
-                        else:
-                            # there is one more field(author) for search tweets
-                            tweets_db_cursor.execute(
-                                f"INSERT INTO {table} VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-                                params,
-                            )
-
-                        logger.info(f"Tweet[{tweet_id}] added to database.")
-
-                    else:
-                        logger.info(f"Tweet[{tweet_id}] already exists. Updating...")
-
-                        if table == "user_tweets":
-                            tweets_db_cursor.execute(
-                                f"REPLACE INTO {table} VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-                                params,
-                            )
-                        else:
-                            tweets_db_cursor.execute(
-                                f"REPLACE INTO {table} VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-                                params,
-                            )
+                    if self._partition_by:
+                        partitions.add(
+                            get_partition(tweet_data_item.data["created_at"], self._partition_by)
+                        )
+
+                    sqlite_schema.upsert_tweet(tweets_db_cursor, tweet_data_item.data, table)
+
+                    item_logger.info("Tweet[%s] saved to database.", tweet_id)
+
+                if partitions:
+                    sqlite_schema.update_partitions(tweets_db_cursor, table, sorted(partitions))
+                    logger.info(f"Updated {len(partitions)} partitions of {table}.")
 
         except sqlite3.Error as exp:
             raise ExtractorDatabaseError(exp) from exp
 
     def _create_db_tables(self) -> None:
-        """Create tables for users, user tweets and search tweets databases"""
+        """Create tables for users, user tweets and search tweets databases
+
+        Tables created by the first schema version, which kept ids as text
+        and entities, metrics, media and places as formatted strings,
+        are migrated to the normalized schema.
+        """
 
         with self._users_db() as users_db_cursor:
-            users_db_cursor.execute(
-                """CREATE TABLE IF NOT EXISTS users (
-                    user_id TEXT PRIMARY KEY NOT NULL,
-                    username TEXT NOT NULL,
-                    name TEXT NOT NULL,
-                    created_at TEXT NOT NULL,
-                    description TEXT NOT NULL,
-                    url_items TEXT,
-                    hashtag_items TEXT,
-                    mention_items TEXT,
-                    location TEXT,
-                    pinned_tweet_id TEXT,
-                    pinned_tweet_text TEXT,
-                    profile_image_url TEXT,
-                    protected TEXT NOT NULL,
-                    public_metrics TEXT NOT NULL,
-                    url TEXT,
-                    verified TEXT NOT NULL
-                );"""
-            )
-
-        with self._user_tweets_db() as user_tweets_db_cursor:
-            user_tweets_db_cursor.execute(
-                """CREATE TABLE IF NOT EXISTS user_tweets (
-                    tweet_id TEXT PRIMARY KEY NOT NULL,
-                    text TEXT NOT NULL,
-                    created_at TEXT NOT NULL,
-                    source TEXT NOT NULL,
-                    language TEXT NOT NULL,
-                    public_metrics TEXT NOT NULL,
-                    urls TEXT,
-                    hashtags TEXT,
-                    mentions TEXT,
-                    media TEXT,
-                    places TEXT
-                );"""
-            )
-
-        with self._search_tweets_db() as search_tweets_db_cursor:
-            search_tweets_db_cursor.execute(
-                """CREATE TABLE IF NOT EXISTS search_tweets (
-                    tweet_id TEXT PRIMARY KEY NOT NULL,
-                    text TEXT NOT NULL,
-                    created_at TEXT NOT NULL,
-                    source TEXT NOT NULL,
-                    language TEXT NOT NULL,
-                    public_metrics TEXT NOT NULL,
-                    urls TEXT,
-                    hashtags TEXT,
-                    mentions TEXT,
-                    media TEXT,
-                    places TEXT,
-                    author TEXT
-                );"""
-            )
+            if sqlite_schema.get_schema_version(users_db_cursor) < sqlite_schema.SCHEMA_VERSION:
+                if sqlite_schema.is_legacy_table(users_db_cursor, "users", "user_id"):
+                    logger.info("Migrating users database to the new schema...")
+                    migrated = sqlite_schema.migrate_legacy_users(users_db_cursor)
+                    logger.info(f"Migrated {migrated} users.")
+
+                sqlite_schema.create_users_tables(users_db_cursor)
+                sqlite_schema.set_schema_version(users_db_cursor)
+
+        for table, tweets_db in (
+            ("user_tweets", self._user_tweets_db),
+            ("search_tweets", self._search_tweets_db),
+        ):
+            with tweets_db() as tweets_db_cursor:
+                if (
+                    sqlite_schema.get_schema_version(tweets_db_cursor)
+                    < sqlite_schema.SCHEMA_VERSION
+                ):
+                    if sqlite_schema.is_legacy_table(tweets_db_cursor, table, "tweet_id"):
+                        logger.info(f"Migrating {table} database to the new schema...")
+                        migrated = sqlite_schema.migrate_legacy_tweets(tweets_db_cursor, table)
+                        logger.info(f"Migrated {migrated} tweets.")
+
+                    sqlite_schema.create_tweets_tables(tweets_db_cursor, table)
+                    sqlite_schema.set_schema_version(tweets_db_cursor)
 
     @contextmanager
     def _users_db(self) -> DBCursor:
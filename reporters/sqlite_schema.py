@@ -0,0 +1,746 @@
+import json
+import re
+import sqlite3
+from datetime import datetime
+from typing import Iterable, Optional
+
+from models.user import User
+from utils import to_iso8601
+
+
+SCHEMA_VERSION = 3
+
+USER_COLUMNS = (
+    "user_id",
+    "username",
+    "name",
+    "created_at",
+    "description",
+    "location",
+    "pinned_tweet_id",
+    "pinned_tweet_text",
+    "profile_image_url",
+    "protected",
+    "followers_count",
+    "following_count",
+    "tweet_count",
+    "listed_count",
+    "url",
+    "verified",
+)
+USER_METRICS = ("followers_count", "following_count", "tweet_count", "listed_count")
+
+TWEET_COLUMNS = (
+    "tweet_id",
+    "text",
+    "created_at",
+    "source",
+    "language",
+    "retweet_count",
+    "reply_count",
+    "like_count",
+    "quote_count",
+    "author_id",
+)
+TWEET_METRICS = ("retweet_count", "reply_count", "like_count", "quote_count")
+
+MEDIA_COLUMNS = (
+    "media_key",
+    "type",
+    "url",
+    "duration_ms",
+    "width",
+    "height",
+    "view_count",
+)
+PLACE_COLUMNS = ("place_id", "full_name", "country", "country_code", "place_type", "bbox")
+
+# full-text indexed column of the user and tweet tables
+FTS_COLUMNS = {
+    "users": ("user_id", "description"),
+    "user_tweets": ("tweet_id", "text"),
+    "search_tweets": ("tweet_id", "text"),
+}
+
+# child tables holding one row per entity item, named as <parent table>_<kind>
+ENTITY_TABLES = (("urls", "url"), ("hashtags", "hashtag"), ("mentions", "username"))
+
+
+def create_users_tables(cursor: sqlite3.Cursor, table: str = "users") -> None:
+    """Create user table with its entity child tables and indexes
+
+    :type cursor: sqlite3.Cursor
+    :param cursor: Database cursor
+    :type table: str
+    :param table: Name of the user table (users or authors)
+    """
+
+    cursor.execute(
+        f"""CREATE TABLE IF NOT EXISTS {table} (
+            user_id INTEGER PRIMARY KEY NOT NULL,
+            username TEXT NOT NULL,
+            name TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            description TEXT NOT NULL,
+            location TEXT,
+            pinned_tweet_id INTEGER,
+            pinned_tweet_text TEXT,
+            profile_image_url TEXT,
+            protected INTEGER NOT NULL,
+            followers_count INTEGER,
+            following_count INTEGER,
+            tweet_count INTEGER,
+            listed_count INTEGER,
+            url TEXT,
+            verified INTEGER NOT NULL
+        );"""
+    )
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_username ON {table} (username);")
+
+    _create_entity_tables(cursor, table, "user_id")
+
+    if table in FTS_COLUMNS:
+        create_fts_table(cursor, table)
+
+
+def create_tweets_tables(cursor: sqlite3.Cursor, table: str) -> None:
+    """Create tweet table with its child tables and indexes
+
+    Search tweets also get an authors table referenced by author_id.
+
+    :type cursor: sqlite3.Cursor
+    :param cursor: Database cursor
+    :type table: str
+    :param table: Name of the tweet table (user_tweets or search_tweets)
+    """
+
+    cursor.execute(
+        f"""CREATE TABLE IF NOT EXISTS {table} (
+            tweet_id INTEGER PRIMARY KEY NOT NULL,
+            text TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            source TEXT,
+            language TEXT,
+            retweet_count INTEGER,
+            reply_count INTEGER,
+            like_count INTEGER,
+            quote_count INTEGER,
+            author_id INTEGER
+        );"""
+    )
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_created_at ON {table} (created_at);")
+    cursor.execute(
+        f"CREATE INDEX IF NOT EXISTS idx_{table}_author ON {table} (author_id, created_at);"
+    )
+
+    _create_entity_tables(cursor, table, "tweet_id")
+
+    cursor.execute(
+        f"""CREATE TABLE IF NOT EXISTS {table}_media (
+            tweet_id INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            media_key TEXT NOT NULL,
+            type TEXT,
+            url TEXT,
+            duration_ms INTEGER,
+            width INTEGER,
+            height INTEGER,
+            view_count INTEGER,
+            PRIMARY KEY (tweet_id, position)
+        ) WITHOUT ROWID;"""
+    )
+    cursor.execute(
+        f"""CREATE TABLE IF NOT EXISTS {table}_places (
+            tweet_id INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            place_id TEXT NOT NULL,
+            full_name TEXT,
+            country TEXT,
+            country_code TEXT,
+            place_type TEXT,
+            bbox TEXT,
+            PRIMARY KEY (tweet_id, position)
+        ) WITHOUT ROWID;"""
+    )
+
+    create_fts_table(cursor, table)
+
+    if table == "search_tweets":
+        create_users_tables(cursor, "authors")
+
+
+def update_partitions(cursor: sqlite3.Cursor, table: str, partitions: Iterable[str]) -> None:
+    """Recompute the manifest rows of the partitions of a tweet table
+
+    Partitions are prefixes of created_at, e.g. 2022-03-01 for day or
+    2022-03 for month partitions. The {table}_partitions table keeps the
+    tweet count, min/max ids and min/max creation times of each partition,
+    computed with range scans on the created_at index.
+
+    :type cursor: sqlite3.Cursor
+    :param cursor: Database cursor
+    :type table: str
+    :param table: Name of the tweet table
+    :type partitions: Iterable
+    :param partitions: Partitions to recompute
+    """
+
+    cursor.execute(
+        f"""CREATE TABLE IF NOT EXISTS {table}_partitions (
+            partition TEXT PRIMARY KEY NOT NULL,
+            tweets INTEGER NOT NULL,
+            min_id INTEGER,
+            max_id INTEGER,
+            min_created_at TEXT,
+            max_created_at TEXT
+        ) WITHOUT ROWID;"""
+    )
+
+    for partition in partitions:
+        # "~" sorts after the characters of ISO 8601 times
+        cursor.execute(
+            f"""INSERT OR REPLACE INTO {table}_partitions
+            SELECT ?, count(*), min(tweet_id), max(tweet_id), min(created_at), max(created_at)
+            FROM {table} WHERE created_at >= ? AND created_at < ?""",
+            (partition, partition, f"{partition}~"),
+        )
+
+
+def create_fts_table(cursor: sqlite3.Cursor, table: str) -> None:
+    """Create FTS5 index over the text column of a user or tweet table
+
+    The index is an external content table, so the text is not stored twice.
+    Triggers keep it in sync with inserts, upserts and deletes on the table.
+    Rows that exist before the index is created are indexed once.
+
+    :type cursor: sqlite3.Cursor
+    :param cursor: Database cursor
+    :type table: str
+    :param table: Name of the user or tweet table
+    """
+
+    id_column, text_column = FTS_COLUMNS[table]
+    fts_table = f"{table}_fts"
+
+    exists = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (fts_table,)
+    ).fetchone()
+
+    if exists:
+        return
+
+    cursor.execute(
+        f"""CREATE VIRTUAL TABLE {fts_table} USING fts5(
+            {text_column},
+            content='{table}',
+            content_rowid='{id_column}',
+            tokenize='unicode61 remove_diacritics 2'
+        );"""
+    )
+    cursor.execute(
+        f"""CREATE TRIGGER IF NOT EXISTS {fts_table}_insert AFTER INSERT ON {table} BEGIN
+            INSERT INTO {fts_table} (rowid, {text_column})
+            VALUES (new.{id_column}, new.{text_column});
+        END;"""
+    )
+    cursor.execute(
+        f"""CREATE TRIGGER IF NOT EXISTS {fts_table}_delete AFTER DELETE ON {table} BEGIN
+            INSERT INTO {fts_table} ({fts_table}, rowid, {text_column})
+            VALUES ('delete', old.{id_column}, old.{text_column});
+        END;"""
+    )
+    cursor.execute(
+        f"""CREATE TRIGGER IF NOT EXISTS {fts_table}_update
+        AFTER UPDATE OF {text_column} ON {table} BEGIN
+            INSERT INTO {fts_table} ({fts_table}, rowid, {text_column})
+            VALUES ('delete', old.{id_column}, old.{text_column});
+            INSERT INTO {fts_table} (rowid, {text_column})
+            VALUES (new.{id_column}, new.{text_column});
+        END;"""
+    )
+
+    cursor.execute(f"INSERT INTO {fts_table} ({fts_table}) VALUES ('rebuild')")
+
+
+def _create_entity_tables(cursor: sqlite3.Cursor, table: str, id_column: str) -> None:
+    """Create url, hashtag and mention child tables for the given parent table
+
+    :type cursor: sqlite3.Cursor
+    :param cursor: Database cursor
+    :type table: str
+    :param table: Name of the parent table
+    :type id_column: str
+    :param id_column: Primary key column of the parent table
+    """
+
+    for kind, value_column in ENTITY_TABLES:
+        cursor.execute(
+            f"""CREATE TABLE IF NOT EXISTS {table}_{kind} (
+                {id_column} INTEGER NOT NULL,
+                position INTEGER NOT NULL,
+                {value_column} TEXT NOT NULL,
+                PRIMARY KEY ({id_column}, position)
+            ) WITHOUT ROWID;"""
+        )
+
+    cursor.execute(
+        f"CREATE INDEX IF NOT EXISTS idx_{table}_hashtags_hashtag "
+        f"ON {table}_hashtags (hashtag, {id_column});"
+    )
+
+
+def upsert_user(cursor: sqlite3.Cursor, data: dict, table: str = "users") -> None:
+    """Insert or update a user row together with its entity rows
+
+    :type cursor: sqlite3.Cursor
+    :param cursor: Database cursor
+    :type data: dict
+    :param data: Data dictionary for the User
+    :type table: str
+    :param table: Name of the user table (users or authors)
+    """
+
+    metrics = data["public_metrics"] or {}
+    pinned_tweet_id = data["pinned_tweet_id"]
+
+    row = (
+        data["id"],
+        data["username"],
+        data["name"],
+        to_iso8601(data["created_at"]),
+        data["description"],
+        data["location"],
+        int(pinned_tweet_id) if pinned_tweet_id and pinned_tweet_id != "None" else None,
+        data["pinned_tweet_text"],
+        data["profile_image_url"],
+        data["protected"],
+        *(metrics.get(metric) for metric in USER_METRICS),
+        data["url"],
+        data["verified"],
+    )
+
+    cursor.execute(_upsert_statement(table, USER_COLUMNS), row)
+
+    _replace_entity_rows(cursor, table, "user_id", data["id"], data["entities"])
+
+
+def upsert_tweet(cursor: sqlite3.Cursor, data: dict, table: str) -> None:
+    """Insert or update a tweet row together with its child rows
+
+    Author of a search tweet is saved to the authors table and
+    referenced from the tweet row by its id.
+
+    :type cursor: sqlite3.Cursor
+    :param cursor: Database cursor
+    :type data: dict
+    :param data: Data dictionary for the Tweet
+    :type table: str
+    :param table: Name of the tweet table (user_tweets or search_tweets)
+    """
+
+    tweet_id = data["id"]
+    metrics = data["public_metrics"] or {}
+    author_id = data.get("author_id")
+
+    if "author" in data and table == "search_tweets":
+        author = User((data["author"], None))
+        upsert_user(cursor, author.data, table="authors")
+        author_id = author.data["id"]
+
+    row = (
+        tweet_id,
+        data["text"],
+        to_iso8601(data["created_at"]),
+        data["source"],
+        data["language"],
+        *(metrics.get(metric) for metric in TWEET_METRICS),
+        int(author_id) if author_id else None,
+    )
+
+    cursor.execute(_upsert_statement(table, TWEET_COLUMNS), row)
+
+    _replace_entity_rows(cursor, table, "tweet_id", tweet_id, data["entities"])
+
+    cursor.execute(f"DELETE FROM {table}_media WHERE tweet_id=?", (tweet_id,))
+    cursor.executemany(
+        _insert_statement(f"{table}_media", ("tweet_id", "position") + MEDIA_COLUMNS),
+        [
+            (
+                tweet_id,
+                position,
+                media["media_key"],
+                media["type"],
+                media["url"],
+                media["duration_ms"],
+                media["width"],
+                media["height"],
+                (media["public_metrics"] or {}).get("view_count"),
+            )
+            for position, media in enumerate(data["media"])
+        ],
+    )
+
+    cursor.execute(f"DELETE FROM {table}_places WHERE tweet_id=?", (tweet_id,))
+    cursor.executemany(
+        _insert_statement(f"{table}_places", ("tweet_id", "position") + PLACE_COLUMNS),
+        [
+            (
+                tweet_id,
+                position,
+                place["id"],
+                place["full_name"],
+                place["country"],
+                place["country_code"],
+                place["place_type"],
+                json.dumps(place["geo"]["bbox"]) if place["geo"] else None,
+            )
+            for position, place in enumerate(data["places"])
+        ],
+    )
+
+
+def _replace_entity_rows(
+    cursor: sqlite3.Cursor, table: str, id_column: str, item_id: int, entities: dict
+) -> None:
+    """Replace url, hashtag and mention rows of a user or tweet
+
+    :type cursor: sqlite3.Cursor
+    :param cursor: Database cursor
+    :type table: str
+    :param table: Name of the parent table
+    :type id_column: str
+    :param id_column: Primary key column of the parent table
+    :type item_id: int
+    :param item_id: ID of the user or tweet
+    :type entities: dict
+    :param entities: Entities dictionary of the data model
+    """
+
+    for kind, value_column in ENTITY_TABLES:
+        cursor.execute(f"DELETE FROM {table}_{kind} WHERE {id_column}=?", (item_id,))
+        cursor.executemany(
+            _insert_statement(f"{table}_{kind}", (id_column, "position", value_column)),
+            [
+                (item_id, position, value)
+                for position, value in enumerate(entities.get(f"{kind[:-1]}_items", []))
+            ],
+        )
+
+
+def _insert_statement(table: str, columns: tuple) -> str:
+    """Build an INSERT statement for the given columns"""
+
+    return f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+
+
+def _upsert_statement(table: str, columns: tuple) -> str:
+    """Build an INSERT statement updating the existing row on primary key conflict
+
+    An upsert is used instead of REPLACE, so that rows are updated in place
+    and update triggers fire for them.
+    """
+
+    updates = ", ".join(f"{column}=excluded.{column}" for column in columns[1:])
+
+    return f"{_insert_statement(table, columns)} ON CONFLICT({columns[0]}) DO UPDATE SET {updates}"
+
+
+def get_schema_version(cursor: sqlite3.Cursor) -> int:
+    """Get schema version stored in the database file
+
+    :type cursor: sqlite3.Cursor
+    :param cursor: Database cursor
+    :rtype: int
+    :returns: Schema version, 0 for empty or pre-versioned databases
+    """
+
+    return cursor.execute("PRAGMA user_version").fetchone()[0]
+
+
+def set_schema_version(cursor: sqlite3.Cursor, version: int = SCHEMA_VERSION) -> None:
+    """Store the schema version in the database file
+
+    :type cursor: sqlite3.Cursor
+    :param cursor: Database cursor
+    :type version: int
+    :param version: Schema version
+    """
+
+    cursor.execute(f"PRAGMA user_version = {int(version)}")
+
+
+def is_legacy_table(cursor: sqlite3.Cursor, table: str, id_column: str) -> bool:
+    """Check if the table was created by the first, string based schema
+
+    :type cursor: sqlite3.Cursor
+    :param cursor: Database cursor
+    :type table: str
+    :param table: Table name
+    :type id_column: str
+    :param id_column: Primary key column of the table
+    :rtype: bool
+    :returns: Whether the id column of the table is TEXT
+    """
+
+    column_type = cursor.execute(
+        "SELECT type FROM pragma_table_info(?) WHERE name=?", (table, id_column)
+    ).fetchone()
+
+    return bool(column_type) and column_type[0].upper() == "TEXT"
+
+
+def migrate_legacy_users(cursor: sqlite3.Cursor) -> int:
+    """Migrate users table of the first schema to the normalized schema
+
+    :type cursor: sqlite3.Cursor
+    :param cursor: Database cursor
+    :rtype: int
+    :returns: Number of migrated rows
+    """
+
+    cursor.execute("ALTER TABLE users RENAME TO users_v1")
+    create_users_tables(cursor)
+
+    migrated = 0
+
+    for row in cursor.execute("SELECT * FROM users_v1").fetchall():
+        (
+            user_id,
+            username,
+            name,
+            created_at,
+            description,
+            url_items,
+            hashtag_items,
+            mention_items,
+            location,
+            pinned_tweet_id,
+            pinned_tweet_text,
+            profile_image_url,
+            protected,
+            public_metrics,
+            url,
+            verified,
+        ) = row
+
+        metrics = _parse_legacy_metrics(public_metrics)
+
+        cursor.execute(
+            _upsert_statement("users", USER_COLUMNS),
+            (
+                int(user_id),
+                username,
+                name,
+                created_at,
+                description,
+                location,
+                int(pinned_tweet_id) if pinned_tweet_id and pinned_tweet_id.isdigit() else None,
+                pinned_tweet_text,
+                profile_image_url,
+                _parse_legacy_bool(protected),
+                *(metrics.get(metric) for metric in USER_METRICS),
+                url,
+                _parse_legacy_bool(verified),
+            ),
+        )
+
+        _replace_entity_rows(
+            cursor,
+            "users",
+            "user_id",
+            int(user_id),
+            {
+                "url_items": (url_items or "").split(),
+                "hashtag_items": (hashtag_items or "").split(),
+                "mention_items": (mention_items or "").split(),
+            },
+        )
+
+        migrated += 1
+
+    cursor.execute("DROP TABLE users_v1")
+
+    return migrated
+
+
+def migrate_legacy_tweets(cursor: sqlite3.Cursor, table: str) -> int:
+    """Migrate tweet table of the first schema to the normalized schema
+
+    Media, place and author columns were saved as formatted text,
+    they are parsed back into their own tables. Legacy media text
+    contains the width value in place of height, so height is not migrated.
+
+    :type cursor: sqlite3.Cursor
+    :param cursor: Database cursor
+    :type table: str
+    :param table: Name of the tweet table (user_tweets or search_tweets)
+    :rtype: int
+    :returns: Number of migrated rows
+    """
+
+    cursor.execute(f"ALTER TABLE {table} RENAME TO {table}_v1")
+    create_tweets_tables(cursor, table)
+
+    migrated = 0
+
+    for row in cursor.execute(f"SELECT * FROM {table}_v1").fetchall():
+        tweet_id, text, created_at, source, language, public_metrics = row[:6]
+        urls, hashtags, mentions, media, places = row[6:11]
+        author = row[11] if len(row) > 11 else None
+
+        tweet_id = int(tweet_id)
+        metrics = _parse_legacy_metrics(public_metrics)
+        author_id = _migrate_legacy_author(cursor, author) if author else None
+
+        cursor.execute(
+            _upsert_statement(table, TWEET_COLUMNS),
+            (
+                tweet_id,
+                text,
+                created_at,
+                source,
+                language,
+                *(metrics.get(metric) for metric in TWEET_METRICS),
+                author_id,
+            ),
+        )
+
+        _replace_entity_rows(
+            cursor,
+            table,
+            "tweet_id",
+            tweet_id,
+            {
+                "url_items": (urls or "").split(),
+                "hashtag_items": (hashtags or "").split(),
+                "mention_items": (mentions or "").split(),
+            },
+        )
+
+        cursor.executemany(
+            _insert_statement(f"{table}_media", ("tweet_id", "position") + MEDIA_COLUMNS),
+            [
+                (
+                    tweet_id,
+                    position,
+                    match["media_key"],
+                    match["type"],
+                    match["url"],
+                    _to_int(match["duration_ms"]),
+                    _to_int(match["width"]),
+                    None,
+                    _to_int(match["view_count"]),
+                )
+                for position, match in enumerate(_LEGACY_MEDIA_RE.finditer(media or ""))
+            ],
+        )
+
+        cursor.executemany(
+            _insert_statement(f"{table}_places", ("tweet_id", "position") + PLACE_COLUMNS),
+            [
+                (
+                    tweet_id,
+                    position,
+                    match["place_id"],
+                    match["full_name"],
+                    match["country"],
+                    match["country_code"],
+                    match["place_type"],
+                    match["bbox"],
+                )
+                for position, match in enumerate(_LEGACY_PLACE_RE.finditer(places or ""))
+            ],
+        )
+
+        migrated += 1
+
+    cursor.execute(f"DROP TABLE {table}_v1")
+
+    return migrated
+
+
+_LEGACY_MEDIA_RE = re.compile(
+    r"Key: (?P<media_key>[^,]*), Type: (?P<type>\w+)\n"
+    r"URL: (?P<url>.*)\n"
+    r"Width: (?P<width>\d+|None), Height: (?:\d+|None)"
+    r"(?:Duration: (?P<duration_ms>\d+|None)\n)?"
+    r"(?:View count: (?P<view_count>\d+|None)\n)?"
+)
+_LEGACY_PLACE_RE = re.compile(
+    r"ID: (?P<place_id>.*)\n"
+    r"Full name: (?P<full_name>.*)\n"
+    r"Country: (?P<country>.*) \((?P<country_code>.*)\)\n"
+    r"Type: (?P<place_type>.*)\n"
+    r"Coords: (?P<bbox>.*)"
+)
+
+
+def _migrate_legacy_author(cursor: sqlite3.Cursor, author: str) -> Optional[int]:
+    """Save the author text of a legacy search tweet to the authors table
+
+    The text is the output of User.__str__, only the fields that
+    can be recovered reliably are kept.
+
+    :type cursor: sqlite3.Cursor
+    :param cursor: Database cursor
+    :type author: str
+    :param author: Author text of the legacy search tweet
+    :rtype: int
+    :returns: Author id
+    """
+
+    header, *lines = author.splitlines()
+    author_id, username, name = header.split(":", 2)
+
+    fields = {}
+    for line in lines:
+        key, _, value = line.strip().partition(": ")
+        fields[key] = value
+
+    created_at = fields.get("Created at", "")
+    if created_at:
+        created_at = datetime.fromisoformat(created_at).isoformat()
+
+    cursor.execute(
+        "INSERT OR IGNORE INTO authors "
+        "(user_id, username, name, created_at, description, location, protected, url, verified) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (
+            int(author_id),
+            username,
+            name,
+            created_at,
+            fields.get("Bio", ""),
+            fields.get("Location"),
+            fields.get("Is account private") == "YES",
+            fields.get("Url"),
+            fields.get("Verified") == "True",
+        ),
+    )
+
+    return int(author_id)
+
+
+def _parse_legacy_metrics(public_metrics: Optional[str]) -> dict:
+    """Parse "key: value | key: value" formatted public metrics"""
+
+    metrics = {}
+
+    for item in (public_metrics or "").split(" | "):
+        key, _, value = item.partition(": ")
+        if value:
+            metrics[key] = _to_int(value)
+
+    return metrics
+
+
+def _parse_legacy_bool(value) -> bool:
+    """Parse boolean saved to a TEXT column"""
+
+    return str(value) in ("1", "True", "true")
+
+
+def _to_int(value: Optional[str]) -> Optional[int]:
+    """Convert numeric text to int"""
+
+    return int(value) if value and value.isdigit() else None
@@ -0,0 +1,353 @@
+import json
+import os
+from dataclasses import dataclass, fields, replace
+from typing import Any, Optional
+
+from exceptions import (
+    InvalidConfigurationError,
+    UnsupportedConfigFileError,
+    UnsupportedExtractorError,
+)
+from factory.registry import REPORTERS
+from utils import DEFAULT_LOG_SAMPLE_RATE, ExtractedDataType
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    import tomli as tomllib
+
+
+# environment variables named with the prefix and the upper case setting name
+ENV_PREFIX = "TWITTER_EXTRACTOR_"
+
+EXTRACTED_DATA_TYPES = {
+    "user": ExtractedDataType.USER,
+    "users": ExtractedDataType.USERS,
+    "friends": ExtractedDataType.FRIENDS,
+    "followers": ExtractedDataType.FOLLOWERS,
+    "user_tweets": ExtractedDataType.USER_TWEETS,
+    "search_tweets": ExtractedDataType.SEARCH_TWEETS,
+}
+
+CHOICES = {
+    "compression": (None, "gzip", "zstd"),
+    "partition_by": (None, "day", "month"),
+    "write_profile": ("durable", "bulk"),
+}
+
+
+@dataclass(frozen=True)
+class RunConfig:
+    """Settings of an extraction job
+
+    Built once from the command line arguments, the config file and the
+    environment by load_run_configs, validated, and passed to the
+    extractor and reporter factories. Fields have the names of the
+    command line options and config file fields.
+
+    Raises InvalidConfigurationError if a setting is not valid and
+    UnsupportedExtractorError if no extractor is selected.
+    """
+
+    name: str = "job"
+    user: Optional[str] = None
+    users: Optional[str] = None
+    search: Optional[str] = None
+    friends: bool = False
+    followers: bool = False
+    user_tweets: bool = False
+    forme: bool = False
+    tweet_count: Optional[int] = None
+    excludes: str = "retweets"
+    output_type: str = "xlsx"
+    output_file: str = "results.xlsx"
+    share_mail: Optional[str] = None
+    compression: Optional[str] = None
+    shard_rows: Optional[int] = None
+    shard_bytes: Optional[int] = None
+    append: bool = False
+    rows_per_sheet: Optional[int] = None
+    sheets_per_workbook: Optional[int] = None
+    partition_by: Optional[str] = None
+    db_uri: Optional[str] = None
+    write_profile: str = "durable"
+    metrics_snapshots: bool = False
+    pipeline: bool = False
+    batch_size: int = 1000
+    queue_size: int = 8
+    log_sample_rate: float = DEFAULT_LOG_SAMPLE_RATE
+    metrics_report: Optional[str] = None
+    metrics_textfile: Optional[str] = None
+    profile: Optional[str] = None
+    profile_allocations: bool = False
+    format_workers: Optional[int] = None
+    term_index: Optional[str] = None
+    term_index_capacity: Optional[int] = None
+
+    def __post_init__(self) -> None:
+
+        for setting in fields(self):
+            value = getattr(self, setting.name)
+            if value is None:
+                continue
+
+            expected = _get_type(setting.type)
+            # bool is an int subclass, so it is checked separately, ints are valid floats
+            if not isinstance(value, (int, float) if expected is float else expected) or (
+                expected is not bool and isinstance(value, bool)
+            ):
+                raise InvalidConfigurationError(
+                    f"{self.name}: {setting.name} should be {expected.__name__}, got {value!r}"
+                )
+
+            if expected is int and value < 1:
+                raise InvalidConfigurationError(f"{self.name}: {setting.name} should be positive")
+
+        if not 0 < self.log_sample_rate <= 1:
+            raise InvalidConfigurationError(f"{self.name}: log_sample_rate should be in (0, 1]")
+
+        for setting, choices in CHOICES.items():
+            if getattr(self, setting) not in choices:
+                message = (
+                    f"{self.name}: {setting} should be one of {', '.join(filter(None, choices))}"
+                )
+                raise InvalidConfigurationError(message)
+
+        if not self.output_types:
+            raise InvalidConfigurationError(f"{self.name}: output_type is missing")
+
+        unsupported = [name for name in self.output_types if name not in REPORTERS.names()]
+        if unsupported:
+            message = (
+                f"{self.name}: Unsupported output type {', '.join(unsupported)}! "
+                f"Should be one of {', '.join(REPORTERS.names())}"
+            )
+            raise InvalidConfigurationError(message)
+
+        # raises UnsupportedExtractorError if no extractor is selected
+        self.extractor_name
+
+    @property
+    def extractor_name(self) -> str:
+        """Name of the extractor selected by the settings
+
+        Raises UnsupportedExtractorError if no extractor is selected.
+
+        :rtype: str
+        :returns: Registered extractor name
+        """
+
+        user_data_only = not (self.friends or self.followers or self.user_tweets)
+
+        if self.user and user_data_only:
+            return "user"
+        if self.users and user_data_only:
+            return "users"
+        if self.user and self.friends:
+            return "friends"
+        if self.user and self.followers:
+            return "followers"
+        if self.user and self.user_tweets:
+            return "user_tweets"
+        if self.search:
+            return "search_tweets"
+
+        raise UnsupportedExtractorError(
+            f"{self.name}: Unsupported extractor! Check your parameters."
+        )
+
+    @property
+    def extracted_data_type(self) -> ExtractedDataType:
+        """Enum value for the data extracted by the selected extractor"""
+
+        return EXTRACTED_DATA_TYPES[self.extractor_name]
+
+    @property
+    def output_types(self) -> list[str]:
+        """Comma separated output types as a list"""
+
+        return [output_type.strip() for output_type in self.output_type.split(",") if output_type]
+
+    @classmethod
+    def from_settings(cls, settings: dict[str, Any]) -> "RunConfig":
+        """Create config from settings by name, string values are converted to the field types
+
+        Raises InvalidConfigurationError for unknown settings and values
+        that cannot be converted.
+
+        :type settings: dict
+        :param settings: Settings by name
+        :rtype: RunConfig
+        :returns: Validated config
+        """
+
+        types = {setting.name: _get_type(setting.type) for setting in fields(cls)}
+        name = settings.get("name", cls.name)
+
+        unknown = sorted(set(settings) - set(types))
+        if unknown:
+            raise InvalidConfigurationError(f"{name}: Unknown settings {', '.join(unknown)}")
+
+        values = {}
+
+        for setting, value in settings.items():
+            if isinstance(value, str) and types[setting] is not str:
+                value = _convert(name, setting, value, types[setting])
+
+            values[setting] = value
+
+        return cls(**values)
+
+    def with_output(self, output_type: str, output_file: str) -> "RunConfig":
+        """Copy of the config with a single output type and output file"""
+
+        return replace(self, output_type=output_type, output_file=output_file)
+
+
+def load_run_configs(cmdline_args: "Namespace") -> list[RunConfig]:  # noqa: F821
+    """Build the configs of the jobs to run
+
+    Settings are taken from, in order of precedence:
+
+    * the config file if --useconfig is given, each job of a multi-job file
+    * command line arguments
+    * TWITTER_EXTRACTOR_* environment variables, e.g. TWITTER_EXTRACTOR_OUTPUT_TYPE
+    * RunConfig defaults
+
+    :type cmdline_args: Namespace
+    :param cmdline_args: Command line args returned by ArgumentParser
+    :rtype: list
+    :returns: Validated config of each job
+    """
+
+    names = {setting.name for setting in fields(RunConfig)}
+
+    settings = {
+        name[len(ENV_PREFIX) :].lower(): value
+        for name, value in os.environ.items()
+        if name.startswith(ENV_PREFIX) and name[len(ENV_PREFIX) :].lower() in names
+    }
+    settings.update(
+        (name, value)
+        for name, value in vars(cmdline_args).items()
+        if name in names and value is not None
+    )
+
+    if not cmdline_args.useconfig:
+        return [RunConfig.from_settings(settings)]
+
+    jobs = read_config_file(cmdline_args.configfile)
+
+    return [
+        RunConfig.from_settings({**settings, "name": f"job {number}", **job})
+        for number, job in enumerate(jobs, start=1)
+    ]
+
+
+def read_config_file(config_file: str) -> list[dict]:
+    """Read the job settings of a JSON, TOML or YAML config file
+
+    A config file has the settings of a single job, or a jobs list with
+    the settings of each job. Settings outside the jobs list are shared by
+    all jobs, e.g. in TOML:
+
+        output_type = "jsonl"
+
+        [[jobs]]
+        name = "guido"
+        user = "gvanrossum"
+        user_tweets = true
+
+        [[jobs]]
+        search = "python"
+        output_file = "python.jsonl"
+
+    :type config_file: str
+    :param config_file: Path of the config file
+    :rtype: list
+    :returns: Settings of each job
+    """
+
+    extension = os.path.splitext(config_file)[1].lower()
+
+    if extension not in (".json", ".toml", ".yaml", ".yml"):
+        raise UnsupportedConfigFileError("Config file must be a json, toml or yaml file!")
+
+    try:
+        if extension == ".json":
+            with open(config_file, encoding="utf-8") as file:
+                config = json.load(file)
+
+        elif extension == ".toml":
+            with open(config_file, "rb") as file:
+                config = tomllib.load(file)
+
+        else:
+            config = _load_yaml(config_file)
+
+    # decoding errors of all formats are ValueErrors
+    except (OSError, ValueError, ImportError) as exp:
+        raise UnsupportedConfigFileError(f"Failed to read {config_file}! {exp}") from exp
+
+    if not isinstance(config, dict):
+        raise UnsupportedConfigFileError(f"{config_file} should contain settings by name!")
+
+    jobs = config.pop("jobs", None)
+
+    if jobs is None:
+        return [config]
+
+    if not jobs or not all(isinstance(job, dict) for job in jobs):
+        raise UnsupportedConfigFileError(f"jobs of {config_file} should be a list of settings!")
+
+    return [{**config, **job} for job in jobs]
+
+
+def _load_yaml(config_file: str) -> Any:
+    """Load YAML file, PyYAML is only imported for YAML config files"""
+
+    import yaml
+
+    with open(config_file, encoding="utf-8") as file:
+        try:
+            return yaml.safe_load(file)
+        except yaml.YAMLError as exp:
+            raise ValueError(exp) from exp
+
+
+def _get_type(annotation: Any) -> type:
+    """Get the type of a field annotation, Optional[int] is int"""
+
+    return next(iter(getattr(annotation, "__args__", ())), annotation)
+
+
+def _convert(name: str, setting: str, value: str, expected: type) -> Any:
+    """Convert a string setting value to the field type
+
+    :type name: str
+    :param name: Name of the job
+    :type setting: str
+    :param setting: Name of the setting
+    :type value: str
+    :param value: String value
+    :type expected: type
+    :param expected: int, float or bool
+    :rtype: Any
+    :returns: Converted value
+    """
+
+    if expected is bool and value.lower() in ("1", "true", "yes", "on"):
+        return True
+
+    if expected is bool and value.lower() in ("0", "false", "no", "off", ""):
+        return False
+
+    if expected in (int, float):
+        try:
+            return expected(value)
+        except ValueError:
+            pass
+
+    raise InvalidConfigurationError(
+        f"{name}: {setting} should be {expected.__name__}, got {value!r}"
+    )
@@ -1,9 +1,12 @@
 import os
 import json
-from typing import Optional, Generator
+import time
+from functools import wraps
+from typing import Callable, Optional, Generator
 
 import tweepy
 
+import metrics
 from exceptions import TwitterAPISetupError, PrivateAccountError
 from utils import logger
 
@@ -16,13 +19,20 @@ TweetGenerator = Generator[tuple[tweepy.tweet.Tweet, dict], None, None]
 class TwitterAPIService:
     """Handle API requests
 
+    Rate limited requests are retried after sleeping until the rate limit
+    resets, which is recorded in the metrics with the requests.
+
     :type forme: bool
     :param forme: Whether the API will be used for account owner or authorized user
+    :type sleep: Callable
+    :param sleep: Function sleeping for the given seconds on rate limits
     """
 
-    def __init__(self, forme: Optional[bool] = False) -> None:
+    def __init__(self, forme: Optional[bool] = False, sleep: Callable = time.sleep) -> None:
 
         self._forme = forme
+        self._sleep = sleep
+        self.rate_limit_wait_seconds = 0.0
         self._api_v1 = None
         self._api_v2 = None
         self._authorized_client = None
@@ -65,7 +75,7 @@ class TwitterAPIService:
         :returns: User data and includes objects as tuple
         """
 
-        response = self._current_client.get_user(
+        response = self._request(self._current_client.get_user)(
             username=username,
             user_fields=user_fields,
             expansions=expansions,
@@ -100,7 +110,7 @@ class TwitterAPIService:
         :returns: List of user data and includes objects as tuple
         """
 
-        response = self._current_client.get_users(
+        response = self._request(self._current_client.get_users)(
             usernames=usernames,
             user_fields=user_fields,
             expansions=expansions,
@@ -154,7 +164,7 @@ class TwitterAPIService:
         user = self.get_user(username, user_auth=user_auth)[0]
 
         for response in tweepy.Paginator(
-            self._current_client.get_users_following,
+            self._request(self._current_client.get_users_following),
             user.id,
             max_results=max_results,
             user_fields=user_fields,
@@ -208,7 +218,7 @@ class TwitterAPIService:
         user = self.get_user(username, user_auth=user_auth)[0]
 
         for response in tweepy.Paginator(
-            self._current_client.get_users_followers,
+            self._request(self._current_client.get_users_followers),
             user.id,
             max_results=max_results,
             user_fields=user_fields,
@@ -271,7 +281,7 @@ class TwitterAPIService:
         user = self.get_user(username)[0]
 
         for response in tweepy.Paginator(
-            self._current_client.get_users_tweets,
+            self._request(self._current_client.get_users_tweets),
             user.id,
             tweet_fields=tweet_fields,
             place_fields=place_fields,
@@ -345,7 +355,8 @@ class TwitterAPIService:
         :returns: List of tweet data and includes objects as tuple
         """
 
-        tweet_fields.append("author_id")
+        if "author_id" not in tweet_fields:
+            tweet_fields.append("author_id")
         expansions.append("author_id")
 
         user_fields = [
@@ -369,7 +380,7 @@ class TwitterAPIService:
                 query += " -is:retweet"
 
         for response in tweepy.Paginator(
-            self._current_client.search_recent_tweets,
+            self._request(self._current_client.search_recent_tweets),
             query,
             tweet_fields=tweet_fields,
             user_fields=user_fields,
@@ -430,12 +441,80 @@ class TwitterAPIService:
         :returns: Whether account is protected
         """
 
-        response = self._current_client.get_user(
+        response = self._request(self._current_client.get_user)(
             username=username, user_fields="protected", user_auth=user_auth
         )
 
         return response.data.protected
 
+    def _request(self, method: Callable) -> Callable:
+        """Wrap a client method to record request metrics and wait on rate limits
+
+        The wrapper keeps the method name, which tweepy.Paginator uses to
+        pick the pagination parameters.
+
+        :type method: Callable
+        :param method: tweepy.Client method
+        :rtype: Callable
+        :returns: Method retried after rate limit waits
+        """
+
+        endpoint = method.__name__
+
+        @wraps(method)
+        def request(*args, **kwargs):
+
+            request_seconds = metrics.histogram("api_request_seconds", endpoint=endpoint)
+
+            while True:
+                started = time.perf_counter()
+
+                try:
+                    response = method(*args, **kwargs)
+                except tweepy.TooManyRequests as exp:
+                    metrics.counter("api_rate_limited_total", endpoint=endpoint).inc()
+                    self._wait_for_rate_limit(exp.response)
+                    continue
+
+                request_seconds.observe(time.perf_counter() - started)
+                metrics.counter("api_requests_total", endpoint=endpoint).inc()
+
+                if isinstance(response.data, list):
+                    metrics.counter("api_pages_total", endpoint=endpoint).inc()
+                    metrics.counter("api_items_total", endpoint=endpoint).inc(len(response.data))
+
+                return response
+
+        return request
+
+    def _wait_for_rate_limit(self, response: "requests.Response") -> None:  # noqa: F821
+        """Sleep until the rate limit of the rejected request resets
+
+        :type response: requests.Response
+        :param response: Response of the rate limited request
+        """
+
+        reset_time = int(response.headers.get("x-rate-limit-reset", 0))
+        sleep_seconds = max(reset_time - int(time.time()) + 1, 1)
+
+        logger.warning(f"Rate limit exceeded. Sleeping for {sleep_seconds} seconds.")
+
+        self._sleep(sleep_seconds)
+
+        self.rate_limit_wait_seconds += sleep_seconds
+        metrics.histogram("rate_limit_wait_seconds", api="twitter").observe(sleep_seconds)
+
+    @staticmethod
+    def _record_response(response: "requests.Response", *args, **kwargs) -> None:  # noqa: F821
+        """Record HTTP time and body size of an API response, used as a requests hook
+
+        :type response: requests.Response
+        :param response: API response
+        """
+
+        metrics.histogram("api_http_seconds").observe(response.elapsed.total_seconds())
+        metrics.counter("api_response_bytes_total").inc(len(response.content))
+
     def _setup_api_access_v1(self) -> None:
         """Setup access for Twitter v1 API"""
 
@@ -468,7 +547,8 @@ class TwitterAPIService:
                 "Failed to find credentials setup! Setup environment variables."
             ) from exp
 
-        self._api_v2 = tweepy.Client(bearer_token=BEARER_TOKEN, wait_on_rate_limit=True)
+        self._api_v2 = tweepy.Client(bearer_token=BEARER_TOKEN)
+        self._api_v2.session.hooks["response"].append(self._record_response)
 
     def _authorize_with_pin(self) -> None:
         """Authorize user using the PIN authentication"""
@@ -505,12 +585,11 @@ class TwitterAPIService:
             consumer_secret=CONSUMER_SECRET,
             access_token=access_token,
             access_token_secret=access_token_secret,
-            wait_on_rate_limit=True,
         )
+        self._authorized_client.session.hooks["response"].append(self._record_response)
 
-        logger.info(
-            f"Performing operations on behalf of {self._authorized_client.get_me().data.username}"
-        )
+        username = self._request(self._authorized_client.get_me)().data.username
+        logger.info(f"Performing operations on behalf of {username}")
 
     def _save_on_behalf_user_credentials(self, access_token: str, access_token_secret: str) -> None:
         """Save access credentials for the on behalf user
@@ -1,4 +1,8 @@
-from argparse import ArgumentParser
+import json
+import os
+from argparse import ArgumentParser, Namespace
+from contextlib import nullcontext
+from time import perf_counter
 
 from exceptions import (
     TwitterAPISetupError,
@@ -10,11 +14,23 @@ from exceptions import (
     UnsupportedReporterError,
     ExtractorDatabaseError,
     MissingShareMailError,
+    SpreadsheetLimitError,
+    UnsupportedConfigFileError,
+    InvalidConfigurationError,
+    TermIndexError,
 )
+import metrics
+from analysis import full_text_search
+from analysis.engagement_options import BUCKETS, REPORTS
+from analysis.term_index import KINDS, TermIndex
 from factory.extractor_factory import ExtractorFactory
 from factory.reporter_factory import ReporterFactory
+from pipeline import Pipeline
+from profiler import Profiler
+from reporters.sqlite_schema import TWEET_METRICS
+from run_config import RunConfig, load_run_configs
 from twitter_api_service import TwitterAPIService
-from utils import logger
+from utils import ExtractedDataType, item_logger, logger
 
 
 __author__ = "Coşkun Deniz <codenineeight@gmail.com>"
@@ -46,11 +62,12 @@ def get_arg_parser() -> ArgumentParser:
         "-cf",
         "--configfile",
         default="config.json",
-        help="Read configuration from given file",
+        help="Read configuration from given file (json, toml or yaml, with one or more jobs)",
     )
     arg_parser.add_argument(
         "--forme",
         action="store_true",
+        default=None,
         help="Determine API user(account owner or on behalf of a user)",
     )
     arg_parser.add_argument("-u", "--user", help="Extract user data for the given username")
@@ -58,18 +75,24 @@ def get_arg_parser() -> ArgumentParser:
         "-ul", "--users", help="Extract user data for the given comma separated usernames"
     )
     arg_parser.add_argument(
-        "-fr", "--friends", action="store_true", help="Extract friends data for the given username"
+        "-fr",
+        "--friends",
+        action="store_true",
+        default=None,
+        help="Extract friends data for the given username",
     )
     arg_parser.add_argument(
         "-fl",
         "--followers",
         action="store_true",
+        default=None,
         help="Extract followers data for the given username",
     )
     arg_parser.add_argument(
         "-ut",
         "--user_tweets",
         action="store_true",
+        default=None,
         help="Extract tweets of user with the given username",
     )
     arg_parser.add_argument(
@@ -86,64 +109,466 @@ def get_arg_parser() -> ArgumentParser:
     arg_parser.add_argument(
         "-e",
         "--excludes",
-        default="retweets",
         help="Fields to exclude from tweets queried as comma separated values (replies,retweets)",
     )
     arg_parser.add_argument(
         "-ot",
         "--output_type",
-        default="xlsx",
-        help="Output file type (csv, xlsx, gsheets, mongodb or sqlite)",
+        help="Comma separated output types (csv, xlsx, gsheets, jsonl, parquet, mongodb, sqlite or duckdb)",
     )
-    arg_parser.add_argument("-of", "--output_file", default="results.xlsx", help="Output file name")
+    arg_parser.add_argument("-of", "--output_file", help="Output file name")
     arg_parser.add_argument(
         "-sm", "--share_mail", help="Mail address to share Google Sheets document"
     )
+    arg_parser.add_argument(
+        "--compression", choices=["gzip", "zstd"], help="Compress CSV or JSON Lines output"
+    )
+    arg_parser.add_argument(
+        "--shard_rows",
+        type=int,
+        help="Start a new CSV or JSON Lines shard every given number of rows",
+    )
+    arg_parser.add_argument(
+        "--shard_bytes",
+        type=int,
+        help="Start a new CSV or JSON Lines shard when the current one reaches the given size in bytes",
+    )
+    arg_parser.add_argument(
+        "--append",
+        action="store_true",
+        default=None,
+        help="Append to the existing CSV or JSON Lines output instead of overwriting it",
+    )
+    arg_parser.add_argument(
+        "--rows_per_sheet",
+        type=int,
+        help="Start a new Excel worksheet every given number of rows",
+    )
+    arg_parser.add_argument(
+        "--sheets_per_workbook",
+        type=int,
+        help="Start a new Excel workbook file every given number of worksheets",
+    )
+    arg_parser.add_argument(
+        "--partition_by",
+        choices=("day", "month"),
+        help="Write tweets to date partitions of file outputs or the SQLite partitions table",
+    )
+    arg_parser.add_argument(
+        "-du",
+        "--db_uri",
+        help="MongoDB connection URI (MONGODB_URI environment variable is used if not given)",
+    )
+    arg_parser.add_argument(
+        "-wp",
+        "--write_profile",
+        choices=["durable", "bulk"],
+        help="MongoDB write concern profile",
+    )
+    arg_parser.add_argument(
+        "--metrics_snapshots",
+        action="store_true",
+        default=None,
+        help="Record public metrics snapshots to MongoDB time-series collections",
+    )
+    arg_parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        default=None,
+        help="Run extraction and reporting in separate threads",
+    )
+    arg_parser.add_argument(
+        "--batch_size",
+        type=int,
+        help="Number of items passed from extraction to reporting at once with --pipeline",
+    )
+    arg_parser.add_argument(
+        "--queue_size",
+        type=int,
+        help="Maximum number of batches waiting to be saved by each reporter with --pipeline",
+    )
+    arg_parser.add_argument(
+        "--log_sample_rate",
+        type=float,
+        help="Fraction of the per-item log messages to write (0.01 by default, 1 logs every item)",
+    )
+    arg_parser.add_argument(
+        "--metrics_report",
+        help="Write request, item and latency metrics of the job to the given JSON file",
+    )
+    arg_parser.add_argument(
+        "--metrics_textfile",
+        help="Write the metrics of the job to the given Prometheus textfile (.prom)",
+    )
+    arg_parser.add_argument(
+        "--profile",
+        help="Write folded stacks of the job's threads to the given directory",
+    )
+    arg_parser.add_argument(
+        "--profile_allocations",
+        action="store_true",
+        default=None,
+        help="Also write top allocation sites with --profile (slows the job down several times)",
+    )
+    arg_parser.add_argument(
+        "--format_workers",
+        type=int,
+        help="Format CSV and Excel rows in the given number of processes",
+    )
+    arg_parser.add_argument(
+        "--term_index",
+        help="Count the hashtags, mentions and URLs of the tweets per day in the given JSON file",
+    )
+    arg_parser.add_argument(
+        "--term_index_capacity",
+        type=int,
+        help="Keep sketches of the given number of top terms per day in a new term index",
+    )
+
+    subparsers = arg_parser.add_subparsers(dest="command")
+
+    query_parser = subparsers.add_parser(
+        "query", help="Run full-text search on the tweets or users saved to SQLite databases"
+    )
+    query_parser.add_argument("terms", help='FTS5 query (e.g. python AND "type hints")')
+    query_parser.add_argument(
+        "-src",
+        "--source",
+        choices=["search_tweets", "user_tweets", "users"],
+        default="search_tweets",
+        help="Data to search, users are searched by their bio",
+    )
+    query_parser.add_argument("-l", "--lang", help="Language code of the tweets")
+    query_parser.add_argument("--since", help="Minimum tweet creation date (YYYY-MM-DD)")
+    query_parser.add_argument("--until", help="Tweet creation date upper bound (YYYY-MM-DD)")
+    query_parser.add_argument(
+        "-lm", "--limit", type=int, default=20, help="Maximum number of results"
+    )
+
+    analyze_parser = subparsers.add_parser(
+        "analyze", help="Compute engagement stats of tweets saved to SQLite databases or Parquet"
+    )
+    analyze_parser.add_argument(
+        "-src",
+        "--source",
+        choices=["search_tweets", "user_tweets"],
+        default="search_tweets",
+        help="SQLite database of the tweets",
+    )
+    analyze_parser.add_argument(
+        "--parquet", nargs="+", help="Read the tweets from the given Parquet files instead"
+    )
+    analyze_parser.add_argument(
+        "-r",
+        "--reports",
+        nargs="+",
+        choices=REPORTS,
+        default=list(REPORTS),
+        help="Stats to compute",
+    )
+    analyze_parser.add_argument(
+        "--sort",
+        choices=["engagement", "tweets", *TWEET_METRICS],
+        default="engagement",
+        help="Stat the authors and hashtags are sorted by",
+    )
+    analyze_parser.add_argument(
+        "--top", type=int, default=20, help="Number of authors and hashtags to show"
+    )
+    analyze_parser.add_argument(
+        "--min_tweets",
+        type=int,
+        default=1,
+        help="Minimum number of tweets of the authors and hashtags to show",
+    )
+    analyze_parser.add_argument("--bucket", choices=list(BUCKETS), default="day")
+    analyze_parser.add_argument(
+        "--window", type=int, default=7, help="Number of buckets of the rolling mean"
+    )
+    analyze_parser.add_argument("--json", help="Also write the stats to the given JSON file")
+
+    terms_parser = subparsers.add_parser(
+        "terms", help="Show the most frequent hashtags, mentions or URLs of a term index"
+    )
+    terms_parser.add_argument("index", help="JSON file written with --term_index")
+    terms_parser.add_argument("-k", "--kind", choices=list(KINDS), default="hashtag")
+    terms_parser.add_argument("--since", help="First day (YYYY-MM-DD)")
+    terms_parser.add_argument("--until", help="Day after the last day (YYYY-MM-DD)")
+    terms_parser.add_argument("--top", type=int, default=20, help="Number of terms to show")
+    terms_parser.add_argument(
+        "--merge", nargs="+", help="Add the counts of the given term indexes to the index first"
+    )
 
     return arg_parser
 
 
-def main(args) -> None:
-    """Entry point for the tool
+def query(args: Namespace) -> None:
+    """Run full-text search and print the results
 
     :type args: Namespace
     :pram args: Command line args returned by ArgumentParser
     """
 
-    try:
-        api_service = TwitterAPIService(args.forme)
-        api_service.setup_api_access()
+    started = perf_counter()
 
-    except TwitterAPISetupError as exp:
+    try:
+        results = full_text_search.search(
+            args.terms,
+            source=args.source,
+            language=args.lang,
+            since=args.since,
+            until=args.until,
+            limit=args.limit,
+        )
+    except ExtractorDatabaseError as exp:
         handle_exception(exp)
 
+    elapsed_ms = (perf_counter() - started) * 1000
+
+    for result in results:
+        text = result.pop("description" if args.source == "users" else "text")
+        rank = result.pop("rank")
+        print(" | ".join(str(value) for value in result.values()) + f" | rank={rank:.2f}")
+        print(f"\t{text}")
+
+    logger.info(f"Found {len(results)} results in {elapsed_ms:.1f} ms")
+
+
+def analyze(args: Namespace) -> None:
+    """Compute engagement stats and print them
+
+    :type args: Namespace
+    :pram args: Command line args returned by ArgumentParser
+    """
+
+    # NumPy is only imported by the analyze command
+    from analysis.engagement import EngagementData
+
+    started = perf_counter()
+
     try:
-        extractor = ExtractorFactory.get_extractor(args)
-    except UnsupportedExtractorError as exp:
+        if args.parquet:
+            data = EngagementData.from_parquet(args.parquet)
+        else:
+            data = EngagementData.from_sqlite(args.source)
+    except ExtractorDatabaseError as exp:
         handle_exception(exp)
 
+    loaded = perf_counter()
+    results = {}
+
+    if "authors" in args.reports:
+        results["authors"] = data.author_stats(args.top, args.sort, args.min_tweets)
+    if "hashtags" in args.reports:
+        results["hashtags"] = data.hashtag_stats(args.top, args.sort, args.min_tweets)
+    if "series" in args.reports:
+        results["series"] = data.time_series(args.bucket, args.window)
+    if "percentiles" in args.reports:
+        results["percentiles"] = data.percentiles()
+
+    elapsed_ms = (perf_counter() - loaded) * 1000
+
+    for report, rows in results.items():
+        print(f"\n{report.capitalize()}")
+
+        if report == "percentiles":
+            rows = [{"metric": metric, **values} for metric, values in rows.items()]
+
+        if rows:
+            print(" | ".join(rows[0]))
+        for row in rows:
+            print(
+                " | ".join(
+                    f"{value:.1f}" if isinstance(value, float) else str(value)
+                    for value in row.values()
+                )
+            )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=4)
+
+    logger.info(
+        f"Analyzed {len(data)} tweets in {elapsed_ms:.1f} ms "
+        f"(loaded in {(loaded - started) * 1000:.1f} ms)"
+    )
+
+
+def terms(args: Namespace) -> None:
+    """Print the most frequent terms of a term index
+
+    :type args: Namespace
+    :pram args: Command line args returned by ArgumentParser
+    """
+
+    started = perf_counter()
+
     try:
-        extracted_data = extractor.extract_data(api_service)
-    except (MissingUsernameParameterError, UserNotFoundError) as exp:
+        if not args.merge and not os.path.exists(args.index):
+            raise TermIndexError(f"Term index {args.index} doesn't exist")
+
+        index = TermIndex.load(args.index)
+
+        if args.merge:
+            for filename in args.merge:
+                index.merge(TermIndex.load(filename))
+            index.save(args.index)
+
+        results = index.top(args.kind, args.top, args.since, args.until)
+    except TermIndexError as exp:
         handle_exception(exp)
 
+    elapsed_ms = (perf_counter() - started) * 1000
+    estimated = " (estimated)" if index.sketched else ""
+
+    for term, count in results:
+        print(f"{term} | {count}")
+
+    logger.info(f"Found {len(results)} {args.kind} counts{estimated} in {elapsed_ms:.1f} ms")
+
+
+def run_job(run_config: RunConfig, api_service: TwitterAPIService) -> None:
+    """Extract the data of a job and save it with its reporters
+
+    :type run_config: RunConfig
+    :param run_config: Settings of the extraction job
+    :type api_service: TwitterAPIService
+    :param api_service: Twitter API client
+    """
+
+    item_logger.set_sample_rate(run_config.log_sample_rate)
+
+    if run_config.metrics_report or run_config.metrics_textfile:
+        metrics.enable()
+
+    profiling = (
+        Profiler(run_config.profile, api_service, run_config.profile_allocations)
+        if run_config.profile
+        else nullcontext()
+    )
+
+    term_index = None
+    reporters = []
+
     try:
-        reporter = ReporterFactory.get_reporter(args)
-    except (UnsupportedReporterError, ExtractorDatabaseError, MissingShareMailError) as exp:
-        handle_exception(exp)
+        with profiling:
+            extractor = ExtractorFactory.get_extractor(run_config)
+            extracted_data = extractor.extract_data(api_service)
+            reporters = ReporterFactory.get_reporters(run_config)
+
+            if run_config.term_index and run_config.extracted_data_type in (
+                ExtractedDataType.USER_TWEETS,
+                ExtractedDataType.SEARCH_TWEETS,
+            ):
+                term_index = TermIndex.load(run_config.term_index, run_config.term_index_capacity)
+                stream = f"{run_config.extractor_name}:{run_config.search or run_config.user}"
+                extracted_data = term_index.index_tweets(
+                    extracted_data, f"{stream}:{run_config.excludes}"
+                )
+
+            if run_config.extracted_data_type == ExtractedDataType.USER:
+                for reporter in reporters:
+                    reporter.save(extracted_data)
+            elif run_config.pipeline or len(reporters) > 1:
+                # the extracted data can be iterated once, the pipeline feeds it to all reporters
+                Pipeline(run_config.batch_size, run_config.queue_size).run(
+                    extracted_data, reporters
+                )
+            else:
+                reporters[0].save(extracted_data)
+
+    finally:
+        for reporter in reporters:
+            reporter.close()
+
+        # the tweets counted before a failure are recorded as indexed, they aren't counted again
+        if term_index is not None:
+            term_index.save(run_config.term_index)
+            logger.info(f"Term index saved to {run_config.term_index}")
+
+        # metrics of failed jobs are written too, they show how far the job got
+        if metrics.enabled():
+            if run_config.metrics_report:
+                metrics.write_report(run_config.metrics_report, job=run_config.name)
+            if run_config.metrics_textfile:
+                metrics.write_textfile(run_config.metrics_textfile)
+
+            metrics.disable()
+
+
+def main(args) -> None:
+    """Entry point for the tool
+
+    The settings of all jobs are read and validated before the first job
+    is run. If a job of a multi-job config file fails, the next jobs are
+    still run.
+
+    :type args: Namespace
+    :pram args: Command line args returned by ArgumentParser
+    """
 
     try:
-        reporter.save(extracted_data)
-    except (PrivateAccountError, ExtractorDatabaseError) as exp:
+        run_configs = load_run_configs(args)
+    except (
+        UnsupportedConfigFileError,
+        InvalidConfigurationError,
+        UnsupportedExtractorError,
+    ) as exp:
         handle_exception(exp)
 
+    api_services = {}
+    failed_jobs = []
+
+    for run_config in run_configs:
+        if len(run_configs) > 1:
+            logger.info(f"Running {run_config.name}...")
+
+        try:
+            if run_config.forme not in api_services:
+                api_service = TwitterAPIService(run_config.forme)
+                api_service.setup_api_access()
+                api_services[run_config.forme] = api_service
+
+            run_job(run_config, api_services[run_config.forme])
+
+        except TwitterAPISetupError as exp:
+            handle_exception(exp)
+
+        except (
+            UnsupportedExtractorError,
+            MissingUsernameParameterError,
+            UserNotFoundError,
+            UnsupportedReporterError,
+            ExtractorDatabaseError,
+            MissingShareMailError,
+            PrivateAccountError,
+            SpreadsheetLimitError,
+            TermIndexError,
+        ) as exp:
+            if len(run_configs) == 1:
+                handle_exception(exp)
+
+            logger.error(f"{run_config.name} failed: {exp}")
+            failed_jobs.append(run_config.name)
+
+    if failed_jobs:
+        logger.error(f"Failed jobs: {', '.join(failed_jobs)}")
+        raise SystemExit(1)
+
 
 if __name__ == "__main__":
     arg_parser = get_arg_parser()
     args = arg_parser.parse_args()
 
     try:
-        main(args)
+        if args.command == "query":
+            query(args)
+        elif args.command == "analyze":
+            analyze(args)
+        elif args.command == "terms":
+            terms(args)
+        else:
+            main(args)
 
     except KeyboardInterrupt:
         logger.info("Program ended manually.")
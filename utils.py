@@ -1,13 +1,16 @@
-import json
+import atexit
+import itertools
 import logging
+import queue
+from datetime import datetime
 from enum import Enum, auto
-from logging.handlers import RotatingFileHandler
-from typing import Optional
-
-from exceptions import UnsupportedConfigFileError
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any, Optional
 
 
 LOG_FILENAME = "tw_data_extractor.log"
+# fraction of the per-item messages written by item_logger
+DEFAULT_LOG_SAMPLE_RATE = 0.01
 
 # Create a custom logger
 logger = logging.getLogger(__name__)
@@ -29,9 +32,64 @@ console_handler.setFormatter(console_formatter)
 file_formatter = logging.Formatter(file_log_format, datefmt="%d-%m-%Y %H:%M:%S")
 file_handler.setFormatter(file_formatter)
 
+# Records are put on a queue and written to the handlers by a background
+# thread, so formatting and disk writes do not block extraction
+log_queue = queue.SimpleQueue()
+log_listener = QueueListener(log_queue, console_handler, file_handler, respect_handler_level=True)
+
 # Add handlers to the logger
-logger.addHandler(console_handler)
-logger.addHandler(file_handler)
+logger.addHandler(QueueHandler(log_queue))
+log_listener.start()
+atexit.register(log_listener.stop)
+
+
+class SampledLogger:
+    """Logger for per-item messages that logs one of every n calls
+
+    Messages are %-formatted only for the sampled calls at an enabled
+    level, so the items that are not logged are never turned into strings.
+
+    :type logger: logging.Logger
+    :param logger: Logger of the sampled messages
+    :type sample_rate: float
+    :param sample_rate: Fraction of the calls to log, 1 logs every call
+    """
+
+    def __init__(self, logger: logging.Logger, sample_rate: float = 1.0) -> None:
+
+        self._logger = logger
+        self._calls = itertools.count(1)
+        self.set_sample_rate(sample_rate)
+
+    def set_sample_rate(self, sample_rate: float) -> None:
+        """Set the fraction of the calls to log
+
+        :type sample_rate: float
+        :param sample_rate: Fraction of the calls to log, 1 logs every call
+        """
+
+        self._interval = max(round(1 / sample_rate), 1)
+
+    def debug(self, msg: str, *args: Any) -> None:
+        """Log a sampled message with DEBUG level"""
+
+        self._log(logging.DEBUG, msg, args)
+
+    def info(self, msg: str, *args: Any) -> None:
+        """Log a sampled message with INFO level"""
+
+        self._log(logging.INFO, msg, args)
+
+    def _log(self, level: int, msg: str, args: tuple) -> None:
+        """Log the message if the call is sampled and the level is enabled"""
+
+        # next() of a count is atomic, so threads share the sampling
+        if next(self._calls) % self._interval == 0 and self._logger.isEnabledFor(level):
+            # report the line of the caller of debug/info
+            self._logger.log(level, msg, *args, stacklevel=3)
+
+
+item_logger = SampledLogger(logger, DEFAULT_LOG_SAMPLE_RATE)
 
 
 class ExtractedDataType(Enum):
@@ -43,69 +101,40 @@ class ExtractedDataType(Enum):
     SEARCH_TWEETS = auto()
 
 
-def get_configuration(config_file: Optional[str] = "config.json") -> dict:
-    """Read configuration file
+def get_entity_items(entities: dict, name: str) -> Optional[list]:
+    """Get URLs, hashtags or mentions of the entities of a User or Tweet
+
+    Entities are a defaultdict(dict), so reading a missing name, e.g. in
+    __str__ or the row serializers, adds an empty dict for it.
 
-    :type config_file: str
-    :param config_file: Path of the configuration file
-    :rtype: dict
-    :returns: Configuration as dictionary
+    :type entities: dict
+    :param entities: Entities of the model data
+    :type name: str
+    :param name: url_items, hashtag_items or mention_items
+    :rtype: list
+    :returns: Items, None if the model has none
     """
 
-    if not config_file.endswith(".json"):
-        raise UnsupportedConfigFileError("Config file must be a json file!")
+    items = entities.get(name)
 
-    with open(config_file, encoding="utf-8") as configfile:
-        config = json.load(configfile)
+    return items if isinstance(items, list) else None
 
-    return config
 
+def to_iso8601(value: Optional[datetime]) -> Optional[str]:
+    """Convert datetime to ISO 8601 string
 
-def get_extracted_data_type(args: "Namespace") -> ExtractedDataType:
-    """Determine extracted data type from arguments
+    Microseconds are written as milliseconds, and left out if zero.
 
-    :type args: Namespace
-    :pram args: Command line args returned by ArgumentParser
-    :rtype: ExtractedDataType
-    :returns: Enum value for the extracted data type
+    :type value: datetime
+    :param value: Datetime value
+    :rtype: str
+    :returns: ISO 8601 formatted string
     """
 
-    result = None
-
-    config = get_configuration(args.configfile)
-
-    if args.useconfig:
-        is_user_extractor = config["user"] and not (
-            args.friends or args.followers or args.user_tweets
-        )
-        is_users_extractor = config["users"] and not (
-            args.friends or args.followers or args.user_tweets
-        )
-        is_friends_extractor = config["user"] and args.friends
-        is_followers_extractor = config["user"] and args.followers
-        is_user_tweets_extractor = config["user"] and args.user_tweets
-        is_search_tweets_extractor = config["search"]
-    else:
-        is_user_extractor = args.user and not (args.friends or args.followers or args.user_tweets)
-        is_users_extractor = args.users and not (args.friends or args.followers or args.user_tweets)
-        is_friends_extractor = args.user and args.friends
-        is_followers_extractor = args.user and args.followers
-        is_user_tweets_extractor = args.user and args.user_tweets
-        is_search_tweets_extractor = args.search
-
-    if is_user_extractor:
-        result = ExtractedDataType.USER
-    elif is_users_extractor:
-        result = ExtractedDataType.USERS
-    elif is_friends_extractor:
-        result = ExtractedDataType.FRIENDS
-    elif is_followers_extractor:
-        result = ExtractedDataType.FOLLOWERS
-    elif is_user_tweets_extractor:
-        result = ExtractedDataType.USER_TWEETS
-    elif is_search_tweets_extractor:
-        result = ExtractedDataType.SEARCH_TWEETS
-    else:
-        logger.error("Invalid extracted data type!")
-
-    return result
+    if value is None:
+        return None
+
+    if value.microsecond:
+        return value.isoformat(timespec="milliseconds")
+
+    return value.isoformat()